@@ -1,29 +1,72 @@
-import threading
-from flask import Flask, render_template, jsonify, request
-from soundtouch_manager import SoundTouchManager
+import json
+import os
+import time
+import uuid
+from flask import Flask, Response, render_template, jsonify, request, send_file
+from art_cache import ArtCache
+from device_state import diff_snapshots
+from jobs import JobRegistry
+from scenes import SceneStore
+from soundtouch_manager import DATA_DIR, SoundTouchManager
+from station_catalog import StationCatalog
+from station_search import FederatedSearch, merge_results
 from radio_browser import RadioBrowser
 from tunein_api import TuneInAPI
 
 app = Flask(__name__)
 manager = SoundTouchManager()
-radio_api = RadioBrowser()
+manager.start_status_poller()
+manager.start_discovery()
+# Optional offline station catalog (RADIO_CATALOG=1): a local index of all Radio Browser
+# stations, re-imported every RADIO_CATALOG_INTERVAL hours, answers radio searches
+catalog = StationCatalog(os.path.join(DATA_DIR, 'stations.db')) if os.environ.get('RADIO_CATALOG', '0') == '1' else None
+radio_api = RadioBrowser(catalog=catalog)
+if catalog:
+    radio_api.start_catalog_updates(float(os.environ.get('RADIO_CATALOG_INTERVAL', 24)) * 3600)
 tunein_api = TuneInAPI()
+jobs = JobRegistry()
+scenes = SceneStore(manager, os.path.join(DATA_DIR, 'scenes.json'))
+# One search across all station sources; slow providers are cut off at the deadline
+station_search = FederatedSearch([
+    ('favorite', manager.search_favorites),
+    ('tunein', tunein_api.search),
+    ('radiobrowser', radio_api.search_stations),
+], deadline=float(os.environ.get('SEARCH_DEADLINE', 3.0)))
+# Station logos and album art, fetched once and kept on disk (LRU, ART_CACHE_MB)
+art_cache = ArtCache(os.path.join(DATA_DIR, 'art_cache'),
+                     max_bytes=int(os.environ.get('ART_CACHE_MB', 50)) * 1024 * 1024)
+ART_MAX_AGE = 7 * 24 * 3600
+
+# Part of every version-based ETag, so validators from before a restart never match
+BOOT_ID = uuid.uuid4().hex[:8]
+
+def _json_with_etag(data, etag=None):
+    """
+    JSON response with an ETag (given, or a hash of the body) that answers a
+    matching If-None-Match with an empty 304.
+    """
+    response = jsonify(data)
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, but allow 304s
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    return response.make_conditional(request)
+
+def _not_modified(etag):
+    """304 for a version-based ETag the client already has, without building the body; else None."""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
 
 # Home Assistant Ingress Support
 @app.context_processor
 def inject_ingress_path():
     return dict(ingress_path=request.headers.get('X-Ingress-Path', ''))
 
-# Start discovery in background on launch - DISABLED to prevent hang
-# Triggers manually via /api/scan or first visit
-def start_discovery():
-    try:
-        print("Starting background discovery...")
-        manager.discover_devices() # Now optimized with threads
-        print("Discovery complete.")
-    except Exception as e:
-        print(f"Discovery error: {e}")
-
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -31,20 +74,52 @@ def index():
 # Static file serving override for Ingress if needed? 
 # Flask usually handles this if relative paths are used in HTML.
 
-@app.route('/api/scan', methods=['POST'])
+@app.route('/api/scan', methods=['GET', 'POST'])
 def trigger_scan():
-    # Start scan in background thread
-    discovery_thread = threading.Thread(target=start_discovery)
-    discovery_thread.daemon = True
-    discovery_thread.start()
-    return jsonify({"success": True, "message": "Scan started"})
+    """POST starts a scan in the background (or joins the running one); GET reports its progress."""
+    if request.method == 'GET':
+        return jsonify(manager.discovery.status())
+    started, status = manager.discover_devices(wait=False)
+    return jsonify({"success": True, "message": "Scan started" if started else "Scan already running",
+                    "scan": status})
 
 @app.route('/api/devices')
 def get_devices():
-    # Return what we have immediately
-    # Auto-trigger scan if empty but only once?
-    # Better to let client trigger it.
-    return jsonify(manager.get_devices_status())
+    # Served from the background poller's snapshot - never talks to a speaker.
+    # The version is read first, so the ETag can be older than the data but never newer.
+    etag = f"devices-{BOOT_ID}-{manager.state.version}"
+    return _not_modified(etag) or _json_with_etag(manager.get_devices_status(), etag)
+
+# Seconds between SSE keep-alive comments (keeps HA ingress / proxies from closing idle streams)
+SSE_KEEPALIVE = 15
+
+def _sse(event, data, version):
+    return f"event: {event}\nid: {version}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/events')
+def device_events():
+    """
+    Server-Sent Events stream of device state.
+    Sends one full 'snapshot' on connect, then 'delta' events with only the changed fields.
+    """
+    def stream():
+        version, last = manager.state.snapshot_with_version()
+        yield _sse('snapshot', last, version)
+        while True:
+            new_version = manager.state.wait_for_change(version, timeout=SSE_KEEPALIVE)
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version, current = manager.state.snapshot_with_version()
+            delta = diff_snapshots(last, current)
+            last = current
+            if delta:
+                yield _sse('delta', delta, version)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',  # Don't let ingress/nginx buffer the stream
+    })
 
 @app.route('/api/device/add', methods=['POST'])
 def add_device():
@@ -64,6 +139,18 @@ def play_url():
     result = manager.play_url(device_id, url, title)
     return jsonify(result)
 
+# action -> handler(device_id, value); shared by /api/control and /api/control/batch
+CONTROL_ACTIONS = {
+    'play_pause': lambda device_id, val: manager.play_pause(device_id),
+    'pause': lambda device_id, val: manager.pause(device_id),
+    'next': lambda device_id, val: manager.next_track(device_id),
+    'prev': lambda device_id, val: manager.previous_track(device_id),
+    'volume': lambda device_id, val: manager.set_volume(device_id, val),
+    'source': lambda device_id, val: manager.select_source(device_id, val),
+    'mute': lambda device_id, val: manager.toggle_mute(device_id),
+    'power_off': lambda device_id, val: manager.power_off(device_id),
+}
+
 @app.route('/api/control', methods=['POST'])
 def control_device():
     data = request.json
@@ -71,19 +158,45 @@ def control_device():
     action = data.get('action')
     val = data.get('value')
     
-    if action == 'play_pause':
-        return jsonify(manager.play_pause(device_id))
-    elif action == 'next':
-        return jsonify(manager.next_track(device_id))
-    elif action == 'prev':
-        return jsonify(manager.previous_track(device_id))
-    elif action == 'volume':
-        return jsonify(manager.set_volume(device_id, val))
-    elif action == 'source':
-        return jsonify(manager.select_source(device_id, val))
+    handler = CONTROL_ACTIONS.get(action)
+    if handler:
+        return jsonify(handler(device_id, val))
         
     return jsonify({"success": False, "message": "Unknown action"})
 
+@app.route('/api/control/batch', methods=['POST'])
+def control_batch():
+    """
+    Applies one action to many speakers at once.
+    Targets are `device_ids` or a `selector`: "all", "zone:<device_id>" or "group:<tag>".
+    """
+    data = request.json or {}
+    handler = CONTROL_ACTIONS.get(data.get('action'))
+    if not handler:
+        return jsonify({"success": False, "message": "Unknown action"}), 400
+    device_ids = data.get('device_ids')
+    if device_ids is not None and (not isinstance(device_ids, list)
+                                   or not all(isinstance(d, str) for d in device_ids)):
+        return jsonify({"success": False, "message": "device_ids must be a list of device ids"}), 400
+    device_ids = device_ids or manager.select_devices(data.get('selector'))
+    if not device_ids:
+        return jsonify({"success": False, "message": "No target devices"}), 400
+
+    val = data.get('value')
+    started = time.time()
+    results = manager.control_devices(device_ids, lambda device_id: handler(device_id, val))
+    return jsonify({
+        "success": all(r["success"] for r in results.values()),
+        "results": results,
+        "ms": int((time.time() - started) * 1000),
+    })
+
+@app.route('/api/device/<device_id>/groups', methods=['GET', 'POST'])
+def device_groups(device_id):
+    if request.method == 'POST':
+        return jsonify(manager.set_device_groups(device_id, (request.json or {}).get('groups', [])))
+    return jsonify(manager.groups.get(device_id, []))
+
 @app.route('/api/preset', methods=['POST'])
 def handle_preset():
     data = request.json
@@ -124,10 +237,25 @@ def favorites():
             type=data.get('type', 'url')
         ))
     elif request.method == 'DELETE':
-        index = request.json.get('index')
-        return jsonify(manager.remove_favorite(index))
+        data = request.json or {}
+        # Older clients still send the list index
+        return jsonify(manager.remove_favorite(data.get('id', data.get('index'))))
     else:
-        return jsonify(manager.get_favorites_list())
+        etag = f"favorites-{BOOT_ID}-{manager.favorites_version}"
+        return _not_modified(etag) or _json_with_etag(manager.get_favorites_list(), etag)
+
+@app.route('/api/scenes', methods=['GET', 'POST', 'DELETE'])
+def scene_list():
+    if request.method == 'POST':
+        data = request.json or {}
+        return jsonify(scenes.save(data.get('name'), data))
+    elif request.method == 'DELETE':
+        return jsonify(scenes.delete((request.json or {}).get('name')))
+    return jsonify(scenes.list())
+
+@app.route('/api/scenes/<name>/apply', methods=['POST'])
+def scene_apply(name):
+    return jsonify(scenes.apply(name))
 
 @app.route('/api/device/<device_id>/settings', methods=['GET', 'POST'])
 def device_settings(device_id):
@@ -172,15 +300,87 @@ def device_mute(device_id):
 def radio_search():
     query = request.args.get('q')
     country = request.args.get('country')
-    
+    tag = request.args.get('tag')
+    min_bitrate = request.args.get('min_bitrate', type=int)
+
+    if tag or min_bitrate:
+        return _json_with_etag(radio_api.search_stations(query, country_code=country, tag=tag, min_bitrate=min_bitrate))
+
     if not query and not country:
          # Default top stations if no query
-         return jsonify(radio_api.get_top_stations(limit=20))
+         return _json_with_etag(radio_api.get_top_stations(limit=20))
          
     if country and not query:
-        return jsonify(radio_api.get_top_stations(country_code=country, limit=20))
+        return _json_with_etag(radio_api.get_top_stations(country_code=country, limit=20))
+
+    return _json_with_etag(radio_api.search_stations(query))
+
+@app.route('/api/radio/catalog', methods=['GET'])
+def radio_catalog():
+    if not catalog:
+        return jsonify({"enabled": False})
+    return jsonify(dict(catalog.status(), enabled=True))
 
-    return jsonify(radio_api.search_stations(query))
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Typeahead over favorites, presets and recently played titles; never calls out."""
+    return jsonify(manager.suggestions.suggest(request.args.get('q', ''),
+                                               limit=request.args.get('limit', 8, type=int)))
+
+@app.route('/api/art', methods=['GET'])
+def art():
+    """
+    Proxies a remote image through the disk cache: ?url=<image url>&size=<px>.
+    `size` must be one of the thumbnail sizes; without it the original is sent.
+    Only public hosts are fetched; if the image can't be fetched the answer is 502.
+    """
+    url = request.args.get('url', '')
+    if not url.startswith(('http://', 'https://')):
+        return jsonify({"success": False, "message": "http(s) url required"}), 400
+    size = request.args.get('size', type=int)
+    if size is not None and size not in art_cache.sizes:
+        return jsonify({"success": False, "message": f"size must be one of {list(art_cache.sizes)}"}), 400
+
+    cached = art_cache.get(url, size)
+    if not cached:
+        return jsonify({"success": False, "message": "Image not available"}), 502
+    path, mime = cached
+    response = send_file(path, mimetype=mime, max_age=ART_MAX_AGE,
+                         etag=f"{os.path.basename(path)}-{os.path.getsize(path)}")
+    # Images come from arbitrary hosts; never let an SVG run script on our origin
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+@app.route('/api/search', methods=['GET'])
+def federated_search():
+    """
+    Searches favorites, TuneIn and Radio Browser at once.
+    With ?stream=1 the merged results are sent as SSE 'partial' events as each
+    provider answers, followed by a final 'done' event.
+    """
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 50, type=int)
+    if not query:
+        return jsonify({"results": [], "providers": {}})
+
+    if request.args.get('stream') != '1':
+        return jsonify(station_search.search(query, limit=limit))
+
+    def stream():
+        collected = {}
+        providers = {}
+        for i, (source, stations, info) in enumerate(station_search.iter_search(query)):
+            collected[source] = stations
+            providers[source] = info
+            ordered = [(s, collected[s]) for s, _ in station_search.providers if s in collected]
+            event = 'done' if len(providers) == len(station_search.providers) else 'partial'
+            yield _sse(event, {"results": merge_results(ordered, query, limit), "providers": providers}, i)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
 
 # ---- TuneIn API endpoints ----
 
@@ -188,17 +388,17 @@ def radio_search():
 def tunein_search():
     query = request.args.get('q', '')
     if not query:
-        return jsonify(tunein_api.get_popular())
-    return jsonify(tunein_api.search(query))
+        return _json_with_etag(tunein_api.get_popular())
+    return _json_with_etag(tunein_api.search(query))
 
 @app.route('/api/tunein/browse', methods=['GET'])
 def tunein_browse():
     category = request.args.get('category', 'local')
-    return jsonify(tunein_api.browse(category))
+    return _json_with_etag(tunein_api.browse(category))
 
 @app.route('/api/tunein/categories', methods=['GET'])
 def tunein_categories():
-    return jsonify(tunein_api.get_categories())
+    return _json_with_etag(tunein_api.get_categories())
 
 @app.route('/api/tunein/play', methods=['POST'])
 def tunein_play():
@@ -208,11 +408,26 @@ def tunein_play():
     name = data.get('name', 'Station')
     if not device_id or not guide_id:
         return jsonify({"success": False, "message": "Missing device_id or guide_id"})
+    if data.get('async'):
+        # Answer right away; the UI watches /api/jobs/<id> (and the device events)
+        job_id = jobs.submit('tunein_play', manager.play_tunein, device_id, guide_id, name)
+        return jsonify({"success": True, "job_id": job_id})
     result = manager.play_tunein(device_id, guide_id, name)
     return jsonify(result)
 
-import os
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify(job)
 
 if __name__ == '__main__':
+    # Warm the radio cache with the lists the radio tab and its suggestion chips open with.
+    # Only when serving: importing app (tests, tools) must not call out to Radio Browser
+    radio_api.prewarm(
+        queries=['Jazz', 'News', 'Rock', 'SRF', 'SWR'],
+        country_codes=[c for c in os.environ.get('RADIO_PREWARM_COUNTRIES', '').split(',') if c]
+    )
     port = int(os.environ.get('PORT', 5001))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,297 @@
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+import certifi
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, Timeout
+from cache import TTLCache
+from storage import atomic_write_bytes
+
+
+def sniff_image_type(data):
+    """MIME type from the first bytes of an image, or None if it isn't one we serve."""
+    head = data[:64]
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"\x00\x00\x01\x00"):
+        return "image/x-icon"
+    if b"<svg" in data[:1024].lower():
+        return "image/svg+xml"
+    return None
+
+
+class ArtCache:
+    """
+    Fetches remote artwork (station logos, favicons, album art) once and
+    keeps it on disk, with thumbnails in fixed sizes.
+
+    Files are named <sha1 of url>-<size> ('orig' for the original) in
+    `directory`; the total is kept under `max_bytes` by evicting the least
+    recently used files. The access order is kept in memory and only
+    written to the files' mtimes when files are evicted. URLs that failed
+    are not retried for `failure_ttl` seconds. Hosts on private, loopback
+    or link-local addresses are refused unless `allow_private` is set.
+    get() returns (path, mime type) or None.
+    """
+
+    MAX_REDIRECTS = 3
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, sizes=(64, 128, 300),
+                 max_image_bytes=5 * 1024 * 1024, timeout=5, failure_ttl=300, allow_private=False):
+        self.directory = directory
+        self.allow_private = allow_private
+        self.max_bytes = max_bytes
+        self.sizes = tuple(sizes)
+        self.max_image_bytes = max_image_bytes
+        self.timeout = timeout
+        self._failed = TTLCache(failure_ttl, maxsize=1024)
+        self._lock = threading.Lock()
+        self._fetch_locks = {}  # key -> Lock, so one URL is downloaded only once at a time
+        self._files = OrderedDict()  # filename -> bytes, least recently used first
+        self._touched = set()        # files used since their mtime was last updated
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.startswith("."):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        for _, name, size in sorted(entries):
+            self._files[name] = size
+            self._total += size
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def get(self, url, size=None):
+        """Cached (path, mime type) of `url` at `size` px (None = original), fetching it if needed."""
+        key = self.key(url)
+        name = f"{key}-{size or 'orig'}"
+        hit = self._lookup(name)
+        if hit:
+            return hit
+        if self._failed.get(key):
+            return None
+
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(key, threading.Lock())
+        try:
+            with fetch_lock:
+                return self._lookup(name) or self._fetch(url, key, name, size)
+        finally:
+            with self._lock:
+                self._fetch_locks.pop(key, None)
+
+    def _fetch(self, url, key, name, size):
+        original = self._lookup(f"{key}-orig")
+        if original:
+            with open(original[0], "rb") as f:
+                data = f.read()
+        else:
+            data = self._download(url)
+            if data is None:
+                self._failed.set(key, True)
+                return None
+            self._store(f"{key}-orig", data)
+        if size:
+            thumb = self._thumbnail(data, size)
+            if thumb is None:
+                # Can't scale (no Pillow, SVG, ...): the original stands in for this size from now on
+                self._link(f"{key}-orig", name, len(data))
+            else:
+                self._store(name, thumb)
+        return self._lookup(name)
+
+    def _lookup(self, name):
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if name not in self._files:
+                return None
+            self._files.move_to_end(name)
+            self._touched.add(name)
+        try:
+            with open(path, "rb") as f:
+                mime = sniff_image_type(f.read(1024))
+        except OSError:
+            with self._lock:
+                self._total -= self._files.pop(name, 0)
+            return None
+        return path, mime
+
+    def _vetted_address(self, url):
+        """
+        (address, port) to connect to for `url`, or None if its host resolves
+        to any private, loopback, link-local or other non-public address.
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return None
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            infos = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+        except (OSError, UnicodeError):
+            return None
+        addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+        if not addresses:
+            return None
+        if not self.allow_private and any(not a.is_global or a.is_multicast for a in addresses):
+            return None
+        return str(addresses[0]), port
+
+    def _open(self, url):
+        """
+        Starts a GET of `url` on a connection pinned to the address that was
+        vetted, so a second DNS answer (rebinding) can't redirect it.
+        Returns (pool, response) or None if the host isn't allowed.
+        """
+        target = self._vetted_address(url)
+        if target is None:
+            return None
+        parts = urlsplit(url)
+        address, port = target
+        timeout = Timeout(connect=self.timeout, read=self.timeout)
+        if parts.scheme == "https":
+            # TLS still checks the certificate against the host name, not the address
+            pool = HTTPSConnectionPool(address, port, timeout=timeout, retries=False,
+                                       server_hostname=parts.hostname, assert_hostname=parts.hostname,
+                                       cert_reqs="CERT_REQUIRED", ca_certs=certifi.where())
+        else:
+            pool = HTTPConnectionPool(address, port, timeout=timeout, retries=False)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        try:
+            response = pool.urlopen("GET", path, redirect=False, preload_content=False,
+                                    headers={"Host": parts.netloc.rpartition("@")[2],
+                                             "User-Agent": "Gabbo-SoundTouch/1.0"})
+        except BaseException:
+            pool.close()
+            raise
+        return pool, response
+
+    def _download(self, url):
+        try:
+            # Redirects are followed by hand so every hop is checked
+            for _ in range(self.MAX_REDIRECTS + 1):
+                opened = self._open(url)
+                if opened is None:
+                    print(f"Art fetch {url}: host not allowed")
+                    return None
+                pool, response = opened
+                location = response.get_redirect_location()
+                if not location:
+                    break
+                response.release_conn()
+                pool.close()
+                url = urljoin(url, location)
+            else:
+                print(f"Art fetch {url}: too many redirects")
+                return None
+            try:
+                if response.status != 200:
+                    print(f"Art fetch {url}: HTTP {response.status}")
+                    return None
+                data = b""
+                for chunk in response.stream(64 * 1024, decode_content=True):
+                    data += chunk
+                    if len(data) > self.max_image_bytes:
+                        print(f"Art fetch {url}: image too large")
+                        return None
+            finally:
+                response.release_conn()
+                pool.close()
+        except Exception as e:
+            print(f"Art fetch {url} failed: {e}")
+            return None
+        if not sniff_image_type(data):
+            print(f"Art fetch {url}: not an image")
+            return None
+        return data
+
+    def _thumbnail(self, data, size):
+        if sniff_image_type(data) == "image/svg+xml":
+            return None
+        try:
+            from PIL import Image  # Optional, and imported on first use to keep startup fast
+        except ImportError:
+            return None  # Without Pillow the original image is served
+        try:
+            image = Image.open(io.BytesIO(data))
+            image.thumbnail((size, size))
+            out = io.BytesIO()
+            if image.mode in ("RGBA", "LA", "P"):
+                image.convert("RGBA").save(out, "PNG", optimize=True)
+            else:
+                image.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+            return out.getvalue()
+        except Exception as e:
+            print(f"Thumbnail failed: {e}")
+            return None
+
+    def _store(self, name, data):
+        try:
+            atomic_write_bytes(os.path.join(self.directory, name), data)
+        except OSError as e:
+            print(f"Error caching art {name}: {e}")
+            return
+        self._add(name, len(data))
+
+    def _link(self, source, name, size):
+        """Makes `name` another name for the cached file `source`."""
+        target = os.path.join(self.directory, name)
+        try:
+            if os.path.exists(target):
+                os.unlink(target)
+            os.link(os.path.join(self.directory, source), target)
+        except OSError:
+            # No hard links on this filesystem: store a copy instead
+            with open(os.path.join(self.directory, source), "rb") as f:
+                self._store(name, f.read())
+            return
+        self._add(name, size)  # Counted twice; evicting either name frees its share
+
+    def _add(self, name, size):
+        with self._lock:
+            self._total += size - self._files.pop(name, 0)
+            self._files[name] = size
+            if self._total <= self.max_bytes:
+                return
+            while self._total > self.max_bytes and len(self._files) > 1:
+                old, old_size = self._files.popitem(last=False)
+                self._total -= old_size
+                self._touched.discard(old)
+                try:
+                    os.unlink(os.path.join(self.directory, old))
+                except OSError:
+                    pass
+            self._persist_order()
+
+    def _persist_order(self):
+        """Writes the in-memory LRU order to the mtimes of the files used since the last pass."""
+        # Called with self._lock held, once per eviction pass
+        now = time.time()
+        touched = [name for name in self._files if name in self._touched]
+        for i, name in enumerate(touched):
+            stamp = now - (len(touched) - i) * 0.001  # Keeps their relative order for _scan()
+            try:
+                os.utime(os.path.join(self.directory, name), (stamp, stamp))
+            except OSError:
+                pass
+        self._touched.clear()
@@ -0,0 +1,239 @@
+import asyncio
+import threading
+import time
+from xml.etree.ElementTree import fromstring
+
+
+class DeviceError(Exception):
+    """A speaker answered with an HTTP error or an <errors> document."""
+
+
+class DeviceLoop:
+    """
+    An asyncio event loop running on its own daemon thread.
+
+    Sync code (Flask routes, the status poller) hands coroutines to it with
+    submit() or run(); a single thread then carries any number of concurrent
+    speaker requests.
+    """
+
+    def __init__(self, name="device-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedules `coro` on the loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Runs `coro` on the loop and waits for its result (raises its exception).
+        If `timeout` expires the coroutine is cancelled on the loop as well.
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()  # Cancels the task on the loop, not just our wait for it
+            raise
+
+
+class AsyncHttp:
+    """
+    Minimal HTTP/1.1 client with keep-alive connections, for the speakers'
+    plain-HTTP APIs (port 8090 and DLNA on 8091). At most `per_host`
+    requests run against one host:port at a time; idle connections are
+    reused and closed after `idle_timeout` seconds. Only GETs are retried
+    on a fresh connection when a reused one turns out to be dead; other
+    methods may already have reached the speaker and raise instead.
+    Must only be used from one event loop.
+    """
+
+    def __init__(self, per_host=2, connect_timeout=3, read_timeout=10, idle_timeout=120):
+        self.per_host = per_host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self._idle = {}   # (host, port) -> [(reader, writer, last_used)]
+        self._slots = {}  # (host, port) -> asyncio.Semaphore(per_host)
+
+    async def request(self, method, host, port, path, body=None, headers=None, timeout=None):
+        """Returns (status, body bytes)."""
+        key = (host, port)
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = asyncio.Semaphore(self.per_host)
+        async with slot:
+            return await asyncio.wait_for(self._request(key, method, path, body, headers or {}),
+                                          timeout or self.read_timeout)
+
+    async def _request(self, key, method, path, body, headers):
+        conn = self._take_idle(key)
+        if conn:
+            try:
+                return await self._exchange(key, conn, method, path, body, headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn[1].close()  # The speaker dropped the idle connection
+                if method != "GET":
+                    raise  # The request may have been handled; don't send it twice
+            except BaseException:
+                conn[1].close()
+                raise
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(*key), self.connect_timeout)
+        try:
+            return await self._exchange(key, (reader, writer), method, path, body, headers)
+        except BaseException:
+            writer.close()
+            raise
+
+    def _take_idle(self, key):
+        idle = self._idle.get(key)
+        now = time.time()
+        while idle:
+            reader, writer, last_used = idle.pop()
+            if now - last_used < self.idle_timeout and not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def _exchange(self, key, conn, method, path, body, headers):
+        reader, writer = conn
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {key[0]}:{key[1]}", "Connection: keep-alive"]
+        lines += [f"{name}: {value}" for name, value in headers.items() if name.lower() != 'host']
+        lines.append(f"Content-Length: {len(body or b'')}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + (body or b''))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed by device")
+        version, status = status_line.split()[:2]
+        status = int(status)
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        connection = response_headers.get("connection", "").lower()
+        if version == b"HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            data = b""
+        elif "chunked" in response_headers.get("transfer-encoding", "").lower():
+            data = await self._read_chunked(reader)
+        elif "content-length" in response_headers:
+            data = await reader.readexactly(int(response_headers["content-length"]))
+        elif not keep_alive:
+            data = await reader.read()  # The body ends when the speaker closes the connection
+        else:
+            # No way to tell where the body ends on a connection that stays open
+            writer.close()
+            raise DeviceError(f"Response from {key[0]}{path} has no length")
+
+        if keep_alive:
+            self._idle.setdefault(key, []).append((reader, writer, time.time()))
+        else:
+            writer.close()
+        return status, data
+
+    async def _read_chunked(self, reader):
+        data = b""
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Connection closed during a chunked response")
+            size = int(line.split(b";")[0], 16)
+            if size == 0:
+                break
+            data += await reader.readexactly(size)
+            await reader.readexactly(2)
+        while await reader.readline() not in (b"\r\n", b"\n", b""):
+            pass  # Trailer fields
+        return data
+
+
+class AsyncSoundTouchClient:
+    """
+    Asyncio client for the SoundTouch endpoints the manager polls and
+    commands most: now playing, volume, zone, presets, key presses and
+    DLNA SetAVTransportURI. Results are the bosesoundtouchapi models, so
+    they can be used wherever SoundTouchClient results were.
+    """
+
+    def __init__(self, http, host, port=8090, dlna_port=8091):
+        self.http = http
+        self.host = host
+        self.port = port
+        self.dlna_port = dlna_port
+
+    async def _call(self, method, path, body=None):
+        headers = {"Content-Type": "application/xml"} if body is not None else {}
+        status, data = await self.http.request(method, self.host, self.port, path, body, headers)
+        root = fromstring(data) if data else None
+        if root is not None and root.tag == "errors":
+            error = root.find("error")
+            raise DeviceError(error.get("name") if error is not None else "Device error")
+        if status != 200:
+            raise DeviceError(f"HTTP {status} from {self.host}/{path}")
+        return root
+
+    # bosesoundtouchapi is imported on first use: it is slow to import and
+    # isn't needed until the first speaker answers
+    async def now_playing(self):
+        from bosesoundtouchapi.models import NowPlayingStatus
+        return NowPlayingStatus(root=await self._call("GET", "/now_playing"))
+
+    async def volume(self):
+        from bosesoundtouchapi.models import Volume
+        return Volume(root=await self._call("GET", "/volume"))
+
+    async def zone(self):
+        from bosesoundtouchapi.models import Zone
+        return Zone(root=await self._call("GET", "/getZone"))
+
+    async def presets(self):
+        from bosesoundtouchapi.models import PresetList
+        return PresetList(root=await self._call("GET", "/presets"))
+
+    async def key(self, key, state="both"):
+        """Presses and/or releases a remote key ('PLAY_PAUSE', 'POWER', 'PRESET_1', ...)."""
+        for step in (("press", "release") if state == "both" else (state,)):
+            await self._call("POST", "/key", f'<key state="{step}" sender="Gabbo">{key}</key>')
+
+    async def set_volume(self, level):
+        await self._call("POST", "/volume", f"<volume>{int(level)}</volume>")
+
+    async def dlna_set_uri(self, url):
+        """DLNA SetAVTransportURI; True if the speaker accepted the URL."""
+        # Escape XML special chars in URL
+        safe_url = url.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        soap_body = f'''<?xml version="1.0" encoding="utf-8"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
+  <s:Body>
+    <u:SetAVTransportURI xmlns:u="urn:schemas-upnp-org:service:AVTransport:1">
+      <InstanceID>0</InstanceID>
+      <CurrentURIMetaData></CurrentURIMetaData>
+      <CurrentURI>{safe_url}</CurrentURI>
+    </u:SetAVTransportURI>
+  </s:Body>
+</s:Envelope>'''
+        headers = {
+            "Content-Type": 'text/xml; charset="utf-8"',
+            "SOAPACTION": "urn:schemas-upnp-org:service:AVTransport:1#SetAVTransportURI",
+        }
+        status, _ = await self.http.request("POST", self.host, self.dlna_port, "/AVTransport/Control",
+                                            soap_body, headers, timeout=5)
+        return status == 200
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Small thread-safe key/value cache whose entries expire after a TTL.
+    Used for slow-changing data (presets, zones, capabilities) that would
+    otherwise be refetched on every status poll, and for remote API responses.
+
+    With `maxsize` the least recently used entries are evicted first. Entries
+    may also outlive their TTL by `stale_ttl` seconds: get_or_load() then
+    returns the stale value immediately and refreshes it in the background.
+    """
+
+    def __init__(self, ttl, maxsize=None, stale_ttl=0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._data = OrderedDict()  # key -> (fresh_until, stale_until, value)
+        self._refreshing = set()    # keys with a background refresh in flight
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns a fresh value, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            fresh_until, stale_until, value = entry
+            now = time.time()
+            if now >= fresh_until:
+                if now >= stale_until:
+                    del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None, stale_ttl=None):
+        fresh_until = time.time() + (self.ttl if ttl is None else ttl)
+        stale_until = fresh_until + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        with self._lock:
+            self._data[key] = (fresh_until, stale_until, value)
+            self._data.move_to_end(key)
+            if self.maxsize:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None, stale_ttl=None):
+        """
+        Returns the cached value for `key`, calling `loader()` on a miss.
+        A stale entry is returned as-is while a single background refresh runs.
+        Exceptions from `loader` propagate on a miss and are never cached.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                fresh_until, stale_until, value = entry
+                now = time.time()
+                if now < stale_until:
+                    self._data.move_to_end(key)
+                    if now >= fresh_until and key not in self._refreshing:
+                        self._refreshing.add(key)
+                        thread = threading.Thread(target=self._refresh, args=(key, loader, ttl, stale_ttl))
+                        thread.daemon = True
+                        thread.start()
+                    return value
+
+        value = loader()
+        self.set(key, value, ttl, stale_ttl)
+        return value
+
+    def _refresh(self, key, loader, ttl, stale_ttl):
+        try:
+            self.set(key, loader(), ttl, stale_ttl)
+        except Exception as e:
+            print(f"Cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drops every entry whose key matches `predicate(key)`."""
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,115 @@
+import threading
+
+# Port the speakers push notifications on
+NOTIFY_PORT = 8080
+
+
+def _state_categories():
+    """Notification categories we apply to the cached device state."""
+    # bosesoundtouchapi is slow to import; it is loaded on the listener thread
+    from bosesoundtouchapi import SoundTouchNotifyCategorys
+    return (
+        SoundTouchNotifyCategorys.nowPlayingUpdated,
+        SoundTouchNotifyCategorys.volumeUpdated,
+        SoundTouchNotifyCategorys.zoneUpdated,
+        SoundTouchNotifyCategorys.presetsUpdated,
+    )
+
+
+def __getattr__(name):
+    # STATE_CATEGORIES stays importable, but is only built when first used
+    if name == "STATE_CATEGORIES":
+        return _state_categories()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class DeviceEventListener:
+    """
+    Keeps a notification WebSocket open to one SoundTouch device.
+
+    Every state event is handed to `on_event(client, category, element)`.
+    `on_connection_change(client, connected)` is called whenever the socket
+    comes up or goes down, so the owner can fall back to polling. A dropped
+    socket is reopened with exponential backoff until stop() is called.
+    """
+
+    def __init__(self, client, on_event, on_connection_change=None, min_backoff=1, max_backoff=60):
+        self.client = client
+        self.connected = False
+        self._on_event = on_event
+        self._on_connection_change = on_connection_change
+        self._min_backoff = min_backoff
+        self._max_backoff = max_backoff
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def device_id(self):
+        return self.client.Device.DeviceId
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"events-{self.device_id}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        # Imported here, off the startup path: bosesoundtouchapi is slow to import
+        from bosesoundtouchapi import SoundTouchNotifyCategorys
+        from bosesoundtouchapi.ws import SoundTouchWebSocket
+        backoff = self._min_backoff
+        while not self._stop.is_set():
+            closed = threading.Event()
+            socket = SoundTouchWebSocket(self.client, port=NOTIFY_PORT, pingInterval=60)
+            socket.AddListener(SoundTouchNotifyCategorys.WebSocketOpen, lambda client, args: self._set_connected(True))
+            socket.AddListener(SoundTouchNotifyCategorys.WebSocketClose, lambda client, args: closed.set())
+            socket.AddListener(SoundTouchNotifyCategorys.WebSocketError, lambda client, args: closed.set())
+            for category in _state_categories():
+                socket.AddListener(category, self._make_handler(category.value))
+
+            try:
+                socket.StartNotification()
+                # Wait for the socket to drop; also watch the run_forever thread in case
+                # it exits without raising a close event.
+                while not closed.wait(5):
+                    if self._stop.is_set() or not socket.IsThreadRunForeverActive:
+                        break
+            except Exception as e:
+                print(f"Event socket error for {self.device_id}: {e}")
+            finally:
+                socket.StopNotification()
+
+            # A socket that was up for a while starts the next retry from scratch
+            if self.connected:
+                backoff = self._min_backoff
+            self._set_connected(False)
+            if self._stop.wait(backoff):
+                break
+            backoff = min(backoff * 2, self._max_backoff)
+
+    def _make_handler(self, category):
+        def handler(client, event):
+            # Some firmwares skip WebSocketOpen; the first real event proves we're connected
+            if not self.connected:
+                self._set_connected(True)
+            try:
+                self._on_event(client, category, event)
+            except Exception as e:
+                print(f"Error applying {category} for {self.device_id}: {e}")
+        return handler
+
+    def _set_connected(self, connected):
+        if self.connected == connected:
+            return
+        self.connected = connected
+        print(f"Event socket {'connected' if connected else 'disconnected'}: {self.device_id}")
+        if self._on_connection_change:
+            try:
+                self._on_connection_change(self.client, connected)
+            except Exception as e:
+                print(f"Connection change handler error: {e}")
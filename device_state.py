@@ -0,0 +1,136 @@
+import threading
+
+
+class DeviceStateStore:
+    """
+    Versioned in-memory snapshot of the per-device status dicts.
+
+    Writers (the status poller, later event listeners) replace or patch the
+    entries; readers such as /api/devices only copy references out, so a
+    request never has to talk to a speaker. Stored dicts are never mutated in
+    place, which keeps handing them out without a deep copy safe.
+    """
+
+    def __init__(self):
+        self._devices = {}   # device_id -> status dict (insertion order = display order)
+        self._versions = {}  # device_id -> global version at which it last changed
+        self.version = 0
+        self._cond = threading.Condition()
+
+    def snapshot(self):
+        """Returns the current list of device status dicts."""
+        with self._cond:
+            return list(self._devices.values())
+
+    def snapshot_with_version(self):
+        """Returns (version, device list) read atomically."""
+        with self._cond:
+            return self.version, list(self._devices.values())
+
+    def get(self, device_id):
+        with self._cond:
+            return self._devices.get(device_id)
+
+    def device_version(self, device_id):
+        with self._cond:
+            return self._versions.get(device_id, 0)
+
+    def replace(self, status_list):
+        """
+        Replaces the whole snapshot with a freshly built status list.
+        Returns the set of device ids that were added, changed or removed.
+        """
+        new_devices = {}
+        for data in status_list:
+            new_devices[data["id"]] = data
+
+        with self._cond:
+            changed = set(self._devices) - set(new_devices)
+            for device_id, data in new_devices.items():
+                if self._devices.get(device_id) != data:
+                    changed.add(device_id)
+
+            # Keep the old dict objects for unchanged devices so readers holding
+            # a previous snapshot still see identical objects.
+            for device_id in new_devices:
+                if device_id not in changed:
+                    new_devices[device_id] = self._devices[device_id]
+
+            if changed or list(new_devices) != list(self._devices):
+                self.version += 1
+                for device_id in changed:
+                    self._versions[device_id] = self.version
+                for device_id in set(self._versions) - set(new_devices):
+                    del self._versions[device_id]
+                self._devices = new_devices
+                self._cond.notify_all()
+            return changed
+
+    def update(self, device_id, fields):
+        """
+        Merges `fields` into the stored status of one device.
+        Returns True if anything actually changed.
+        """
+        with self._cond:
+            current = self._devices.get(device_id)
+            if current is None:
+                return False
+            merged = dict(current)
+            merged.update(fields)
+            if merged == current:
+                return False
+            self.version += 1
+            self._devices[device_id] = merged
+            self._versions[device_id] = self.version
+            self._cond.notify_all()
+            return True
+
+    def wait_for_change(self, since_version, timeout=None):
+        """
+        Blocks until the snapshot version moves past `since_version` or the
+        timeout expires. Returns the current version.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.version > since_version, timeout)
+            return self.version
+
+
+def diff_snapshots(old, new):
+    """
+    Computes what changed between two device lists (as returned by snapshot()).
+
+    Returns None when nothing changed, otherwise a dict with
+    - "devices": device_id -> changed top-level fields (the full dict for new devices)
+    - "removed": ids that disappeared
+    - "cleared": device_id -> fields that were dropped (e.g. is_stale after a probe)
+    - "order":   the new id order, only if it differs
+    """
+    old_by_id = {d["id"]: d for d in old}
+    new_ids = [d["id"] for d in new]
+
+    changed = {}
+    cleared = {}
+    for data in new:
+        previous = old_by_id.get(data["id"])
+        if previous is None:
+            changed[data["id"]] = data
+        elif previous is not data:
+            fields = {k: v for k, v in data.items() if k not in previous or previous[k] != v}
+            if fields:
+                changed[data["id"]] = fields
+            dropped = [k for k in previous if k not in data]
+            if dropped:
+                cleared[data["id"]] = dropped
+
+    delta = {}
+    if changed:
+        delta["devices"] = changed
+    if cleared:
+        delta["cleared"] = cleared
+    new_id_set = set(new_ids)
+    removed = [device_id for device_id in old_by_id if device_id not in new_id_set]
+    if removed:
+        delta["removed"] = removed
+    if new_ids != [d["id"] for d in old]:
+        delta["order"] = new_ids
+    return delta or None
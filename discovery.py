@@ -0,0 +1,191 @@
+import asyncio
+import ipaddress
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVICE_TYPE = "_soundtouch._tcp.local."
+
+
+class DiscoveryService:
+    """
+    Finds speakers in up to three ways:
+      - a persistent mDNS browser that reports speakers as they announce
+        themselves (start_browser()),
+      - scan() re-checks the known IPs (and everything mDNS has seen),
+      - and, if `cidr` is set, probes every address of that network on
+        `port` under a strict deadline.
+
+    `on_found(ip)` is called for every candidate address (from the worker
+    pool); it should verify and register the speaker and return True if it
+    is one. Only one scan runs at a time: concurrent scan() calls share it.
+    status() reports its progress; hosts the sweep didn't reach before its
+    deadline are counted as "skipped".
+    """
+
+    def __init__(self, on_found, known_hosts, cidr=None, port=8090, connect_timeout=0.5,
+                 sweep_deadline=10, sweep_concurrency=64, max_workers=8, max_sweep_hosts=4096, mdns=True):
+        self.on_found = on_found
+        self.known_hosts = known_hosts  # callable returning the known IPs
+        self.cidr = cidr
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.sweep_deadline = sweep_deadline
+        self.sweep_concurrency = sweep_concurrency
+        self.max_sweep_hosts = max_sweep_hosts
+        self.mdns = mdns
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="discovery")
+        self._lock = threading.Lock()
+        self._scan_thread = None
+        self._status = {"running": False, "phase": None, "done": 0, "total": 0, "skipped": 0, "found": [],
+                        "started": None, "finished": None, "elapsed_ms": None}
+        self._zeroconf = None
+        self._browser = None
+        self.mdns_seen = {}  # ip -> service name, for everything the browser has seen
+
+    # --- mDNS ---
+    def start_browser(self):
+        """Starts the mDNS browser (once). Returns False if disabled or zeroconf is unavailable."""
+        if not self.mdns:
+            return False
+        with self._lock:
+            if self._browser is not None:
+                return True
+            try:
+                from zeroconf import ServiceBrowser, Zeroconf
+                self._zeroconf = Zeroconf()
+                self._browser = ServiceBrowser(self._zeroconf, SERVICE_TYPE, handlers=[self._on_service_change])
+            except Exception as e:
+                print(f"mDNS browser not started: {e}")
+                return False
+        print("mDNS browser started")
+        return True
+
+    def stop_browser(self):
+        with self._lock:
+            zeroconf, self._zeroconf, self._browser = self._zeroconf, None, None
+        if zeroconf:
+            zeroconf.close()
+
+    def _on_service_change(self, zeroconf, service_type, name, state_change):
+        # Called on the zeroconf thread, which must not block: resolve on our pool
+        if state_change.name in ("Added", "Updated"):
+            self._pool.submit(self._resolve_service, zeroconf, service_type, name)
+
+    def _resolve_service(self, zeroconf, service_type, name):
+        try:
+            from zeroconf import IPVersion
+            info = zeroconf.get_service_info(service_type, name, timeout=3000)
+            addresses = info.parsed_addresses(IPVersion.V4Only) if info else []
+        except Exception as e:
+            print(f"mDNS resolve of {name} failed: {e}")
+            return
+        for ip in addresses:
+            self.mdns_seen[ip] = name
+            print(f"mDNS: {name.split('.')[0]} at {ip}")
+            self._check(ip)
+
+    def _check(self, ip):
+        try:
+            return bool(self.on_found(ip))
+        except Exception as e:
+            print(f"Discovery check of {ip} failed: {e}")
+            return False
+
+    # --- Scans ---
+    def status(self):
+        with self._lock:
+            return dict(self._status, found=list(self._status["found"]),
+                        browser=self._browser is not None, mdns_seen=len(self.mdns_seen))
+
+    def scan(self, wait=False):
+        """Starts a scan unless one is running; returns (started, status)."""
+        with self._lock:
+            started = self._scan_thread is None or not self._scan_thread.is_alive()
+            if started:
+                self._status = {"running": True, "phase": "known", "done": 0, "total": 0, "skipped": 0, "found": [],
+                                "started": time.time(), "finished": None, "elapsed_ms": None}
+                self._scan_thread = threading.Thread(target=self._run_scan, name="discovery-scan")
+                self._scan_thread.daemon = True
+                self._scan_thread.start()
+            thread = self._scan_thread
+        if wait:
+            thread.join()
+        return started, self.status()
+
+    def _progress(self, ip=None, found=False, phase=None, total=0, skipped=0):
+        with self._lock:
+            if phase:
+                self._status["phase"] = phase
+            self._status["total"] += total
+            self._status["skipped"] += skipped
+            if ip:
+                self._status["done"] += 1
+                if found:
+                    self._status["found"].append(ip)
+
+    def _run_scan(self):
+        try:
+            # mDNS answers whenever speakers announce; make sure we're listening
+            self.start_browser()
+            # Known IPs plus whatever mDNS has seen (a speaker may have been busy then)
+            candidates = list(dict.fromkeys(list(self.known_hosts()) + list(self.mdns_seen)))
+            self._progress(total=len(candidates))
+            futures = [(ip, self._pool.submit(self._check, ip)) for ip in candidates]
+            for ip, future in futures:
+                self._progress(ip, future.result())
+
+            if self.cidr:
+                hosts = self._sweep_hosts(set(candidates))
+                self._progress(phase="sweep", total=len(hosts))
+                open_hosts = asyncio.run(self._sweep(hosts))
+                for ip, found in zip(open_hosts, self._pool.map(self._check, open_hosts)):
+                    self._progress(ip, found)
+        except Exception as e:
+            print(f"Discovery scan failed: {e}")
+        finally:
+            with self._lock:
+                finished = time.time()
+                self._status.update(running=False, phase="done", finished=finished,
+                                    elapsed_ms=int((finished - self._status["started"]) * 1000))
+
+    def _sweep_hosts(self, skip):
+        try:
+            network = ipaddress.ip_network(self.cidr, strict=False)
+        except ValueError as e:
+            print(f"Invalid DISCOVERY_CIDR {self.cidr}: {e}")
+            return []
+        if network.num_addresses > self.max_sweep_hosts + 2:
+            print(f"DISCOVERY_CIDR {self.cidr} is too large (max {self.max_sweep_hosts} hosts); skipping sweep")
+            return []
+        return [str(ip) for ip in network.hosts() if str(ip) not in skip]
+
+    async def _sweep(self, hosts):
+        """TCP-connects to `port` on all hosts; returns those that accept, within sweep_deadline."""
+        limit = asyncio.Semaphore(self.sweep_concurrency)
+        open_hosts = []
+
+        async def probe(ip):
+            async with limit:
+                try:
+                    _, writer = await asyncio.wait_for(asyncio.open_connection(ip, self.port), self.connect_timeout)
+                except (OSError, asyncio.TimeoutError):
+                    self._progress(ip)
+                    return
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+                open_hosts.append(ip)
+
+        tasks = [asyncio.ensure_future(probe(ip)) for ip in hosts]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=self.sweep_deadline)
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Reported as skipped, so done + skipped adds up to total once the scan is over
+                self._progress(skipped=len(pending))
+                print(f"Discovery sweep: {len(pending)} hosts not probed before the deadline")
+        return open_hosts
@@ -0,0 +1,99 @@
+import threading
+import time
+from urllib.parse import urljoin
+import certifi
+from urllib3 import PoolManager, Timeout
+from urllib3.util import parse_url
+
+
+class HttpPool(PoolManager):
+    """
+    Shared keep-alive connection pool for all speaker traffic.
+
+    urllib3 keeps one connection pool per scheme/host/port, so the status
+    poller, control commands (port 8090, via SoundTouchClient) and DLNA SOAP
+    calls (port 8091) all reuse the same sockets instead of paying TCP setup
+    on the speakers' weak CPUs for every call. Hosts that haven't been used
+    for `idle_timeout` seconds are evicted and their sockets closed.
+    A request waits at most `pool_timeout` seconds for a free connection
+    (urllib3 raises EmptyPoolError), so a hanging speaker can't block
+    callers forever.
+    """
+
+    def __init__(self, pool_size=4, idle_timeout=120, connect_timeout=3, read_timeout=10, max_hosts=64,
+                 pool_timeout=10):
+        super().__init__(
+            num_pools=max_hosts,
+            maxsize=pool_size,  # keep-alive connections per host:port
+            block=True,         # never open more than pool_size connections to one speaker
+            timeout=Timeout(connect=connect_timeout, read=read_timeout),
+            headers={'User-Agent': 'BoseSoundTouchApi/1.0.0'},
+            ca_certs=certifi.where(),
+        )
+        self.idle_timeout = idle_timeout
+        self.pool_timeout = pool_timeout
+        self._last_used = {}  # (scheme, host, port) -> time of last request
+        self._last_sweep = time.time()
+        self._sweep_lock = threading.Lock()
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        u = parse_url(url)
+        scheme = u.scheme or 'http'
+        now = time.time()
+        self._last_used[(scheme, u.host, u.port or (443 if scheme == 'https' else 80))] = now
+        if now - self._last_sweep > self.idle_timeout / 2:
+            self.evict_idle(now)
+        kw.setdefault('pool_timeout', self.pool_timeout)
+        return super().urlopen(method, url, redirect=redirect, **kw)
+
+    def with_timeout(self, connect, read):
+        """A view of this pool whose requests default to other timeouts (same connections)."""
+        return _TimeoutView(self, Timeout(connect=connect, read=read))
+
+    def evict_idle(self, now=None):
+        """Closes the connection pools of hosts that have been idle for idle_timeout."""
+        now = now or time.time()
+        with self._sweep_lock:
+            self._last_sweep = now
+            idle = {key for key, used in list(self._last_used.items()) if now - used > self.idle_timeout}
+            if not idle:
+                return
+            for pool_key in list(self.pools.keys()):
+                if (pool_key.key_scheme, pool_key.key_host, pool_key.key_port) in idle:
+                    del self.pools[pool_key]  # RecentlyUsedContainer closes the pool on removal
+            for key in idle:
+                self._last_used.pop(key, None)
+
+    def resolve_redirects(self, url, max_redirects=5, timeout=5):
+        """
+        Follows HTTP redirects of a (possibly endless) stream URL without reading
+        its body and returns the final absolute URL.
+        """
+        for _ in range(max_redirects):
+            resp = self.request('GET', url, preload_content=False, redirect=False, timeout=timeout)
+            location = resp.get_redirect_location()
+            if location:
+                resp.drain_conn()
+            else:
+                # The body is the audio stream itself - drop the connection instead of draining it
+                resp.close()
+            resp.release_conn()
+            if not location:
+                return url
+            url = urljoin(url, location)
+        return url
+
+
+class _TimeoutView:
+    """Passes `timeout` to every request it forwards to the pool; see HttpPool.with_timeout()."""
+
+    def __init__(self, pool, timeout):
+        self._pool = pool
+        self._timeout = timeout
+
+    def request(self, method, url, **kw):
+        kw.setdefault('timeout', self._timeout)
+        return self._pool.request(method, url, **kw)
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
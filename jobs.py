@@ -0,0 +1,59 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobRegistry:
+    """
+    Runs slow commands in the background and keeps their outcome for a while,
+    so an API call can return a job id right away and the UI can watch it.
+
+    A job is a plain dict: id, kind, status ('running', 'done' or 'failed'),
+    result (the command's return value), started, finished and elapsed_ms.
+    Finished jobs are dropped `keep` seconds after they end.
+    """
+
+    def __init__(self, max_workers=4, keep=300):
+        self.keep = keep
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """Starts fn(*args, **kwargs) in the background and returns the job id."""
+        job_id = uuid.uuid4().hex[:12]
+        job = {"id": job_id, "kind": kind, "status": "running", "result": None,
+               "started": time.time(), "finished": None, "elapsed_ms": None}
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+            # Commands report failure as {"success": False, ...} rather than raising
+            status = "failed" if isinstance(result, dict) and result.get("success") is False else "done"
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            result = {"success": False, "message": str(e)}
+            status = "failed"
+        finished = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._jobs[job_id] = dict(job, status=status, result=result, finished=finished,
+                                      elapsed_ms=int((finished - job["started"]) * 1000))
+
+    def get(self, job_id):
+        """The job dict, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items() if job["finished"] and now - job["finished"] > self.keep]:
+            del self._jobs[job_id]
@@ -1,6 +1,71 @@
 import requests
 import json
 import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from cache import TTLCache
+from station_catalog import iter_json_array
+
+def is_mirror_failure(error):
+    """
+    True if `error` says something about the mirror (unreachable, timed out,
+    5xx or rate limited); False for 4xx answers to a bad query, which every
+    mirror would give.
+    """
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status >= 500 or status == 429
+    return isinstance(error, (requests.ConnectionError, requests.Timeout, TimeoutError))
+
+class MirrorPool:
+    """
+    Tracks latency and health of the Radio Browser mirrors.
+
+    Every request feeds its round-trip time into a moving average per mirror;
+    ranked() orders healthy mirrors fastest first. A failing mirror is
+    skipped for an exponentially growing period and retried afterwards.
+    """
+
+    DEFAULT_LATENCY = 0.5 # Assumed for mirrors we haven't measured yet
+    EWMA_WEIGHT = 0.3
+
+    def __init__(self, servers):
+        self.servers = list(servers)
+        self._stats = {s: {"latency": None, "failures": 0, "down_until": 0} for s in self.servers}
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        """Healthy mirrors by latency, then the ones currently marked down."""
+        now = time.time()
+        with self._lock:
+            def latency(server):
+                value = self._stats[server]["latency"]
+                return self.DEFAULT_LATENCY if value is None else value
+            healthy = [s for s in self.servers if self._stats[s]["down_until"] <= now]
+            down = [s for s in self.servers if self._stats[s]["down_until"] > now]
+            return sorted(healthy, key=latency) + sorted(down, key=lambda s: self._stats[s]["down_until"])
+
+    def record_success(self, server, latency):
+        with self._lock:
+            stats = self._stats[server]
+            if stats["latency"] is None:
+                stats["latency"] = latency
+            else:
+                stats["latency"] += self.EWMA_WEIGHT * (latency - stats["latency"])
+            stats["failures"] = 0
+            stats["down_until"] = 0
+
+    def record_failure(self, server):
+        with self._lock:
+            stats = self._stats[server]
+            stats["failures"] += 1
+            stats["down_until"] = time.time() + min(30 * 2 ** (stats["failures"] - 1), 600)
+
+    def health(self):
+        """Snapshot of the per-mirror stats, for diagnostics."""
+        with self._lock:
+            return {s: dict(stats) for s, stats in self._stats.items()}
 
 class RadioBrowser:
     """
@@ -15,37 +80,119 @@ class RadioBrowser:
         "https://nl1.api.radio-browser.info"
     ]
 
-    def __init__(self):
-        self.base_url = self.SERVERS[0] 
-        # In a real robust app we might want to ping servers to find the fastest one on init
-        # For now, we default to de1 as requested for EU focus
+    # Response cache: seconds until an entry is refreshed, per endpoint, and how long
+    # a stale entry may still be served while the refresh runs in the background
+    SEARCH_TTL = 600
+    TOP_TTL = 1800
+    STALE_TTL = 86400
+
+    # Seconds to wait on the fastest mirror before sending the same request to the next one
+    HEDGE_DELAY = 0.3
+    REQUEST_TIMEOUT = 5
+    # The full station dump is ~50k stations; allow for a slow download
+    DUMP_TIMEOUT = (5, 60)
+
+    def __init__(self, cache_size=256, servers=None, hedge_delay=None, catalog=None):
+        # Mirrors are ranked by measured latency; de1 stays first until we know better (EU focus)
+        self.mirrors = MirrorPool(servers or self.SERVERS)
+        self.hedge_delay = self.HEDGE_DELAY if hedge_delay is None else hedge_delay
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="radio")
+        self.cache = TTLCache(ttl=self.SEARCH_TTL, maxsize=cache_size, stale_ttl=self.STALE_TTL)
+        # Optional local StationCatalog; once imported it answers searches and top lists
+        self.catalog = catalog
 
-    def search_stations(self, query, limit=20):
+    @property
+    def base_url(self):
+        """The mirror currently considered fastest."""
+        return self.mirrors.ranked()[0]
+
+    def search_stations(self, query, limit=20, country_code=None, tag=None, min_bitrate=None):
         """
         Search for radio stations by name/tag.
         """
+        if self.catalog and self.catalog.ready():
+            return self.catalog.search(query, limit, country_code, tag, min_bitrate)
+
         endpoint = "/json/stations/search"
         
         params = {
-            'name': query,
+            'name': (query or '').strip().lower(), # Name search is case-insensitive; normalize for the cache
             'limit': limit,
             'order': 'clickcount', # Show popular stations first
             'reverse': 'true',
             'hidebroken': 'true' # Don't show broken streams
         }
+        if country_code:
+            params['countrycode'] = country_code.strip().upper()
+        if tag:
+            params['tag'] = tag.strip().lower()
+        if min_bitrate:
+            params['bitrateMin'] = int(min_bitrate)
         
-        # Try primary server
+        # Fastest mirror first, hedged/failed over to the others
         try:
-            return self._do_request(self.base_url + endpoint, params)
+            return self._cached_request(endpoint, params, self.SEARCH_TTL)
         except Exception as e:
-            print(f"Radio API error on primary: {e}")
-            # Fallback (simple round robin or random pick could be added here)
+            print(f"Radio API error on all mirrors: {e}")
             return []
 
-    def _do_request(self, url, params):
-        response = requests.get(url, params=params, timeout=5)
-        response.raise_for_status()
-        data = response.json()
+    def _cached_request(self, endpoint, params, ttl):
+        """Serves identical queries from the response cache (stale-while-revalidate)."""
+        key = (endpoint,) + tuple(sorted((k, str(v)) for k, v in params.items()))
+        return self.cache.get_or_load(key, lambda: self._do_request(endpoint, params), ttl)
+
+    def _fetch(self, server, endpoint, params):
+        """GETs one mirror and records its latency or failure."""
+        started = time.time()
+        try:
+            response = requests.get(server + endpoint, params=params, timeout=self.REQUEST_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            if is_mirror_failure(e):
+                self.mirrors.record_failure(server)
+            raise
+        self.mirrors.record_success(server, time.time() - started)
+        return data
+
+    def _hedged_get(self, endpoint, params):
+        """
+        Sends the request to the fastest mirror; if it hasn't answered after
+        hedge_delay (or fails), the next mirror is asked too. The first
+        successful answer wins. Raises the last error if every mirror fails.
+        """
+        pending_servers = self.mirrors.ranked()
+        running = {}
+        last_error = None
+
+        def launch_next():
+            if pending_servers:
+                server = pending_servers.pop(0)
+                running[self._executor.submit(self._fetch, server, endpoint, params)] = server
+
+        launch_next()
+        deadline = time.time() + self.REQUEST_TIMEOUT + self.hedge_delay * len(self.mirrors.servers)
+        while running:
+            done, _ = wait(running, timeout=self.hedge_delay if pending_servers else max(0, deadline - time.time()),
+                           return_when=FIRST_COMPLETED)
+            if not done:
+                if not pending_servers:
+                    break
+                launch_next() # Hedge: the current mirrors are slow
+                continue
+            for future in done:
+                running.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    if not is_mirror_failure(e):
+                        raise # A bad query; the other mirrors would refuse it too
+                    last_error = e
+                    launch_next() # Fail over immediately
+        raise last_error or TimeoutError("No Radio Browser mirror answered")
+
+    def _do_request(self, endpoint, params):
+        data = self._hedged_get(endpoint, params)
         
         # Transform to our app's simpler format
         results = []
@@ -66,6 +213,8 @@ class RadioBrowser:
         # API supports /json/stations/topclick/{limit}
         # But to filter by country we might need search with empty name?
         # Actually /json/stations/search supports countrycode param
+        if self.catalog and self.catalog.ready():
+            return self.catalog.top(country_code, limit)
         
         params = {
             'limit': limit,
@@ -75,6 +224,58 @@ class RadioBrowser:
         }
         
         if country_code:
-            params['countrycode'] = country_code
+            params['countrycode'] = country_code.strip().upper()
             
-        return self._do_request(self.base_url + "/json/stations/search", params)
+        try:
+            return self._cached_request("/json/stations/search", params, self.TOP_TTL)
+        except Exception as e:
+            print(f"Radio API error on all mirrors: {e}")
+            return []
+
+    def import_catalog(self):
+        """
+        Streams the full station list from the fastest mirror into the catalog.
+        Returns the import summary, or None if no mirror delivered it.
+        """
+        for server in self.mirrors.ranked():
+            started = time.time()
+            try:
+                with requests.get(server + "/json/stations", params={'hidebroken': 'true'},
+                                  stream=True, timeout=self.DUMP_TIMEOUT) as response:
+                    response.raise_for_status()
+                    result = self.catalog.import_stations(iter_json_array(response.iter_content(64 * 1024)))
+                print(f"Radio catalog import from {server}: {result} in {time.time() - started:.0f}s")
+                return result
+            except Exception as e:
+                if is_mirror_failure(e):
+                    self.mirrors.record_failure(server)
+                print(f"Radio catalog import from {server} failed: {e}")
+        return None
+
+    def start_catalog_updates(self, interval=86400):
+        """Imports the catalog in a background thread whenever it is older than `interval` seconds."""
+        def run():
+            while True:
+                if time.time() - self.catalog.last_import() >= interval:
+                    self.import_catalog()
+                time.sleep(min(interval, 3600))
+
+        thread = threading.Thread(target=run, name="radio-catalog")
+        thread.daemon = True
+        thread.start()
+
+    def prewarm(self, queries=(), country_codes=()):
+        """Fills the cache with popular lists in a background thread."""
+        def run():
+            jobs = [lambda: self.get_top_stations(limit=20)]
+            jobs += [lambda c=c: self.get_top_stations(country_code=c, limit=20) for c in country_codes]
+            jobs += [lambda q=q: self.search_stations(q) for q in queries]
+            for job in jobs:
+                try:
+                    job()
+                except Exception as e:
+                    print(f"Radio prewarm error: {e}")
+
+        thread = threading.Thread(target=run, name="radio-prewarm")
+        thread.daemon = True
+        thread.start()
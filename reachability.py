@@ -0,0 +1,69 @@
+import random
+import threading
+import time
+
+
+class ReachabilityTracker:
+    """
+    Remembers which device IPs answered recently and when to try the others again.
+
+    Failed IPs are retried with exponential backoff plus jitter, so an unplugged
+    speaker costs one probe every few minutes instead of a connection timeout
+    on every status poll.
+    """
+
+    def __init__(self, base_delay=5, max_delay=300, jitter=0.2):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._state = {}        # ip -> {"failures", "next_attempt", "last_seen"}
+        self._in_flight = set() # ips with a probe currently running
+        self._lock = threading.Lock()
+
+    def is_due(self, ip):
+        """True if the IP is healthy or its backoff has expired."""
+        with self._lock:
+            entry = self._state.get(ip)
+            return entry is None or time.time() >= entry["next_attempt"]
+
+    def try_begin_probe(self, ip):
+        """Claims a background probe for `ip`; False if one is running or it isn't due yet."""
+        with self._lock:
+            if ip in self._in_flight:
+                return False
+            entry = self._state.get(ip)
+            if entry is not None and time.time() < entry["next_attempt"]:
+                return False
+            self._in_flight.add(ip)
+            return True
+
+    def end_probe(self, ip, success):
+        with self._lock:
+            self._in_flight.discard(ip)
+        if success:
+            self.record_success(ip)
+        else:
+            self.record_failure(ip)
+
+    def record_success(self, ip):
+        with self._lock:
+            self._state[ip] = {"failures": 0, "next_attempt": 0, "last_seen": time.time()}
+
+    def record_failure(self, ip):
+        """Pushes the next attempt out exponentially. Returns the chosen delay in seconds."""
+        with self._lock:
+            entry = self._state.setdefault(ip, {"failures": 0, "next_attempt": 0, "last_seen": None})
+            entry["failures"] += 1
+            delay = min(self.base_delay * (2 ** (entry["failures"] - 1)), self.max_delay)
+            delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            entry["next_attempt"] = time.time() + delay
+            return delay
+
+    def last_seen(self, ip):
+        with self._lock:
+            entry = self._state.get(ip)
+            return entry["last_seen"] if entry else None
+
+    def forget(self, ip):
+        with self._lock:
+            self._state.pop(ip, None)
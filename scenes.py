@@ -0,0 +1,151 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from storage import atomic_write_json, read_json
+
+
+class SceneStore:
+    """
+    Named multi-speaker setups ("morning", "party"), stored in scenes.json.
+
+    A scene looks like:
+        {
+            "zone": {"master": "<device_id>", "members": ["<device_id>", ...]},  # optional
+            "devices": {
+                "<device_id>": {"volume": 20, "favorite": "Radio SRF 3"},
+                "<device_id>": {"volume": 15}
+            }
+        }
+    Per device, playback is one of "favorite" (id, name or index), "url",
+    "guide_id" (TuneIn), "preset" (1-6) or "source" (AUX, BLUETOOTH, ...).
+    Zone members follow their master, so they only need a volume.
+    Flask threads and jobs share one store; changes are made under a lock.
+    """
+
+    def __init__(self, manager, path, max_workers=8):
+        self.manager = manager
+        self.path = path
+        self._lock = threading.Lock()
+        self.scenes = self._load()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scene")
+
+    def _load(self):
+        return read_json(self.path, {})
+
+    def _save(self):
+        atomic_write_json(self.path, self.scenes)
+
+    def list(self):
+        with self._lock:
+            return dict(self.scenes)
+
+    def save(self, name, scene):
+        name = (name or '').strip()
+        if not name:
+            return {"success": False, "message": "Scene name required"}
+        devices = (scene or {}).get("devices")
+        if not devices or not isinstance(devices, dict):
+            return {"success": False, "message": "Scene needs at least one device"}
+        zone = scene.get("zone")
+        if zone and (not zone.get("master") or not zone.get("members")):
+            return {"success": False, "message": "Zone needs a master and members"}
+        with self._lock:
+            self.scenes[name] = {"zone": zone or None, "devices": devices}
+            self._save()
+            return {"success": True, "scenes": dict(self.scenes)}
+
+    def delete(self, name):
+        with self._lock:
+            if self.scenes.pop(name, None) is None:
+                return {"success": False, "message": "Scene not found"}
+            self._save()
+            return {"success": True, "scenes": dict(self.scenes)}
+
+    def apply(self, name):
+        """
+        Sets all volumes and starts playback concurrently. The zone is built
+        once the master's playback has been started, so the members join the
+        new source instead of whatever the master played before. Commands to
+        the same speaker still run one after another (the manager locks per
+        device). Returns per-step results with timings.
+        """
+        with self._lock:
+            scene = self.scenes.get(name)
+        if not scene:
+            return {"success": False, "message": "Scene not found"}
+
+        started = time.time()
+        zone = scene.get("zone")
+        followers = set(zone["members"]) - {zone["master"]} if zone else set()
+
+        # Each chain runs its steps in order; the chains run concurrently
+        chains = []
+        master_chain = []
+        for device_id, settings in scene["devices"].items():
+            if settings.get("volume") is not None:
+                chains.append([("volume", device_id,
+                                lambda d=device_id, v=settings["volume"]: self.manager.set_volume(d, v))])
+            if device_id not in followers:
+                play = self._playback(device_id, settings)
+                if play:
+                    chain = [("play", device_id, play)]
+                    if zone and device_id == zone["master"]:
+                        master_chain = chain
+                    chains.append(chain)
+        if zone:
+            master_chain.append(("zone", zone["master"],
+                                 lambda: self.manager.create_zone(zone["master"], [m for m in zone["members"] if m != zone["master"]])))
+            if len(master_chain) == 1:
+                chains.append(master_chain)
+
+        def run(step, device_id, fn):
+            step_started = time.time()
+            try:
+                result = fn() or {"success": True}
+            except Exception as e:
+                print(f"Scene {name}: {step} on {device_id} failed: {e}")
+                result = {"success": False, "message": str(e)}
+            return {"step": step, "device_id": device_id, "success": bool(result.get("success")),
+                    "message": result.get("message"),
+                    "started_ms": int((step_started - started) * 1000),
+                    "ms": int((time.time() - step_started) * 1000)}
+
+        futures = [self._executor.submit(lambda chain=chain: [run(*step) for step in chain]) for chain in chains]
+        results = [result for future in futures for result in future.result()]
+        return {
+            "success": all(r["success"] for r in results),
+            "steps": results,
+            "ms": int((time.time() - started) * 1000),
+        }
+
+    def _playback(self, device_id, settings):
+        """The manager call that starts this device's content, or None."""
+        manager = self.manager
+        if "favorite" in settings:
+            fav = self._find_favorite(settings["favorite"])
+            if not fav:
+                return lambda: {"success": False, "message": f"Favorite not found: {settings['favorite']}"}
+            if fav.get("type") == "tunein" and fav.get("guide_id"):
+                return lambda: manager.play_tunein(device_id, fav["guide_id"], fav.get("name", "Station"))
+            return lambda: manager.play_url(device_id, fav.get("url"), fav.get("name", "Stream"))
+        if settings.get("guide_id"):
+            return lambda: manager.play_tunein(device_id, settings["guide_id"], settings.get("name", "Station"))
+        if settings.get("url"):
+            return lambda: manager.play_url(device_id, settings["url"], settings.get("name", "Stream"))
+        if settings.get("preset"):
+            return lambda: manager.select_preset(device_id, settings["preset"])
+        if settings.get("source"):
+            return lambda: manager.select_source(device_id, settings["source"])
+        return None
+
+    def _find_favorite(self, ref):
+        favorites = self.manager.get_favorites_list()
+        if isinstance(ref, int):
+            return favorites[ref] if 0 <= ref < len(favorites) else None
+        for fav in favorites:
+            if fav.get("id") == ref:
+                return fav
+        for fav in favorites:
+            if fav.get("name") == ref:
+                return fav
+        return None
@@ -1,37 +1,166 @@
+import asyncio
+import contextlib
+import functools
 import json
 import os
 import threading
 import time
-import requests
-from bosesoundtouchapi import SoundTouchDevice, SoundTouchClient, SoundTouchDiscovery, SoundTouchKeys
-from bosesoundtouchapi.models import ContentItem, KeyStates
+from concurrent.futures import ThreadPoolExecutor
+from async_device import AsyncHttp, AsyncSoundTouchClient, DeviceLoop
+from cache import TTLCache
+from device_events import DeviceEventListener
+from discovery import DiscoveryService
+from device_state import DeviceStateStore
+from http_pool import HttpPool
+from reachability import ReachabilityTracker
+from station_search import normalize_name
+from suggest import SuggestIndex
+from storage import FavoritesStore, JsonStore, atomic_write_json, read_json
 
 # Path to store favorites - Support Home Assistant persistent storage
 DATA_DIR = "/data" if os.path.exists("/data") else "."
 FAVORITES_FILE = os.path.join(DATA_DIR, "favorites.json")
 KNOWN_DEVICES_FILE = os.path.join(DATA_DIR, "known_devices.json")
+GROUPS_FILE = os.path.join(DATA_DIR, "device_groups.json")
+# Last known device list, shown right after a restart while the speakers are re-checked.
+# Rewritten when a device's name, presets, zone or groups change, and at least every SNAPSHOT_MAX_AGE seconds
+SNAPSHOT_FILE = os.path.join(DATA_DIR, "device_snapshot.json")
+SNAPSHOT_MAX_AGE = float(os.environ.get("SNAPSHOT_MAX_AGE", 3600))
+# Favorites and known devices are written this many seconds after the last change
+# (bursts are coalesced into one atomic write)
+STORAGE_WRITE_DELAY = float(os.environ.get("STORAGE_WRITE_DELAY", 2))
 
-class CustomContentItem(ContentItem):
-    """ContentItem subclass that injects mimeType into the XML request."""
-    def __init__(self, mimeType=None, **kwargs):
-        super().__init__(**kwargs)
-        self._mimeType = mimeType
+# Seconds between background status refreshes (see start_status_poller)
+STATUS_POLL_INTERVAL = float(os.environ.get("STATUS_POLL_INTERVAL", 2))
+# Push notifications via the speakers' WebSocket; polling is only the fallback
+DEVICE_EVENTS_ENABLED = os.environ.get("DEVICE_EVENTS", "1") != "0"
+# Even with a live socket, re-poll a device this often (seconds) to correct any drift
+EVENT_RESYNC_INTERVAL = float(os.environ.get("EVENT_RESYNC_INTERVAL", 300))
+# Max status queries in flight across all speakers, and requests per speaker on the
+# async device loop (small speakers choke on more)
+STATUS_CONCURRENCY = int(os.environ.get("STATUS_CONCURRENCY", 8))
+DEVICE_CONCURRENCY = int(os.environ.get("DEVICE_CONCURRENCY", 2))
+# Seconds a whole status build may take before slow calls are given up on
+STATUS_CALL_TIMEOUT = float(os.environ.get("STATUS_CALL_TIMEOUT", 4))
+# Slow-changing device data is cached between polls; our own commands and device
+# notifications invalidate it early (seconds)
+SLOW_DATA_TTL = float(os.environ.get("SLOW_DATA_TTL", 3600))
+ZONE_CACHE_TTL = float(os.environ.get("ZONE_CACHE_TTL", 30))
+# Connect timeout (seconds) when contacting a device for the first time
+DEVICE_CONNECT_TIMEOUT = float(os.environ.get("DEVICE_CONNECT_TIMEOUT", 5))
+# Keep-alive settings for speaker HTTP traffic (API on 8090, DLNA on 8091); the pool size
+# applies to the bosesoundtouchapi calls that don't go through the async client
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 4))
+HTTP_IDLE_TIMEOUT = float(os.environ.get("HTTP_IDLE_TIMEOUT", 120))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 3))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", 10))
+# Longest a call waits for a free keep-alive connection to a speaker (seconds)
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", 10))
+# play_url remembers where a stream redirects to and which playback strategy
+# worked for it on each device model (seconds); failures forget both
+RESOLVED_URL_TTL = float(os.environ.get("RESOLVED_URL_TTL", 3600))
+PLAY_STRATEGY_TTL = float(os.environ.get("PLAY_STRATEGY_TTL", 7 * 86400))
+# play_tunein confirmation: seconds to wait for the TUNEIN source per attempt and
+# for a wake from standby, and the polling interval range used without push events
+PLAY_CONFIRM_TIMEOUT = float(os.environ.get("PLAY_CONFIRM_TIMEOUT", 4))
+PLAY_WAKE_TIMEOUT = float(os.environ.get("PLAY_WAKE_TIMEOUT", 6))
+PLAY_POLL_MIN = 0.2
+PLAY_POLL_MAX = 1.0
+# Commands sent to several speakers at once (zone teardown), and how long to wait
+# for a zone change to show up (seconds)
+COMMAND_CONCURRENCY = int(os.environ.get("COMMAND_CONCURRENCY", 8))
+ZONE_CONFIRM_TIMEOUT = float(os.environ.get("ZONE_CONFIRM_TIMEOUT", 5))
+# Discovery: an optional network (e.g. "192.168.1.0/24") whose addresses are probed on
+# port 8090 during a scan, and the time limit for that sweep
+DISCOVERY_CIDR = os.environ.get("DISCOVERY_CIDR") or None
+DISCOVERY_SWEEP_DEADLINE = float(os.environ.get("DISCOVERY_SWEEP_DEADLINE", 10))
+DISCOVERY_MDNS = os.environ.get("DISCOVERY_MDNS", "1") != "0"
+# Recently played stream titles offered as suggestions
+RECENT_TITLES = int(os.environ.get("RECENT_TITLES", 20))
 
-    def ToElement(self, isRequestBody=False):
-        root = super().ToElement(isRequestBody)
-        if self._mimeType:
-            root.set('mimeType', self._mimeType)
-        return root
+def _custom_content_item():
+    from bosesoundtouchapi.models import ContentItem
+
+    class CustomContentItem(ContentItem):
+        """ContentItem subclass that injects mimeType into the XML request."""
+        def __init__(self, mimeType=None, **kwargs):
+            super().__init__(**kwargs)
+            self._mimeType = mimeType
+
+        def ToElement(self, isRequestBody=False):
+            root = super().ToElement(isRequestBody)
+            if self._mimeType:
+                root.set('mimeType', self._mimeType)
+            return root
+    return CustomContentItem
+
+def __getattr__(name):
+    # bosesoundtouchapi is slow to import, so the ContentItem subclass is only built on first use
+    if name == "CustomContentItem":
+        globals()[name] = _custom_content_item()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _refreshes_status(method):
+    """Wakes the status poller after a command so the snapshot catches up quickly."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.request_refresh()
+        return result
+    return wrapper
 
 class SoundTouchManager:
     def __init__(self):
         self.devices = {} # Mapping of DeviceID to SoundTouchClient object (not Device)
-        self.favorites = self.load_favorites()
-        self.lock = threading.Lock()
+        self.favorites_store = FavoritesStore(FAVORITES_FILE, STORAGE_WRITE_DELAY)
+        self.groups = self.load_groups() # device_id -> list of group tags ("downstairs", "kids", ...)
+        self.lock = threading.Lock() # Guards self.devices only - see _device_lock()
+        self._device_locks = {}      # device_id -> RLock serializing commands to that device
+        # Status polling and the common commands run as coroutines on one loop thread
+        self.aio = DeviceLoop()
+        self.aio_http = AsyncHttp(per_host=DEVICE_CONCURRENCY, connect_timeout=HTTP_CONNECT_TIMEOUT,
+                                  read_timeout=HTTP_READ_TIMEOUT, idle_timeout=HTTP_IDLE_TIMEOUT)
+        self._async_clients = {}     # host -> AsyncSoundTouchClient
+        self._slow_cache = TTLCache(SLOW_DATA_TTL) # (device_id, kind) -> presets / zone / audio_caps
+        self._resolved_urls = TTLCache(RESOLVED_URL_TTL, maxsize=256) # stream url -> url after redirects
+        self._play_strategies = TTLCache(PLAY_STRATEGY_TTL, maxsize=512) # (device model, url) -> (strategy, url)
+        # Unreachable IPs are re-probed in the background with exponential backoff
+        self.reachability = ReachabilityTracker()
+        self._probe_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="probe")
+        self._command_pool = ThreadPoolExecutor(max_workers=COMMAND_CONCURRENCY, thread_name_prefix="command")
+        self.http = HttpPool(pool_size=HTTP_POOL_SIZE, idle_timeout=HTTP_IDLE_TIMEOUT,
+                             connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                             pool_timeout=HTTP_POOL_TIMEOUT)
         self._stream_titles = {}  # Cache: device_id -> last played stream title
+        self._recent_titles = []  # Last RECENT_TITLES stream titles, newest first, for suggestions
+        # Typeahead over favorites, presets and recent titles (see /api/suggest)
+        self.suggestions = SuggestIndex()
+        self._index_favorites()
+
+        # Background status snapshot served by get_devices_status()
+        self.state = DeviceStateStore()
+        self._refresh_event = threading.Event()
+        self._poller_thread = None
+        self._listeners = {}      # device_id -> DeviceEventListener
+        self._last_full_poll = {} # device_id -> time of last full status query
         
         # Pre-load known devices from file
+        self._known_store = JsonStore(KNOWN_DEVICES_FILE, STORAGE_WRITE_DELAY)
+        self._known_lock = threading.Lock() # Discovery threads update the list concurrently
         self.known_ips = self.load_known_devices()
+        self.discovery = DiscoveryService(
+            self._check_discovered,
+            lambda: [d.get('ip') if isinstance(d, dict) else d for d in self.known_ips],
+            cidr=DISCOVERY_CIDR, sweep_deadline=DISCOVERY_SWEEP_DEADLINE, mdns=DISCOVERY_MDNS)
+
+        # Warm start: the last snapshot is served until each device has been re-checked
+        self._snapshot_store = JsonStore(SNAPSHOT_FILE, STORAGE_WRITE_DELAY)
+        self._snapshot = {}       # ip -> {"status", "last_seen", "audio_caps"}
+        self._snapshot_key = None # What the saved snapshot was built from; unchanged -> no write
+        self._snapshot_saved = 0
+        self._warm = {}           # ip -> status from the snapshot, until the device is probed
+        self.load_snapshot()
 
     def load_known_devices(self):
         devices = []
@@ -52,102 +181,120 @@ class SoundTouchManager:
             except Exception as e:
                 print(f"Error loading known devices: {e}")
         
-        # Default fallback if no file exists
-        print("No known devices file found. Using defaults.")
-        # Default objects
-        defaults = [
-            {"ip": "192.168.1.103", "name": "SoundTouch 103"},
-            {"ip": "192.168.1.105", "name": "SoundTouch 105"},
-            {"ip": "192.168.1.104", "name": "SoundTouch 104"}
-        ]
-        
-        # Create the file immediately
-        self.save_known_devices(defaults)
-            
-        return defaults
+        # No file yet: speakers are found by discovery or added by IP
+        print("No known devices file found.")
+        return devices
+
+    def load_snapshot(self):
+        """Loads the last device snapshot into the state store, marked as stale."""
+        data = read_json(SNAPSHOT_FILE, {})
+        entries = data.get("devices", []) if isinstance(data, dict) else []
+        status_list = []
+        for entry in entries:
+            status = entry.get("status") or {}
+            ip = status.get("ip")
+            if not ip or not status.get("id"):
+                continue
+            self._snapshot[ip] = entry
+            if entry.get("audio_caps"):
+                self._slow_cache.set((status["id"], "audio_caps"), entry["audio_caps"])
+            self._warm[ip] = dict(status, is_stale=True)
+            status_list.append(self._warm[ip])
+        if status_list:
+            self.state.replace(status_list)
+            print(f"Warm start: {len(status_list)} devices from the last snapshot")
+
+    def _save_snapshot(self, status_list):
+        """Schedules a snapshot write if devices changed (or the last one is old)."""
+        online = [data for data in status_list if not data.get("is_offline") and not data.get("is_stale")]
+        if not online:
+            return # Keep the last good snapshot while the network (or this host) is down
+        known = {d.get('ip') for d in self.known_ips if isinstance(d, dict)}
+        for data in online:
+            ip = data["ip"]
+            self._snapshot[ip] = {
+                "status": data,
+                "last_seen": self.reachability.last_seen(ip) or time.time(),
+                "audio_caps": self._slow_cache.get((data["id"], "audio_caps")),
+            }
+        for ip in set(self._snapshot) - known:
+            del self._snapshot[ip]
+
+        key = json.dumps([[entry["status"].get(k) for k in ("id", "name", "ip", "type", "presets", "zone", "groups")]
+                          + [entry["audio_caps"]] for ip, entry in sorted(self._snapshot.items())], sort_keys=True)
+        if key == self._snapshot_key and time.time() - self._snapshot_saved < SNAPSHOT_MAX_AGE:
+            return
+        self._snapshot_key = key
+        self._snapshot_saved = time.time()
+        self._snapshot_store.save({"saved": self._snapshot_saved, "devices": list(self._snapshot.values())})
+
+    def _revalidate_known(self):
+        """Re-checks the known devices in the background, most recently seen first."""
+        ips = [d.get('ip') for d in self.known_ips if isinstance(d, dict) and d.get('ip')]
+        last_seen = lambda ip: self._snapshot.get(ip, {}).get("last_seen") or 0
+        for ip in sorted(ips, key=last_seen, reverse=True):
+            self._schedule_probe(ip)
 
     def save_known_devices(self, devices=None):
+        """Schedules a (debounced, atomic) write of the known device list."""
         if devices is None:
             devices = self.known_ips
-            
-        try:
-            with open(KNOWN_DEVICES_FILE, 'w') as f:
-                json.dump(devices, f, indent=4)
-        except Exception as e:
-             print(f"Error saving known devices: {e}")
+        self._known_store.save([dict(d) if isinstance(d, dict) else d for d in devices])
 
     def _update_known_device(self, ip, name):
         """Helper to update or add a device to the known list"""
-        updated = False
-        for dev in self.known_ips:
-            if dev['ip'] == ip:
-                if dev.get('name') != name:
-                    dev['name'] = name
-                    updated = True
-                return # Already exists
-        
-        # If we get here, it's new
-        self.known_ips.append({"ip": ip, "name": name})
-        self.save_known_devices()
+        with self._known_lock:
+            for dev in self.known_ips:
+                if dev['ip'] == ip:
+                    if dev.get('name') != name:
+                        dev['name'] = name
+                        self.save_known_devices()
+                    return # Already exists
+            
+            # If we get here, it's new
+            self.known_ips.append({"ip": ip, "name": name})
+            self.save_known_devices()
 
-    def discover_devices(self):
+    def discover_devices(self, wait=True):
         """
-        Discovers SoundTouch devices on the network.
-        Now uses parallel execution for known IPs to speed up startup.
+        Runs a discovery scan (known IPs, mDNS, optional DISCOVERY_CIDR sweep),
+        or joins the one already running. Returns (started, scan status).
         """
-        # Manual add in parallel
-        from concurrent.futures import ThreadPoolExecutor
-        
-        def try_add(device_info):
-            ip = device_info.get('ip') if isinstance(device_info, dict) else device_info
-            try:
-                self.add_device(ip)
-            except:
-                pass
-
-        # Use threads to check all IPs at once
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            executor.map(try_add, self.known_ips)
-
-        # Auto discovery (MDNS)
-        try:
-            print("Starting auto-discovery...")
-            discovery = SoundTouchDiscovery(areDevicesVerified=True)
-            time.sleep(1) 
-            
-            for device in discovery.VerifiedDevices.values():
-                try:
-                    if device.DeviceId not in self.devices:
-                        client = SoundTouchClient(device)
-                        with self.lock:
-                            self.devices[device.DeviceId] = client
-                        print(f"Auto-discovered: {device.DeviceName} ({device.Host})")
-                        
-                        # Update known list
-                        self._update_known_device(device.Host, device.DeviceName)
+        return self.discovery.scan(wait=wait)
 
-                except Exception as e:
-                    print(f"Error processing discovered device: {e}")
-                    
-        except Exception as e:
-            print(f"Auto-discovery failed: {e}")
+    def start_discovery(self):
+        """Starts the persistent mDNS browser, so speakers are added as they appear."""
+        # zeroconf is slow to import and set up; don't hold up the web server for it
+        thread = threading.Thread(target=self.discovery.start_browser, name="mdns-start")
+        thread.daemon = True
+        thread.start()
 
-        return self.get_devices_status()
+    def _check_discovered(self, ip):
+        """Registers the speaker at `ip` unless it already is; True if it is a speaker."""
+        with self.lock:
+            if any(client.Device.Host == ip for client in self.devices.values()):
+                return True
+        return self.add_device(ip).get("success", False)
 
     def add_device(self, ip_address):
         """
         Manually adds a device by IP address.
         """
+        from bosesoundtouchapi import SoundTouchClient, SoundTouchDevice
         try:
-            device = SoundTouchDevice(ip_address)
-            client = SoundTouchClient(device)
+            # SoundTouchDevice ignores connectTimeout when given a pool, so the pool view carries it
+            device = SoundTouchDevice(ip_address, connectTimeout=DEVICE_CONNECT_TIMEOUT,
+                                      proxyManager=self.http.with_timeout(DEVICE_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+            client = SoundTouchClient(device, manager=self.http)
             # Verify connectivity by getting info
             if device.DeviceName:
                 with self.lock:
                     self.devices[device.DeviceId] = client
+                self._start_listener(client)
                 
                 # Update known list
                 self._update_known_device(ip_address, device.DeviceName)
+                self.request_refresh()
 
                 return {"success": True, "message": f"Added {device.DeviceName}", "device": self._serialize_client(client)}
         except Exception as e:
@@ -155,112 +302,358 @@ class SoundTouchManager:
             return {"success": False, "message": str(e)}
         return {"success": False, "message": "Could not add device"}
 
+    # --- Locking ---
+    # self.lock only guards the devices dict. Commands hold the lock of the
+    # device they talk to, so a slow command in one room never blocks another.
+    def _get_client(self, device_id):
+        with self.lock:
+            return self.devices.get(device_id)
+
+    def _device_lock(self, device_id):
+        with self.lock:
+            lock = self._device_locks.get(device_id)
+            if lock is None:
+                lock = self._device_locks[device_id] = threading.RLock()
+            return lock
+
+    def _invalidate_zones(self):
+        """Zone changes touch every member, so drop all cached zone states."""
+        self._slow_cache.invalidate_where(lambda key: key[1] == "zone")
+
+    @contextlib.contextmanager
+    def _devices_locked(self, device_ids):
+        """Holds the locks of several devices, always acquired in sorted order to avoid deadlocks."""
+        locks = [self._device_lock(d) for d in sorted(set(device_ids))]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    # --- Status snapshot ---
+    def start_status_poller(self, interval=STATUS_POLL_INTERVAL):
+        """
+        Starts the background thread that keeps self.state up to date.
+        Device traffic is fixed by the interval, no matter how many clients read the snapshot.
+        """
+        if self._poller_thread and self._poller_thread.is_alive():
+            return
+        self._revalidate_known()
+        self._poller_thread = threading.Thread(target=self._poll_loop, args=(interval,), name="status-poller")
+        self._poller_thread.daemon = True
+        self._poller_thread.start()
+
+    def _poll_loop(self, interval):
+        while True:
+            try:
+                self.refresh_status()
+            except Exception as e:
+                print(f"Status refresh error: {e}")
+            # Sleep until the next tick, or until a command asks for an early refresh
+            self._refresh_event.wait(interval)
+            self._refresh_event.clear()
+
+    def request_refresh(self):
+        """Asks the poller to rebuild the snapshot now instead of at the next tick."""
+        self._refresh_event.set()
+
     def get_devices_status(self):
         """
         Returns a list of devices and their current status, including offline known devices.
+        Served from the in-memory snapshot once the poller is running.
+        """
+        if self._poller_thread and self._poller_thread.is_alive():
+            return self.state.snapshot()
+        return self.refresh_status()
+
+    def refresh_status(self):
+        """
+        Queries every device and stores the result in the status snapshot.
         """
         status_list = []
         active_ids = set()
 
         with self.lock:
-            # 1. Add active devices
-            for device_id, client in self.devices.items():
+            clients = list(self.devices.items())
+
+        # 1. Add active devices - everything that needs a query is fetched in one concurrent batch
+        cached = {}
+        to_poll = []
+        for device_id, client in clients:
+            if not self.reachability.is_due(client.Device.Host):
+                continue # Failed recently - listed as offline until its backoff expires
+            data = self._cached_if_pushed(device_id)
+            if data is None and self._device_busy(device_id):
+                # A command is running on this device - keep its last known state for now
+                data = self.state.get(device_id)
+            if data is None:
+                to_poll.append((device_id, client))
+            else:
+                cached[device_id] = data
+
+        parts = self._fetch_status_parts(to_poll)
+        for device_id, client in clients:
+            host = client.Device.Host
+            data = cached.get(device_id)
+            if data is None:
+                if device_id not in parts:
+                    continue
                 try:
-                    data = self._serialize_client(client)
-                    status_list.append(data)
-                    active_ids.add(client.Device.Host) # Use IP to match with known list
+                    data = self._build_status(client, parts[device_id])
+                    self._last_full_poll[device_id] = time.time()
+                    self.reachability.record_success(host)
                 except Exception:
-                   pass
-            
-            # 2. Add offline known devices
-            for known in self.known_ips:
-                # known is now a dict {'ip': ..., 'name': ...}
-                if isinstance(known, dict):
-                    ip = known.get('ip')
-                    name = known.get('name', 'Unknown')
-                    if ip and ip not in active_ids:
-                        # Try to check if it's actually alive by connecting directly
-                        try:
-                            # Quick check
-                            test_client = SoundTouchDevice(ip)
-                            status = test_client.status() # If this works, it's online!
-                            
-                            # Add as online device
-                            status_list.append({
-                                "id": test_client.config.deviceID,
-                                "name": test_client.config.name,
-                                "ip": ip,
-                                "type": test_client.config.type,
-                                "volume": 0, # Could fetch volume but keep it simple
-                                "muted": False,
-                                "playing": "STANDBY" if status.source == "STANDBY" else "PLAY_STATE",
-                                "is_offline": False,
-                                "now_playing": {
-                                    # Basic info since we didn't do full fetch
-                                    "track": "Bereit zur Wiedergabe", 
-                                    "artist": status.source,
-                                    "album": "",
-                                    "art": None
-                                },
-                                "zone": None
-                            })
-                            active_ids.add(test_client.config.deviceID) # Mark as found 
-                            continue # Skip adding as offline
-                        except Exception:
-                            # Really offline
-                            pass
-
-                        status_list.append({
-                            "id": f"offline-{ip}", # specific ID for offline
-                            "name": name,
-                            "ip": ip,
-                            "type": "Offline",
-                            "volume": 0,
-                            "muted": True,
-                            "playing": "OFFLINE",
-                            "is_offline": True,
-                            "now_playing": {
-                                "track": "Nicht erreichbar",
-                                "artist": "",
-                                "album": "",
-                                "art": None
-                            },
-                            "zone": None
-                        })
+                    self.reachability.record_failure(host)
+                    continue
+            status_list.append(data)
+            active_ids.add(host) # Use IP to match with known list
         
+        # 2. Add offline known devices - they are re-probed in the background, never inline
+        for known in self.known_ips:
+            # known is now a dict {'ip': ..., 'name': ...}
+            if isinstance(known, dict):
+                ip = known.get('ip')
+                name = known.get('name', 'Unknown')
+                if ip and ip not in active_ids:
+                    self._schedule_probe(ip)
+                    if ip in self._warm:
+                        status_list.append(self._warm[ip]) # Not re-checked yet since the restart
+                        continue
+                    status_list.append({
+                        "id": f"offline-{ip}", # specific ID for offline
+                        "name": name,
+                        "ip": ip,
+                        "type": "Offline",
+                        "volume": 0,
+                        "muted": True,
+                        "playing": "OFFLINE",
+                        "is_offline": True,
+                        "now_playing": {
+                            "track": "Nicht erreichbar",
+                            "artist": "",
+                            "album": "",
+                            "art": None
+                        },
+                        "zone": None
+                    })
+    
+        self.state.replace(status_list)
+        self._save_snapshot(status_list)
+        self._prune_preset_suggestions({data["id"] for data in status_list})
         return status_list
 
+    def _prune_preset_suggestions(self, device_ids):
+        """Drops the suggested presets of devices that are no longer online."""
+        for group in self.suggestions.groups():
+            if isinstance(group, tuple) and group[0] == "preset" and group[1] not in device_ids:
+                self.suggestions.set_group(group, [])
+
+    def _schedule_probe(self, ip):
+        """Probes an unreachable IP in the background if its backoff has expired."""
+        if self.reachability.try_begin_probe(ip):
+            self._probe_pool.submit(self._probe_ip, ip)
+
+    def _probe_ip(self, ip):
+        success = False
+        try:
+            # add_device registers the client, starts its listener and refreshes the snapshot
+            success = self.add_device(ip).get("success", False)
+        finally:
+            self._warm.pop(ip, None)
+            self.reachability.end_probe(ip, success)
+            if not success:
+                print(f"Device {ip} still unreachable, retrying later")
+
+    def _device_busy(self, device_id):
+        lock = self._device_lock(device_id)
+        if lock.acquire(blocking=False):
+            lock.release()
+            return False
+        return True
+
+    def _async_client(self, host):
+        with self.lock:
+            client = self._async_clients.get(host)
+            if client is None:
+                client = self._async_clients[host] = AsyncSoundTouchClient(self.aio_http, host)
+            return client
+
+    def _run_async(self, coro, requests=1):
+        """
+        Runs a device coroutine on the device loop and returns its result (sync wrapper).
+        `requests` is how many HTTP requests the coroutine makes one after another; each
+        gets the full connect + read budget. On timeout the coroutine is cancelled, so it
+        can't land after the caller has given up.
+        """
+        return self.aio.run(coro, timeout=requests * (HTTP_CONNECT_TIMEOUT + HTTP_READ_TIMEOUT))
+
+    def _key(self, client, key, state="both"):
+        """Sends a remote key press (SoundTouchKeys) through the async client."""
+        # "both" is a press and a release: two requests
+        self._run_async(self._async_client(client.Device.Host).key(key.value, state),
+                        requests=2 if state == "both" else 1)
+
+    def _now_playing(self, client):
+        return self._run_async(self._async_client(client.Device.Host).now_playing())
+
+    def _fetch_status_parts(self, clients):
+        """
+        Issues the status queries of all given (device_id, client) pairs concurrently as
+        coroutines on the device loop (at most DEVICE_CONCURRENCY per speaker and
+        STATUS_CONCURRENCY in total). The whole batch shares one STATUS_CALL_TIMEOUT
+        deadline, so it takes about as long as the slowest call instead of the sum of all calls.
+        Presets and zone come from the slow-data cache when possible, so a steady-state
+        poll only queries now playing and volume.
+        Returns device_id -> {part: result or Exception}.
+        """
+        calls = {
+            "status": lambda c: c.now_playing(),
+            "volume": lambda c: c.volume(),
+            "zone": lambda c: c.zone(),
+            "presets": lambda c: c.presets(),
+        }
+        cached_parts = {"zone": ZONE_CACHE_TTL, "presets": SLOW_DATA_TTL}
+        results = {device_id: {} for device_id, _ in clients}
+        pending = []
+        for device_id, client in clients:
+            async_client = self._async_client(client.Device.Host)
+            for part, call in calls.items():
+                if part in cached_parts:
+                    hit = self._slow_cache.get((device_id, part))
+                    if hit is not None:
+                        results[device_id][part] = hit
+                        continue
+                pending.append((device_id, part, functools.partial(call, async_client)))
+
+        async def fetch_all():
+            limit = asyncio.Semaphore(STATUS_CONCURRENCY)
+
+            async def limited(call):
+                async with limit:
+                    return await call()
+
+            return await asyncio.gather(
+                *(asyncio.wait_for(limited(call), STATUS_CALL_TIMEOUT) for _, _, call in pending),
+                return_exceptions=True)
+
+        try:
+            values = self.aio.run(fetch_all(), timeout=STATUS_CALL_TIMEOUT + 1)
+        except Exception as e:
+            values = [e] * len(pending)
+        for (device_id, part, _), value in zip(pending, values):
+            results[device_id][part] = value
+            if part in cached_parts and value is not None and not isinstance(value, BaseException):
+                self._slow_cache.set((device_id, part), value, cached_parts[part])
+        return results
+
+    # --- Push notifications ---
+    def _start_listener(self, client):
+        """Opens the notification socket for a device (no-op if already listening)."""
+        if not DEVICE_EVENTS_ENABLED:
+            return
+        device_id = client.Device.DeviceId
+        listener = self._listeners.get(device_id)
+        if listener and listener.client is client:
+            return
+        if listener:
+            listener.stop()
+        listener = DeviceEventListener(client, self._on_device_event, self._on_listener_connection)
+        self._listeners[device_id] = listener
+        listener.start()
+
+    def _cached_if_pushed(self, device_id):
+        """
+        Returns the cached status of a device whose event socket is live and
+        recently resynced, or None if it has to be polled.
+        """
+        listener = self._listeners.get(device_id)
+        if not listener or not listener.connected:
+            return None
+        if time.time() - self._last_full_poll.get(device_id, 0) > EVENT_RESYNC_INTERVAL:
+            return None
+        return self.state.get(device_id)
+
+    def _on_listener_connection(self, client, connected):
+        # Events may have been missed while the socket was down - resync once
+        device_id = client.Device.DeviceId
+        self._last_full_poll.pop(device_id, None)
+        self._slow_cache.invalidate_where(lambda key: key[0] == device_id)
+        self.request_refresh()
+
+    def _on_device_event(self, client, category, event):
+        """Applies one notification to the cached device state."""
+        from bosesoundtouchapi.models import NowPlayingStatus, PresetList, Volume, Zone
+        device_id = client.Device.DeviceId
+        if len(event) == 0:
+            return
+        payload = event[0]
+
+        if category == 'nowPlayingUpdated':
+            fields = self._now_playing_fields(client.Device, NowPlayingStatus(root=payload))
+        elif category == 'volumeUpdated':
+            fields = self._volume_fields(Volume(root=payload))
+        elif category == 'zoneUpdated':
+            zone = Zone(root=payload)
+            self._slow_cache.set((device_id, "zone"), zone, ZONE_CACHE_TTL)
+            fields = {"zone": self._get_zone_info(zone)}
+        elif category == 'presetsUpdated':
+            preset_list = PresetList(root=payload)
+            self._slow_cache.set((device_id, "presets"), preset_list)
+            fields = {"presets": self._serialize_presets(device_id, preset_list)}
+        else:
+            return
+        self.state.update(device_id, fields)
+
     def delete_known_device(self, ip):
         """Removes a device from the known list"""
-        initial_len = len(self.known_ips)
-        self.known_ips = [d for d in self.known_ips if (d.get('ip') if isinstance(d, dict) else d) != ip]
+        with self._known_lock:
+            initial_len = len(self.known_ips)
+            self.known_ips = [d for d in self.known_ips if (d.get('ip') if isinstance(d, dict) else d) != ip]
+            removed = len(self.known_ips) < initial_len
+            if removed:
+                self.save_known_devices()
         
-        if len(self.known_ips) < initial_len:
-            self.save_known_devices()
+        if removed:
+            self.reachability.forget(ip)
+            self.request_refresh()
             return {"success": True, "message": f"Removed {ip}"}
         return {"success": False, "message": "Device not found in known list"}
 
-    def _serialize_client(self, client: SoundTouchClient):
+    def _serialize_client(self, client):
+        parts = self._fetch_status_parts([(client.Device.DeviceId, client)])
+        return self._build_status(client, parts[client.Device.DeviceId])
+
+    def _build_status(self, client, parts):
+        """Assembles the status dict from the results of _fetch_status_parts()."""
         device = client.Device
-        status = client.GetNowPlayingStatus() # Fetch latest status
-        volume = client.GetVolume()
-        zone = client.GetZoneStatus(refresh=True)
+        for part in ("status", "volume", "zone"):
+            if isinstance(parts[part], Exception):
+                raise parts[part]
+        status = parts["status"]
+        volume = parts["volume"]
+        zone = parts["zone"]
         
-        # Fetch presets
+        # Presets are optional - a failed fetch just shows none
         presets = []
-        try:
-             preset_list = client.GetPresetList()
-             if preset_list:
-                 for p in preset_list:
-                     presets.append({
-                         "id": p.PresetId,
-                         "name": p.ContentItem.Name,
-                         "source": p.ContentItem.Source,
-                         "art": p.ContentItem.ContainerArt  # Extract artwork URL
-                     })
-        except Exception:
-            pass
+        if not isinstance(parts["presets"], Exception):
+            presets = self._serialize_presets(device.DeviceId, parts["presets"])
         
+        data = {
+            "id": device.DeviceId,
+            "name": device.DeviceName,
+            "ip": device.Host, 
+            "type": device.DeviceType,
+        }
+        data.update(self._now_playing_fields(device, status))
+        data.update(self._volume_fields(volume))
+        data["zone"] = self._get_zone_info(zone)
+        data["presets"] = presets
+        data["groups"] = self.groups.get(device.DeviceId, [])
+        return data
+
+    def _now_playing_fields(self, device, status):
         track = status.Track
         artist = status.Artist
         album = status.Album
@@ -286,24 +679,53 @@ class SoundTouchManager:
                 play_status = 'PLAY_STATE'
         
         return {
-            "id": device.DeviceId,
-            "name": device.DeviceName,
-            "ip": device.Host, 
-            "type": device.DeviceType,
             "source": status.Source, # Added source field
-            "volume": volume.Actual if volume else 0,
-            "muted": volume.IsMuted if volume else False,
             "playing": play_status, 
             "now_playing": {
                 "track": track,
                 "artist": artist,
                 "album": album,
-                "art": image
+                "art": image,
+                "location": ci.Location if ci else None,  # e.g. /v1/playback/station/s24862 for TuneIn
             },
-            "zone": self._get_zone_info(zone),
-            "presets": presets
         }
 
+    def _volume_fields(self, volume):
+        return {
+            "volume": volume.Actual if volume else 0,
+            "muted": volume.IsMuted if volume else False,
+        }
+
+    def _serialize_presets(self, device_id, preset_list):
+        presets = []
+        if preset_list:
+            for p in preset_list:
+                presets.append({
+                    "id": p.PresetId,
+                    "name": p.ContentItem.Name,
+                    "source": p.ContentItem.Source,
+                    "art": p.ContentItem.ContainerArt  # Extract artwork URL
+                })
+        # Unchanged presets (the usual case on every poll) don't touch the index
+        self.suggestions.set_group(("preset", device_id), [
+            {"key": p["id"], "kind": "preset", "name": p["name"], "device_id": device_id,
+             "preset_id": p["id"], "image": p["art"]}
+            for p in presets])
+        return presets
+
+    def _remember_title(self, device_id, title):
+        """Caches the title of a stream we started, for now playing and for suggestions."""
+        self._stream_titles[device_id] = title
+        self._recent_titles = ([title] + [t for t in self._recent_titles if t != title])[:RECENT_TITLES]
+        self.suggestions.set_group("recent", [{"kind": "recent", "name": t} for t in self._recent_titles])
+
+    def _index_favorites(self):
+        self.suggestions.set_group("favorite", [
+            {"key": fav["id"], "kind": "favorite", "name": fav.get("name"), "id": fav["id"],
+             "url": fav.get("url"), "type": fav.get("type"), "guide_id": fav.get("guide_id"),
+             "image": fav.get("image")}
+            for fav in self.favorites])
+
     def _get_zone_info(self, zone):
         if zone and zone.MasterDeviceId:
            return {
@@ -312,107 +734,132 @@ class SoundTouchManager:
            }
         return None
 
+    @_refreshes_status
     def play_url(self, device_id, url, title="Stream"):
-        """Play a URL on a SoundTouch device using direct DLNA SOAP call."""
+        """
+        Play a URL on a SoundTouch device using direct DLNA SOAP call.
+
+        The redirect-resolved URL and the strategy that worked (per device model)
+        are remembered, so replaying a known station goes straight to it.
+        """
         
-        with self.lock:
-            client = self.devices.get(device_id)
-            if not client:
-                return {"success": False, "message": "Device not found"}
-            
-            host = client.Device.Host
-            
-            # Resolve redirects to get the final URL — might give us HTTP from HTTPS
-            resolved_url = url
-            try:
-                resp = requests.get(url, stream=True, timeout=5, allow_redirects=True)
-                resolved_url = resp.url
-                resp.close()
-                if resolved_url != url:
-                    print(f"DEBUG: Resolved URL: {url} -> {resolved_url}")
-            except Exception:
-                pass  # Use original URL
-            
-            # If resolved URL is still HTTPS, try replacing with HTTP
-            # Many radio streams are available on both protocols
-            http_url = resolved_url
-            if resolved_url.startswith("https://"):
-                http_url = "http://" + resolved_url[len("https://"):]
-                print(f"DEBUG: Trying HTTP fallback: {http_url}")
-            
-            # Strategy 1: Direct DLNA SOAP SetAVTransportURI  
-            for try_url in ([http_url, resolved_url] if http_url != resolved_url else [resolved_url]):
-                if not try_url.startswith("http://"):
-                    continue  # DLNA only supports http://
-                try:
-                    dlna_port = 8091  # Standard SoundTouch DLNA port
-                    soap_url = f"http://{host}:{dlna_port}/AVTransport/Control"
-                    
-                    # Escape XML special chars in URL
-                    safe_url = try_url.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-                    
-                    soap_body = f'''<?xml version="1.0" encoding="utf-8"?>
-<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
-  <s:Body>
-    <u:SetAVTransportURI xmlns:u="urn:schemas-upnp-org:service:AVTransport:1">
-      <InstanceID>0</InstanceID>
-      <CurrentURIMetaData></CurrentURIMetaData>
-      <CurrentURI>{safe_url}</CurrentURI>
-    </u:SetAVTransportURI>
-  </s:Body>
-</s:Envelope>'''
-                    
-                    headers = {
-                        "Content-Type": 'text/xml; charset="utf-8"',
-                        "SOAPACTION": "urn:schemas-upnp-org:service:AVTransport:1#SetAVTransportURI",
-                        "HOST": f"{host}:{dlna_port}",
-                    }
-                    
-                    response = requests.post(soap_url, data=soap_body, headers=headers, timeout=5)
-                    
-                    if response.status_code == 200:
-                        print(f"DEBUG: DLNA SOAP success with {try_url}")
-                        self._stream_titles[device_id] = title
-                        return {"success": True}
-                    else:
-                        print(f"DEBUG: DLNA SOAP failed ({response.status_code}) with {try_url}")
-                except Exception as e:
-                    print(f"DEBUG: DLNA SOAP error with {try_url}: {e}")
-            
-            # Strategy 2: TuneIn ContentItem (fallback for HTTPS-only streams)
-            try:
-                ci = ContentItem(
-                    source="TUNEIN",
-                    location=resolved_url,
-                    name=title,
-                    isPresetable=True
-                )
-                client.SelectContentItem(ci)
-                return {"success": True}
-            except Exception as e:
-                print(f"DEBUG: TuneIn ContentItem failed: {e}")
-            
+        client = self._get_client(device_id)
+        if not client:
+            return {"success": False, "message": "Device not found"}
+
+        strategy_key = (client.Device.DeviceType, url)
+        known = self._play_strategies.get(strategy_key)
+        if known:
+            with self._device_lock(device_id):
+                if self._try_play_strategy(client, device_id, known[0], known[1], title):
+                    return {"success": True}
+            print(f"DEBUG: Remembered strategy {known[0]} failed for {url}, starting over")
+            self._play_strategies.invalidate(strategy_key)
+            self._resolved_urls.invalidate(url)
+
+        # Resolve redirects to get the final URL — might give us HTTP from HTTPS
+        # (done before taking the device lock; it doesn't touch the speaker)
+        resolved_url = self._resolve_stream_url(url)
+
+        with self._device_lock(device_id):
+            for kind, target in self._play_candidates(resolved_url):
+                if self._try_play_strategy(client, device_id, kind, target, title):
+                    self._play_strategies.set(strategy_key, (kind, target))
+                    return {"success": True}
+
+            self._resolved_urls.invalidate(url)
             return {"success": False, "message": "Playback failed with all strategies"}
 
+    def _resolve_stream_url(self, url):
+        """Final URL after redirects, cached for RESOLVED_URL_TTL. Falls back to `url`."""
+        resolved_url = self._resolved_urls.get(url)
+        if resolved_url:
+            return resolved_url
+        try:
+            resolved_url = self.http.resolve_redirects(url, timeout=5)
+        except Exception:
+            return url  # Use original URL, and try resolving again next time
+        if resolved_url != url:
+            print(f"DEBUG: Resolved URL: {url} -> {resolved_url}")
+        self._resolved_urls.set(url, resolved_url)
+        return resolved_url
+
+    def _play_candidates(self, resolved_url):
+        """(strategy, url) pairs in the order they are tried."""
+        candidates = []
+        # If resolved URL is still HTTPS, try replacing with HTTP
+        # Many radio streams are available on both protocols
+        if resolved_url.startswith("https://"):
+            http_url = "http://" + resolved_url[len("https://"):]
+            print(f"DEBUG: Trying HTTP fallback: {http_url}")
+            candidates.append(("dlna", http_url))
+        elif resolved_url.startswith("http://"):
+            candidates.append(("dlna", resolved_url))  # DLNA only supports http://
+        # TuneIn ContentItem (fallback for HTTPS-only streams)
+        candidates.append(("content_item", resolved_url))
+        return candidates
+
+    def _try_play_strategy(self, client, device_id, kind, url, title):
+        """Runs one playback strategy; True if the device accepted it. Caller holds the device lock."""
+        if kind == "dlna":
+            if self._play_dlna(client.Device.Host, url):
+                self._remember_title(device_id, title)
+                return True
+            return False
+
+        from bosesoundtouchapi.models import ContentItem
+        try:
+            ci = ContentItem(
+                source="TUNEIN",
+                location=url,
+                name=title,
+                isPresetable=True
+            )
+            client.SelectContentItem(ci)
+            return True
+        except Exception as e:
+            print(f"DEBUG: TuneIn ContentItem failed: {e}")
+            return False
+
+    def _play_dlna(self, host, url):
+        """Direct DLNA SOAP SetAVTransportURI (port 8091) via the async client."""
+        try:
+            if self._run_async(self._async_client(host).dlna_set_uri(url)):
+                print(f"DEBUG: DLNA SOAP success with {url}")
+                return True
+            print(f"DEBUG: DLNA SOAP failed with {url}")
+        except Exception as e:
+            print(f"DEBUG: DLNA SOAP error with {url}: {e}")
+        return False
+
+    @_refreshes_status
     def play_tunein(self, device_id, guide_id, name="Station"):
-        """Play a TuneIn station natively on the SoundTouch device."""
-        with self.lock:
-            client = self.devices.get(device_id)
-            if not client:
-                return {"success": False, "message": "Device not found"}
+        """
+        Play a TuneIn station natively on the SoundTouch device.
+        Returns as soon as the device reports the requested station (see _wait_for_source).
+        """
+        client = self._get_client(device_id)
+        if not client:
+            return {"success": False, "message": "Device not found"}
+
+        from bosesoundtouchapi.models import ContentItem
+        with self._device_lock(device_id):
             
             try:
                 # Wake device if in standby
-                status = client.GetNowPlayingStatus(True)
+                status = self._now_playing(client)
                 if status.Source == 'STANDBY':
                     print(f"DEBUG: Device {device_id} in STANDBY, powering on...")
+                    since = self.state.device_version(device_id)
                     client.PowerOn()
-                    time.sleep(3) # Give it good time to wake up
+                    self._wait_for_source(client, device_id, lambda source, location: source and source != 'STANDBY',
+                                          since, PLAY_WAKE_TIMEOUT)
                 
+                location = f"/v1/playback/station/{guide_id}"
                 ci = ContentItem(
                     source="TUNEIN",
                     typeValue="stationurl",
-                    location=f"/v1/playback/station/{guide_id}",
+                    location=location,
                     sourceAccount="",
                     isPresetable=True,
                     name=name
@@ -421,27 +868,23 @@ class SoundTouchManager:
                 # Retry loop to ensure command is accepted
                 for attempt in range(1, 4):
                     print(f"DEBUG: Selecting ContentItem (attempt {attempt}): {name} ({guide_id})")
+                    since = self.state.device_version(device_id)
                     try:
                         client.SelectContentItem(ci)
                     except Exception as e:
                         print(f"DEBUG: SelectContentItem failed on attempt {attempt}: {e}")
                     
                     # Store title immediately
-                    self._stream_titles[device_id] = name
+                    self._remember_title(device_id, name)
 
-                    # Wait a moment for device to process
-                    time.sleep(1.5)
-                    
-                    # Verify if it worked
-                    status = client.GetNowPlayingStatus(True)
-                    print(f"DEBUG: Check status attempt {attempt}: Source={status.Source}, Track={status.ContentItem.Name if status.ContentItem else 'None'}")
-                    
-                    if status.Source == 'TUNEIN':
+                    # Another TuneIn station may still be playing: wait for this one
+                    if self._wait_for_source(client, device_id,
+                                             lambda source, current: source == 'TUNEIN' and current == location,
+                                             since, PLAY_CONFIRM_TIMEOUT):
                         return {"success": True}
                     
                     if attempt < 3:
-                        print("DEBUG: Source did not switch to TUNEIN, retrying...")
-                        time.sleep(1)
+                        print(f"DEBUG: Device did not switch to TuneIn station {guide_id}, retrying...")
 
                 return {"success": False, "message": "Device did not switch to TuneIn after 3 attempts"}
 
@@ -449,47 +892,155 @@ class SoundTouchManager:
                 print(f"DEBUG: TuneIn play error: {e}")
                 return {"success": False, "message": f"TuneIn playback failed: {str(e)}"}
 
+    def _wait_for_source(self, client, device_id, accept, since_version, timeout):
+        """
+        Waits until accept(source, content location) is true for the device or
+        `timeout` passes. Returns True if that state was seen.
+        """
+        def poll():
+            status = self._now_playing(client)
+            ci = status.ContentItem
+            print(f"DEBUG: Check status: Source={status.Source}, Track={ci.Name if ci else 'None'}")
+            return accept(status.Source, ci.Location if ci else None)
+
+        return self._wait_until(device_id, since_version, timeout,
+                                lambda current: accept(current.get("source"),
+                                                       (current.get("now_playing") or {}).get("location")), poll)
+
+    def _wait_until(self, device_id, since_version, timeout, from_state, poll):
+        """
+        Waits for a device to reach some state after a command.
+
+        A pushed notification newer than `since_version` (the device's state
+        version before the command) for which from_state(status_dict) is true
+        ends the wait at once. Without a live event socket poll() asks the
+        device, every PLAY_POLL_MIN seconds at first and backing off to
+        PLAY_POLL_MAX. Returns True if the state was reached in time.
+        """
+        deadline = time.time() + timeout
+        interval = PLAY_POLL_MIN
+        last_poll = 0
+        while True:
+            seen_version = self.state.version
+            listener = self._listeners.get(device_id)
+            pushed = listener is not None and listener.connected
+            if pushed and self.state.device_version(device_id) > since_version:
+                current = self.state.get(device_id)
+                if current and from_state(current):
+                    return True
+
+            # With a live socket, still poll now and then in case an event got lost
+            if not pushed or time.time() - last_poll >= PLAY_POLL_MAX:
+                last_poll = time.time()
+                try:
+                    if poll():
+                        return True
+                except Exception as e:
+                    print(f"DEBUG: Status check failed: {e}")
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            self.state.wait_for_change(seen_version, timeout=min(interval, remaining))
+            interval = min(interval * 2, PLAY_POLL_MAX)
+
+    def _run_on_devices(self, device_ids, action):
+        """
+        Runs action(device_id, client) for several devices concurrently.
+        Returns {device_id: {"success": bool, "ms": int, "message"?: str}};
+        action may return a dict to add to (or override) that result.
+        """
+        def run(device_id):
+            started = time.time()
+            client = self._get_client(device_id)
+            if not client:
+                result = {"success": False, "message": "Device not found"}
+            else:
+                try:
+                    result = dict({"success": True}, **(action(device_id, client) or {}))
+                except Exception as e:
+                    print(f"Command on {device_id} failed: {e}")
+                    result = {"success": False, "message": str(e)}
+            result["ms"] = int((time.time() - started) * 1000)
+            return result
+
+        futures = {device_id: self._command_pool.submit(run, device_id) for device_id in dict.fromkeys(device_ids)}
+        return {device_id: future.result() for device_id, future in futures.items()}
+
+    @_refreshes_status
     def set_volume(self, device_id, level):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
-                client.SetVolumeLevel(int(level))
-                time.sleep(1)
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
+                self._run_async(self._async_client(client.Device.Host).set_volume(int(level)))
                 return {"success": True}
         return {"success": False, "message": "Device not found"}
         
+    @_refreshes_status
     def play_pause(self, device_id):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
-                client.Action(SoundTouchKeys.PLAY_PAUSE)
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
+                self._key(client, SoundTouchKeys.PLAY_PAUSE)
                 return {"success": True}
         return {"success": False, "message": "Device not found"}
     
+    @_refreshes_status
+    def pause(self, device_id):
+        """Pauses playback (unlike play_pause, never resumes)."""
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
+                self._key(client, SoundTouchKeys.PAUSE)
+                return {"success": True}
+        return {"success": False, "message": "Device not found"}
+
+    @_refreshes_status
+    def power_off(self, device_id):
+        """Puts the device into standby; does nothing if it already is (POWER toggles)."""
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
+                current = self.state.get(device_id)
+                if current and current.get("source") == "STANDBY":
+                    return {"success": True, "message": "Already in standby"}
+                self._key(client, SoundTouchKeys.POWER)
+                return {"success": True}
+        return {"success": False, "message": "Device not found"}
+
+    @_refreshes_status
     def next_track(self, device_id):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
-                client.Action(SoundTouchKeys.NEXT_TRACK)
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
+                self._key(client, SoundTouchKeys.NEXT_TRACK)
                 return {"success": True}
         return {"success": False, "message": "Device not found"}
         
+    @_refreshes_status
     def previous_track(self, device_id):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
-                client.Action(SoundTouchKeys.PREV_TRACK)
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
+                self._key(client, SoundTouchKeys.PREV_TRACK)
                 return {"success": True}
         return {"success": False, "message": "Device not found"}
 
+    @_refreshes_status
     def select_preset(self, device_id, preset_id, action='play'):
+        from bosesoundtouchapi import SoundTouchKeys
         # action: 'play' or 'store'
         if int(preset_id) < 1 or int(preset_id) > 6:
              return {"success": False, "message": "Preset must be 1-6"}
 
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 if action == 'store':
                     # Use StorePreset API — works for all sources including UPNP/DLNA
                     try:
@@ -511,6 +1062,7 @@ class SoundTouchManager:
                             containerArt=art_url
                         )
                         client.StorePreset(preset)
+                        self._slow_cache.invalidate((device_id, "presets"))
                         return {"success": True, "message": f"Preset {preset_id} gespeichert"}
                     except Exception as e:
                         return {"success": False, "message": f"Fehler: {str(e)}"}
@@ -521,78 +1073,101 @@ class SoundTouchManager:
                         key = SoundTouchKeys[key_name]
                     except KeyError:
                         return {"success": False, "message": "Invalid preset key"}
-                    client.Action(key, KeyStates.Release)
+                    self._key(client, key, state="release")
                     return {"success": True, "message": f"Playing Preset {preset_id}"}
         return {"success": False, "message": "Device not found"}
 
+    @_refreshes_status
     def create_zone(self, master_id, member_ids):
-        with self.lock:
-            master_client = self.devices.get(master_id)
-            if not master_client:
-                 return {"success": False, "message": "Master device not found"}
-            
-            non_master_devices = []
-            for m_id in member_ids:
-                # We need SoundTouchDevice objects for creating zone
-                slave_client = self.devices.get(m_id)
-                if slave_client:
-                    non_master_devices.append(slave_client.Device)
-            
-            if not non_master_devices:
-                return {"success": False, "message": "No valid members found"}
+        master_client = self._get_client(master_id)
+        if not master_client:
+             return {"success": False, "message": "Master device not found"}
+        
+        non_master_devices = []
+        locked_ids = [master_id]
+        for m_id in member_ids:
+            # We need SoundTouchDevice objects for creating zone
+            slave_client = self._get_client(m_id)
+            if slave_client:
+                non_master_devices.append(slave_client.Device)
+                locked_ids.append(m_id)
+        
+        if not non_master_devices:
+            return {"success": False, "message": "No valid members found"}
 
+        # Only the devices involved in the zone are locked
+        with self._devices_locked(locked_ids):
             try:
                 master_client.CreateZoneFromDevices(master_client.Device, non_master_devices)
+                self._invalidate_zones()
                 return {"success": True}
             except Exception as e:
                 return {"success": False, "message": str(e)}
 
+    @_refreshes_status
     def remove_zone(self, master_id):
-         with self.lock:
-            master_client = self.devices.get(master_id)
-            if master_client:
-                try:
-                    # Get members before removing to stop them later
-                    zone_status = master_client.GetZoneStatus(refresh=True)
-                    members_to_stop = []
-                    if zone_status and zone_status.Members:
-                        for member in zone_status.Members:
-                             members_to_stop.append(member.DeviceId)
-
-                    print(f"Attempting to remove zone for master: {master_id}")
-                    master_client.RemoveZone(delay=2) 
-                    print("Zone removed successfully")
-                    
-                    # Explicitly stop former members
-                    if members_to_stop:
-                        print(f"Stopping members: {members_to_stop}")
-                        time.sleep(1) # Wait a bit for zone removal to propagate
-                        for m_id in members_to_stop:
-                            if m_id == master_id:
-                                continue
-                            slave_client = self.devices.get(m_id)
-                            if slave_client:
-                                try:
-                                    # Try to pause/stop the device
-                                    slave_client.Action(SoundTouchKeys.MUTE) # Mute might be safer than PlayPause as we don't know state
-                                    # User requested POWER OFF (Standby) when removing from group
-                                    slave_client.Action(SoundTouchKeys.POWER)
-                                except Exception as e:
-                                    print(f"Could not stop slave {m_id}: {e}")
+        """
+        Dissolves the zone of `master_id` and powers off its former members.
+        The members are stopped concurrently once the master reports the zone
+        gone; "members" holds the outcome per member.
+        """
+        from bosesoundtouchapi import SoundTouchKeys
+        master_client = self._get_client(master_id)
+        if not master_client:
+            print(f"Master device not found: {master_id}")
+            return {"success": False, "message": "Master device not found"}
 
-                    return {"success": True}
-                except Exception as e:
-                     print(f"Error removing zone: {e}")
-                     return {"success": False, "message": str(e)}
-         print(f"Master device not found: {master_id}")
-         return {"success": False, "message": "Master device not found"}
+        try:
+            # Get members before removing to stop them later
+            zone_status = master_client.GetZoneStatus(refresh=True)
+            members_to_stop = []
+            if zone_status and zone_status.Members:
+                for member in zone_status.Members:
+                    if member.DeviceId != master_id:
+                        members_to_stop.append(member.DeviceId)
+
+            # Lock only the master and the members of this zone
+            with self._devices_locked([master_id] + members_to_stop):
+                print(f"Attempting to remove zone for master: {master_id}")
+                since = self.state.device_version(master_id)
+                master_client.RemoveZone(delay=0)
+                self._invalidate_zones()
+
+                # Wait for the master to report the zone gone instead of a fixed delay
+                def zone_gone():
+                    zone = master_client.GetZoneStatus(refresh=True)
+                    return not (zone and zone.Members)
+                confirmed = self._wait_until(master_id, since, ZONE_CONFIRM_TIMEOUT,
+                                             lambda current: not current.get("zone"), zone_gone)
+                print(f"Zone removed (confirmed: {confirmed})")
+                
+                # Explicitly stop former members, all at once
+                def stop_member(m_id, slave_client):
+                    # Mute might be safer than PlayPause as we don't know state
+                    self._key(slave_client, SoundTouchKeys.MUTE)
+                    # User requested POWER OFF (Standby) when removing from group
+                    self._key(slave_client, SoundTouchKeys.POWER)
 
+                if members_to_stop:
+                    print(f"Stopping members: {members_to_stop}")
+                results = self._run_on_devices(members_to_stop, stop_member)
+                self._invalidate_zones()
+
+            return {"success": True, "confirmed": confirmed, "members": results}
+        except Exception as e:
+             print(f"Error removing zone: {e}")
+             return {"success": False, "message": str(e)}
+
+    @_refreshes_status
     def remove_zone_slave(self, master_id, slave_id):
-        with self.lock:
-            master_client = self.devices.get(master_id)
-            if not master_client:
-                return {"success": False, "message": "Master device not found"}
-            
+        from bosesoundtouchapi import SoundTouchKeys
+        master_client = self._get_client(master_id)
+        if not master_client:
+            return {"success": False, "message": "Master device not found"}
+
+        # Commands only go to the master and the removed slave
+        self._invalidate_zones()
+        with self._devices_locked([master_id, slave_id]):
             try:
                 # Get current zone status
                 zone = master_client.GetZoneStatus(refresh=True)
@@ -619,94 +1194,103 @@ class SoundTouchManager:
                      print("Slave ID not found in current zone members.")
                      return {"success": False, "message": "Slave not found in zone"}
 
-                # Stop the slave being removed
-                print(f"Stopping slave {slave_id}...")
-                slave_client = self.devices.get(slave_id)
-                if slave_client:
-                    try:
+                # Power off the removed slave and update the master's zone at the same time
+                def apply(m_id, member_client):
+                    if m_id == slave_id:
+                        print(f"Stopping slave {slave_id}...")
                         # User requested POWER OFF (Standby) when removing from group
-                        slave_client.Action(SoundTouchKeys.POWER)
-                    except Exception as e:
-                        print(f"Error stopping slave: {e}")
+                        self._key(member_client, SoundTouchKeys.POWER)
+                    elif not new_members:
+                        # No slaves left, remove entire zone
+                        print(f"No members left, destroying zone {master_id}")
+                        member_client.RemoveZone(delay=0)
+                        return {"message": "Zone dissolved"}
+                    else:
+                        # Update zone with remaining members
+                        print(f"Updating zone {master_id} with members {len(new_members)}")
+                        return {"message": self._update_zone_members(member_client, master_id, new_members)}
 
-                if not new_members:
-                    # No slaves left, remove entire zone
-                    print(f"No members left, destroying zone {master_id}")
-                    master_client.RemoveZone()
-                    return {"success": True, "message": "Zone dissolved"}
-                else:
-                    # Update zone with remaining members
-                    print(f"Updating zone {master_id} with members {len(new_members)}")
-                    from bosesoundtouchapi.models import Zone, ZoneMember
-                    
-                    # Construct Zone object
-                    # We need ZoneMember objects. 
-                    # The 'member' from GetZoneStatus is likely a ZoneMember or similar.
-                    # Let's re-use IP and ID.
-                    
-                    z_members = []
-                    for m in new_members:
-                        # Ensure we have IP. GetZoneStatus might return it.
-                        # ZoneMember property is IpAddress (case sensitive)
-                        ip = m.IpAddress
-                        if not ip:
-                            # Fallback if IpAddress is missing (sometimes it is)
-                            d = self.devices.get(m.DeviceId)
-                            if d:
-                                ip = d.Device.Host
-                                
-                        if ip:
-                            z_members.append(ZoneMember(ip, m.DeviceId))
-                        else:
-                             print(f"Warning: Could not determine IP for member {m.DeviceId}, skipping re-add")
-                        
-                    if not z_members:
-                        print("No valid members left to form a zone (IPs missing?), destroying zone.")
-                        master_client.RemoveZone()
-                        return {"success": True, "message": "Zone dissolved (no valid members)"}
-
-                    if not z_members:
-                        print("No valid members left to form a zone (IPs missing?), destroying zone.")
-                        master_client.RemoveZone()
-                        return {"success": True, "message": "Zone dissolved (no valid members)"}
-
-                    print(f"Creating new zone with {len(z_members)} remaining slave members.")
-                    # Workaround: Zone constructor might fail to add members if isinstance check fails or logic is buggy.
-                    new_zone = Zone(master_id, master_client.Device.Host)
-                    for m in z_members:
-                         # Re-create ZoneMember to ensure it's clean (copy IP, ID, Role)
-                         # properties represent the private fields, use them.
-                         ip = m.IpAddress
-                         if not ip:
-                             d = self.devices.get(m.DeviceId)
-                             if d: ip = d.Device.Host
-                         
-                         if ip:
-                             # Pass role if available
-                             role = m.DeviceRole if hasattr(m, 'DeviceRole') else None
-                             zm = ZoneMember(ip, m.DeviceId, deviceRole=role)
-                             new_zone.Members.append(zm)
-                    
-                    print(f"New Zone XML: {new_zone.ToXmlString()}")
-                    master_client.CreateZone(new_zone)
-                    print("CreateZone command sent successfully.")
-                    
-                    # Wait for devices to sync/update their status
-                    print("Waiting for zone propagation...")
-                    time.sleep(2)
-                    
-                    return {"success": True, "message": "Member removed"}
+                since = self.state.device_version(master_id)
+                results = self._run_on_devices([master_id, slave_id], apply)
+                self._invalidate_zones()
+                if not results[master_id]["success"]:
+                    return {"success": False, "message": results[master_id]["message"], "members": results}
+
+                # Confirm through the master's zone state instead of a fixed propagation delay
+                def slave_gone():
+                    zone = master_client.GetZoneStatus(refresh=True)
+                    return not zone or all(m.DeviceId != slave_id for m in zone.Members)
+                confirmed = self._wait_until(
+                    master_id, since, ZONE_CONFIRM_TIMEOUT,
+                    lambda current: slave_id not in ((current.get("zone") or {}).get("members") or []),
+                    slave_gone)
+
+                return {"success": True, "message": results[master_id].get("message"), "confirmed": confirmed,
+                        "members": results}
 
             except Exception as e:
                 print(f"Error removing slave: {e}")
                 return {"success": False, "message": str(e)}
 
+    def _update_zone_members(self, master_client, master_id, new_members):
+        """Re-creates the master's zone with `new_members`; returns the result message."""
+        from bosesoundtouchapi.models import Zone, ZoneMember
+        
+        # Construct Zone object
+        # We need ZoneMember objects. 
+        # The 'member' from GetZoneStatus is likely a ZoneMember or similar.
+        # Let's re-use IP and ID.
+        
+        z_members = []
+        for m in new_members:
+            # Ensure we have IP. GetZoneStatus might return it.
+            # ZoneMember property is IpAddress (case sensitive)
+            ip = m.IpAddress
+            if not ip:
+                # Fallback if IpAddress is missing (sometimes it is)
+                d = self._get_client(m.DeviceId)
+                if d:
+                    ip = d.Device.Host
+                    
+            if ip:
+                z_members.append(ZoneMember(ip, m.DeviceId))
+            else:
+                 print(f"Warning: Could not determine IP for member {m.DeviceId}, skipping re-add")
+            
+        if not z_members:
+            print("No valid members left to form a zone (IPs missing?), destroying zone.")
+            master_client.RemoveZone(delay=0)
+            return "Zone dissolved (no valid members)"
+
+        print(f"Creating new zone with {len(z_members)} remaining slave members.")
+        # Workaround: Zone constructor might fail to add members if isinstance check fails or logic is buggy.
+        new_zone = Zone(master_id, master_client.Device.Host)
+        for m in z_members:
+             # Re-create ZoneMember to ensure it's clean (copy IP, ID, Role)
+             # properties represent the private fields, use them.
+             ip = m.IpAddress
+             if not ip:
+                 d = self._get_client(m.DeviceId)
+                 if d: ip = d.Device.Host
+             
+             if ip:
+                 # Pass role if available
+                 role = m.DeviceRole if hasattr(m, 'DeviceRole') else None
+                 zm = ZoneMember(ip, m.DeviceId, deviceRole=role)
+                 new_zone.Members.append(zm)
+        
+        print(f"New Zone XML: {new_zone.ToXmlString()}")
+        master_client.CreateZone(new_zone, delay=0)
+        print("CreateZone command sent successfully.")
+        return "Member removed"
+
     # --- Settings ---
     def get_device_settings(self, device_id):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if not client:
-                return {"success": False, "message": "Device not found"}
+        client = self._get_client(device_id)
+        if not client:
+            return {"success": False, "message": "Device not found"}
+
+        with self._device_lock(device_id):
             
             try:
                 # Basic Info
@@ -720,6 +1304,8 @@ class SoundTouchManager:
 
                 # Audio Settings (Bass/Treble)
                 # Note: Not all devices support this. SoundTouchAPI might raise error or return None.
+                # What a device supports is probed once and cached, so unsupported levels aren't re-probed.
+                caps = self._slow_cache.get((device_id, "audio_caps"))
                 bass = 0
                 treble = 0
                 bass_cap = False
@@ -729,20 +1315,25 @@ class SoundTouchManager:
                     # Check capabilities first if possible, or just try get
                     # The library might expose capabilities.
                     # Let's try getting level.
-                    bass_obj = client.GetBassLevel()
-                    if bass_obj:
-                         bass = bass_obj.Actual
-                         bass_cap = True
+                    if caps is None or caps["bass"]:
+                        bass_obj = client.GetBassLevel()
+                        if bass_obj:
+                             bass = bass_obj.Actual
+                             bass_cap = True
                     
-                    treble_obj = client.GetTrebleLevel()
-                    if treble_obj:
-                         treble = treble_obj.Actual
-                         treble_cap = True
+                    if caps is None or caps["treble"]:
+                        treble_obj = client.GetTrebleLevel()
+                        if treble_obj:
+                             treble = treble_obj.Actual
+                             treble_cap = True
                          
                 except Exception:
                     # Likely not supported
                     pass
 
+                if caps is None:
+                    self._slow_cache.set((device_id, "audio_caps"), {"bass": bass_cap, "treble": treble_cap})
+
                 return {
                     "success": True,
                     "info": info,
@@ -756,22 +1347,25 @@ class SoundTouchManager:
             except Exception as e:
                 return {"success": False, "message": str(e)}
 
+    @_refreshes_status
     def toggle_mute(self, device_id):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 try:
-                    client.Action(SoundTouchKeys.MUTE)
+                    self._key(client, SoundTouchKeys.MUTE)
                     return {"success": True}
                 except Exception as e:
                     return {"success": False, "message": str(e)}
         return {"success": False, "message": "Device not found"}
 
 
+    @_refreshes_status
     def set_bass(self, device_id, level):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 try:
                     client.SetBassLevel(int(level))
                     return {"success": True}
@@ -779,10 +1373,11 @@ class SoundTouchManager:
                     return {"success": False, "message": str(e)}
         return {"success": False, "message": "Device not found"}
 
+    @_refreshes_status
     def set_treble(self, device_id, level):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 try:
                     client.SetTrebleLevel(int(level))
                     return {"success": True}
@@ -790,10 +1385,11 @@ class SoundTouchManager:
                     return {"success": False, "message": str(e)}
         return {"success": False, "message": "Device not found"}
 
+    @_refreshes_status
     def select_source(self, device_id, source):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 try:
                     # 'source' should be one of: AUX, BLUETOOTH, INTERNET_RADIO, SPOTIFY, AIRPLAY
                     # The library's SelectSource method typically takes the source string.
@@ -803,23 +1399,27 @@ class SoundTouchManager:
                     return {"success": False, "message": str(e)}
         return {"success": False, "message": "Device not found"}
 
+    @_refreshes_status
     def set_name(self, device_id, name):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 try:
                     client.SetName(name)
                     # Update local cache immediately
                     client.Device.DeviceName = name
+                    self.state.update(device_id, {"name": name})
                     return {"success": True}
                 except Exception as e:
                     return {"success": False, "message": str(e)}
         return {"success": False, "message": "Device not found"}
 
+    @_refreshes_status
     def reboot_device(self, device_id):
-        with self.lock:
-            client = self.devices.get(device_id)
-            if client:
+        from bosesoundtouchapi import SoundTouchKeys
+        client = self._get_client(device_id)
+        if client:
+            with self._device_lock(device_id):
                 try:
                     # Simulate power button hold or just power key?
                     # SoundTouchKeys.POWER is toggle.
@@ -832,25 +1432,21 @@ class SoundTouchManager:
                     
                     # Some devices support Reboot() method in library? No.
                     # We will implement Power Toggle for now as "Zwangs-Neustart" isn't standard api.
-                    client.Action(SoundTouchKeys.POWER)
+                    self._key(client, SoundTouchKeys.POWER)
                     return {"success": True, "message": "Power signal sent"}
                 except Exception as e:
                     return {"success": False, "message": str(e)}
         return {"success": False, "message": "Device not found"}
 
     # --- Favorites Handling ---
-    def load_favorites(self):
-        if os.path.exists(FAVORITES_FILE):
-            try:
-                with open(FAVORITES_FILE, 'r') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
+    @property
+    def favorites(self):
+        return self.favorites_store.list()
 
-    def save_favorites(self):
-        with open(FAVORITES_FILE, 'w') as f:
-            json.dump(self.favorites, f, indent=4)
+    @property
+    def favorites_version(self):
+        """Bumped on every change; used as the /api/favorites ETag."""
+        return self.favorites_store.version
 
     def add_favorite(self, name, url, image=None, guide_id=None, type="url"):
         fav = {
@@ -863,16 +1459,74 @@ class SoundTouchManager:
         if guide_id:
             fav["guide_id"] = guide_id
             
-        self.favorites.append(fav)
-        self.save_favorites()
-        return {"success": True, "favorites": self.favorites}
-
-    def remove_favorite(self, index):
-        if 0 <= index < len(self.favorites):
-            self.favorites.pop(index)
-            self.save_favorites()
+        fav = self.favorites_store.add(fav)
+        self._index_favorites()
+        return {"success": True, "favorite": fav, "favorites": self.favorites}
+
+    def remove_favorite(self, fav_id):
+        """Removes a favorite by id (a list index is still accepted from older clients)."""
+        if isinstance(fav_id, int):
+            favorites = self.favorites
+            fav_id = favorites[fav_id]["id"] if 0 <= fav_id < len(favorites) else None
+        if fav_id and self.favorites_store.remove(fav_id):
+            self._index_favorites()
             return {"success": True, "favorites": self.favorites}
-        return {"success": False, "message": "Invalid index"}
+        return {"success": False, "message": "Favorite not found"}
 
     def get_favorites_list(self):
         return self.favorites
+
+    # --- Groups / batch control ---
+    def load_groups(self):
+        return read_json(GROUPS_FILE, {})
+
+    def set_device_groups(self, device_id, groups):
+        """Replaces the group tags of a device."""
+        groups = sorted({str(g).strip() for g in groups or [] if str(g).strip()})
+        if groups:
+            self.groups[device_id] = groups
+        else:
+            self.groups.pop(device_id, None)
+        try:
+            atomic_write_json(GROUPS_FILE, self.groups)
+        except Exception as e:
+            return {"success": False, "message": str(e)}
+        self.state.update(device_id, {"groups": groups})
+        return {"success": True, "groups": groups}
+
+    def select_devices(self, selector):
+        """
+        Resolves a target selector to device ids:
+        "all" (every online device), "zone:<device_id>" (the zone that device
+        is in, or just the device) or "group:<tag>".
+        """
+        # Warm-start entries aren't registered until their device has been re-checked
+        online = [d for d in self.state.snapshot() if not d.get("is_offline") and not d.get("is_stale")]
+        kind, _, value = (selector or "").partition(":")
+        if kind == "all":
+            return [d["id"] for d in online]
+        if kind == "zone":
+            for d in online:
+                zone = d.get("zone")
+                if d["id"] == value or (zone and value in [zone.get("master")] + (zone.get("members") or [])):
+                    if not zone:
+                        return [d["id"]]
+                    return list(dict.fromkeys([zone["master"]] + (zone.get("members") or [])))
+            return []
+        if kind == "group":
+            return [d["id"] for d in online if value in self.groups.get(d["id"], [])]
+        return []
+
+    def control_devices(self, device_ids, command):
+        """
+        Runs command(device_id) -> result dict on several devices concurrently.
+        Returns {device_id: result} with each result's "ms" timing added.
+        """
+        return self._run_on_devices(device_ids, lambda device_id, client: command(device_id))
+
+    def search_favorites(self, query):
+        """Favorites whose name contains `query` (case and punctuation insensitive)."""
+        query = normalize_name(query)
+        return [dict(fav, index=i, source="favorite")  # keeps "id" for play/delete
+                for i, fav in enumerate(self.favorites)
+                if query in normalize_name(fav.get("name"))]
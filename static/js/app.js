@@ -11,11 +11,28 @@ function getApiUrl(path) {
     return cleanBase + cleanPath;
 }
 
+// Remote artwork goes through the server's image cache (/api/art) as a thumbnail
+// of `size` px (64, 128 or 300) instead of being loaded from its host every time
+function artUrl(url, size) {
+    if (!url || !/^https?:\/\//.test(url)) return url;
+    return getApiUrl(`/api/art?url=${encodeURIComponent(url)}&size=${size}`);
+}
+
+// If the cache can't fetch an image (502), let the browser try the original once
+document.addEventListener('error', (e) => {
+    const img = e.target;
+    if (img.tagName !== 'IMG' || img.dataset.artFallback || !img.src.includes('/api/art?')) return;
+    img.dataset.artFallback = '1';
+    img.src = new URL(img.src).searchParams.get('url');
+}, true);
+
 // --- State ---
 const state = {
     devices: [],
     selectedDeviceId: null,
     pollInterval: null,
+    deviceEvents: null,
+    deviceWaiters: [],
     volumeDragging: false,
     currentView: 'devices', // 'player', 'devices', 'detail', 'presets', 'radio'
     presets: [],
@@ -23,6 +40,8 @@ const state = {
     isLoadingStream: false,
     pendingStreamTitle: null,
     radioSource: 'tunein', // 'tunein' or 'radiobrowser'
+    radioSuggestions: [],
+    suggestSeq: 0,
 };
 
 // --- Play State Helper ---
@@ -37,9 +56,8 @@ function isDevicePlaying(device) {
 document.addEventListener('DOMContentLoaded', () => {
     // Trigger background scan
     fetch(getApiUrl('/api/scan'), { method: 'POST' }).catch(console.error);
-    fetchDevices();
+    connectDeviceEvents();
     fetchFavorites();
-    state.pollInterval = setInterval(fetchDevices, 2000);
     initVolumeSlider();
     setupEventListeners();
 
@@ -203,7 +221,7 @@ function renderWizardContent() {
     presets.forEach(p => {
         const hasArt = p.art && p.art.length > 0;
         const content = hasArt
-            ? `<img src="${p.art}" class="wizard-item-img" alt="${p.name}">`
+            ? `<img src="${artUrl(p.art, 128)}" class="wizard-item-img" alt="${p.name}">`
             : `<div class="wizard-item-icon">📻</div>`;
 
         html += `
@@ -221,7 +239,7 @@ function renderWizardContent() {
         // Check for image or icon
         const hasArt = f.image && f.image.length > 0;
         const content = hasArt
-            ? `<img src="${f.image}" class="wizard-item-img" alt="${f.name}">`
+            ? `<img src="${artUrl(f.image, 128)}" class="wizard-item-img" alt="${f.name}">`
             : `<div class="wizard-item-icon">⭐</div>`;
 
         html += `
@@ -284,17 +302,143 @@ function closeModal(id) {
     }
 }
 
+// --- Device State Stream ---
+// The server pushes a full snapshot on connect and then only changed fields per device.
+function connectDeviceEvents() {
+    if (!window.EventSource) {
+        startDevicePolling();
+        return;
+    }
+    const source = new EventSource(getApiUrl('/api/events'));
+    state.deviceEvents = source;
+
+    source.addEventListener('snapshot', (e) => {
+        stopDevicePolling();
+        state.devices = JSON.parse(e.data);
+        onDevicesUpdated();
+    });
+    source.addEventListener('delta', (e) => {
+        applyDeviceDelta(JSON.parse(e.data));
+        onDevicesUpdated();
+    });
+    source.onerror = () => {
+        // EventSource reconnects by itself; only fall back to polling if it gave up
+        if (source.readyState === EventSource.CLOSED) {
+            startDevicePolling();
+            setTimeout(connectDeviceEvents, 10000);
+        }
+    };
+}
+
+function applyDeviceDelta(delta) {
+    Object.entries(delta.devices || {}).forEach(([id, fields]) => {
+        const dev = state.devices.find(d => d.id === id);
+        if (dev) Object.assign(dev, fields);
+        else state.devices.push(fields);
+    });
+    Object.entries(delta.cleared || {}).forEach(([id, keys]) => {
+        const dev = state.devices.find(d => d.id === id);
+        if (dev) keys.forEach(k => delete dev[k]);
+    });
+    if (delta.removed) {
+        state.devices = state.devices.filter(d => !delta.removed.includes(d.id));
+    }
+    if (delta.order) {
+        state.devices.sort((a, b) => delta.order.indexOf(a.id) - delta.order.indexOf(b.id));
+    }
+}
+
+function onDevicesUpdated() {
+    renderDevices();
+    // Don't overwrite the optimistic loading state with stale data
+    if (!state.isLoadingStream) {
+        updatePlayerView();
+    }
+    updateBottomBar();
+
+    // Resolve anyone waiting for a device to reach a certain state
+    state.deviceWaiters = state.deviceWaiters.filter(w => {
+        const dev = state.devices.find(d => d.id === w.deviceId);
+        if (dev && w.predicate(dev)) {
+            clearTimeout(w.timer);
+            w.resolve(true);
+            return false;
+        }
+        return true;
+    });
+}
+
+// Resolves true once the device matches `predicate`, or false after `timeoutMs`.
+function waitForDevice(deviceId, predicate, timeoutMs) {
+    return new Promise(resolve => {
+        const waiter = { deviceId, predicate, resolve };
+        waiter.timer = setTimeout(() => {
+            state.deviceWaiters = state.deviceWaiters.filter(w => w !== waiter);
+            resolve(false);
+        }, timeoutMs);
+        state.deviceWaiters.push(waiter);
+    });
+}
+
+// Resolves with the result of a background job (see /api/jobs) once it has finished
+async function watchJob(jobId, timeoutMs) {
+    const deadline = Date.now() + timeoutMs;
+    let delay = 200;
+    while (Date.now() < deadline) {
+        await new Promise(r => setTimeout(r, delay));
+        delay = Math.min(delay * 2, 1000);
+        try {
+            const res = await fetch(getApiUrl(`/api/jobs/${jobId}`));
+            const job = await res.json();
+            if (job.status && job.status !== 'running') return job.result || { success: false };
+        } catch (e) {
+            console.error('Failed to fetch job:', e);
+        }
+    }
+    return { success: false, message: 'Zeitüberschreitung' };
+}
+
+function startDevicePolling() {
+    if (state.pollInterval) return;
+    fetchDevices();
+    state.pollInterval = setInterval(fetchDevices, 2000);
+}
+
+function stopDevicePolling() {
+    clearInterval(state.pollInterval);
+    state.pollInterval = null;
+}
+
 // --- API Calls ---
+
+// Last ETag and body per GET URL; unchanged data then comes back as an empty 304
+const validatorCache = new Map();
+const VALIDATOR_CACHE_SIZE = 50;
+
+async function fetchJsonConditional(path) {
+    const url = getApiUrl(path);
+    const cached = validatorCache.get(url);
+    const res = await fetch(url, { headers: cached ? { 'If-None-Match': cached.etag } : {} });
+    if (res.status === 304 && cached) {
+        // Callers may modify what they get, so hand out a copy of the cached body
+        return structuredClone(cached.data);
+    }
+    const data = await res.json();
+    const etag = res.headers.get('ETag');
+    validatorCache.delete(url);
+    if (etag) {
+        validatorCache.set(url, { etag, data: structuredClone(data) });
+        if (validatorCache.size > VALIDATOR_CACHE_SIZE) {
+            validatorCache.delete(validatorCache.keys().next().value);
+        }
+    }
+    return data;
+}
+
 async function fetchDevices() {
     try {
-        const res = await fetch(getApiUrl('/api/devices'));
-        state.devices = await res.json();
-        renderDevices();
-        // Don't overwrite the optimistic loading state with stale data
-        if (!state.isLoadingStream) {
-            updatePlayerView();
-        }
-        updateBottomBar();
+        state.devices = await fetchJsonConditional('/api/devices');
+        onDevicesUpdated();
     } catch (e) {
         console.error('Failed to fetch devices:', e);
     }
@@ -302,8 +446,7 @@ async function fetchDevices() {
 
 async function fetchFavorites() {
     try {
-        const res = await fetch(getApiUrl('/api/favorites'));
-        state.favorites = await res.json();
+        state.favorites = await fetchJsonConditional('/api/favorites');
         renderFavorites();
     } catch (e) {
         console.error('Failed to fetch favorites:', e);
@@ -317,7 +460,6 @@ async function apiControl(deviceId, action, value = null) {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ device_id: deviceId, action, value })
         });
-        setTimeout(fetchDevices, 500);
     } catch (e) {
         showToast('Fehler: ' + e.message, 'error');
     }
@@ -330,7 +472,6 @@ async function apiPlayPreset(deviceId, presetId) {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ device_id: deviceId, preset_id: presetId, action: 'play' })
         });
-        setTimeout(fetchDevices, 1000);
         showToast(`Preset ${presetId} wird abgespielt`);
         switchView('player');
     } catch (e) {
@@ -347,7 +488,6 @@ async function apiStorePreset(deviceId, presetId) {
         });
         const data = await res.json();
         showToast(data.message || `Preset ${presetId} gespeichert`);
-        setTimeout(fetchDevices, 1000);
     } catch (e) {
         showToast('Fehler: ' + e.message, 'error');
     }
@@ -361,7 +501,6 @@ async function apiCreateZone(masterId, memberIds) {
             body: JSON.stringify({ master_id: masterId, members: memberIds })
         });
         showToast('Gruppe erstellt');
-        setTimeout(fetchDevices, 2000);
     } catch (e) {
         showToast('Fehler: ' + e.message, 'error');
     }
@@ -375,7 +514,6 @@ async function apiRemoveZone(masterId) {
             body: JSON.stringify({ master_id: masterId, action: 'remove' })
         });
         showToast('Gruppe aufgelöst');
-        setTimeout(fetchDevices, 1000);
     } catch (e) {
         showToast('Fehler: ' + e.message, 'error');
     }
@@ -389,7 +527,6 @@ async function apiRemoveZoneMember(masterId, slaveId) {
             body: JSON.stringify({ masterId, slaveId })
         });
         showToast('Lautsprecher entfernt');
-        setTimeout(fetchDevices, 1000);
     } catch (e) {
         showToast('Fehler: ' + e.message, 'error');
     }
@@ -405,7 +542,6 @@ async function apiAddDevice(ip) {
         const data = await res.json();
         if (data.success) {
             showToast('Gerät hinzugefügt!');
-            fetchDevices();
         } else {
             showToast('Fehler: ' + data.message, 'error');
         }
@@ -434,12 +570,9 @@ async function apiPlayUrl(deviceId, url, title = 'Stream') {
         const data = await res.json();
         if (data.success) {
             showToast(`▶ ${title}`, 'success');
-            // Poll quickly to catch the device status change
-            for (let i = 0; i < 5; i++) {
-                await new Promise(r => setTimeout(r, 1500));
-                await fetchDevices();
-                const dev = state.devices.find(d => d.id === deviceId);
-                if (dev && isDevicePlaying(dev)) break;
+            // The event stream tells us when the device actually starts playing
+            if (!await waitForDevice(deviceId, isDevicePlaying, 7500)) {
+                fetchDevices(); // Restore whatever the optimistic update cleared
             }
         } else {
             showToast('Fehler: ' + (data.message || 'Unbekannt'), 'error');
@@ -467,12 +600,12 @@ async function apiAddFavorite(name, url, image, guideId, type) {
     }
 }
 
-async function apiDeleteFavorite(index) {
+async function apiDeleteFavorite(id) {
     try {
         await fetch(getApiUrl('/api/favorites'), {
             method: 'DELETE',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ index })
+            body: JSON.stringify({ id })
         });
         fetchFavorites();
     } catch (e) {
@@ -554,6 +687,8 @@ function renderDevices() {
 
         if (isOffline) {
             nowPlayingText = 'Offline';
+        } else if (d.is_stale) {
+            nowPlayingText = 'Verbinde...'; // Last known state, device not re-checked yet
         } else if (d.now_playing && d.now_playing.track) {
             const artist = d.now_playing.artist ? ` — ${d.now_playing.artist}` : '';
             nowPlayingText = `${d.now_playing.track}${artist}`;
@@ -569,7 +704,7 @@ function renderDevices() {
         if (d.zone && d.zone.master !== d.id) badge = '<span class="device-badge slave">🔗 Verbunden</span>';
 
         return `
-        <div class="device-card ${isSelected ? 'selected' : ''} ${isOffline ? 'offline' : ''}" 
+        <div class="device-card ${isSelected ? 'selected' : ''} ${isOffline ? 'offline' : ''} ${d.is_stale ? 'stale' : ''}" 
              onclick="${isOffline ? '' : `selectDevice('${d.id}')`}">
              
             <div class="device-card-top">
@@ -727,8 +862,6 @@ async function deleteDevice(ip, event) {
         const data = await res.json();
         if (data.success) {
             showToast('Lautsprecher entfernt');
-            // Refresh logic to be added if not auto-refreshing
-            fetchDevices();
         } else {
             showToast(data.message, 'error');
         }
@@ -758,10 +891,10 @@ function updatePlayerView() {
     const artContainer = document.getElementById('player-art-container');
     if (artContainer) {
         if (np.art) {
-            artContainer.innerHTML = `<img src="${np.art}" class="player-art" alt="Album Art">`;
+            artContainer.innerHTML = `<img src="${artUrl(np.art, 300)}" class="player-art" alt="Album Art">`;
             // Update background
             const bg = document.getElementById('player-bg');
-            if (bg) bg.style.backgroundImage = `url(${np.art})`;
+            if (bg) bg.style.backgroundImage = `url("${artUrl(np.art, 300)}")`;
         } else {
             artContainer.innerHTML = `<div class="player-art-placeholder">🎵</div>`;
             const bg = document.getElementById('player-bg');
@@ -1063,7 +1196,7 @@ function renderPresets() {
         // Artwork logic - prioritized
         let thumbContent = '';
         if (p && p.art) {
-            thumbContent = `<img src="${p.art}" class="preset-card-img" alt="${name}">`;
+            thumbContent = `<img src="${artUrl(p.art, 128)}" class="preset-card-img" alt="${name}">`;
         } else {
             // Generic icon based on name or default
             thumbContent = `<div class="preset-card-icon">📻</div>`;
@@ -1113,7 +1246,7 @@ function renderFavorites() {
 
     container.innerHTML = state.favorites.map((fav, idx) => {
         const logoHtml = fav.image ?
-            `<img src="${fav.image}" class="fav-logo" style="width:20px; height:20px; border-radius:3px; margin-right:8px; vertical-align:middle;">` :
+            `<img src="${artUrl(fav.image, 64)}" class="fav-logo" style="width:20px; height:20px; border-radius:3px; margin-right:8px; vertical-align:middle;">` :
             `<span class="fav-heart">♥</span>`;
 
         return `
@@ -1145,7 +1278,8 @@ function playFavorite(idx) {
     }
 }
 function deleteFavorite(idx) {
-    apiDeleteFavorite(idx);
+    const fav = state.favorites[idx];
+    if (fav) apiDeleteFavorite(fav.id);
 }
 
 // --- Radio Search ---
@@ -1166,7 +1300,63 @@ function handleRadioInput(event) {
     }
 
     if (event.key === 'Enter') {
+        hideRadioSuggestions();
         searchRadio();
+    } else if (input) {
+        updateRadioSuggestions(input.value);
+    }
+}
+
+// Typeahead from favorites, presets and recently played titles (answered from
+// the server's in-memory index, so it's cheap to ask on every keystroke)
+async function updateRadioSuggestions(query) {
+    const seq = ++state.suggestSeq;
+    if (!query.trim()) {
+        hideRadioSuggestions();
+        return;
+    }
+    try {
+        const res = await fetch(getApiUrl(`/api/suggest?q=${encodeURIComponent(query)}`));
+        const items = await res.json();
+        if (seq !== state.suggestSeq) return; // A newer keystroke already answered
+        state.radioSuggestions = items;
+        renderRadioSuggestions();
+    } catch (e) {
+        console.error('Suggest error', e);
+    }
+}
+
+function renderRadioSuggestions() {
+    const box = document.getElementById('radio-suggest');
+    if (!box) return;
+    const icons = { favorite: '♥', preset: '#', recent: '↺' };
+    box.innerHTML = state.radioSuggestions.map((s, idx) => `
+        <div class="radio-suggest-item" onclick="pickRadioSuggestion(${idx})">
+            <span class="radio-suggest-kind">${s.kind === 'preset' ? '#' + s.preset_id : icons[s.kind] || ''}</span>
+            <span class="radio-suggest-name">${s.name}</span>
+        </div>`).join('');
+    box.style.display = state.radioSuggestions.length ? 'block' : 'none';
+}
+
+function hideRadioSuggestions() {
+    state.suggestSeq++;
+    state.radioSuggestions = [];
+    const box = document.getElementById('radio-suggest');
+    if (box) box.style.display = 'none';
+}
+
+function pickRadioSuggestion(idx) {
+    const s = state.radioSuggestions[idx];
+    hideRadioSuggestions();
+    if (!s) return;
+    const device = getSelectedDevice();
+    if (s.kind === 'favorite' && device) {
+        if (s.type === 'tunein' && s.guide_id) playTuneInStation(s.guide_id, s.name);
+        else playRadioStation(s.url, s.name, s.image || '');
+    } else if (s.kind === 'preset' && device && device.id === s.device_id) {
+        apiPlayPreset(device.id, s.preset_id);
+    } else {
+        searchRadio(s.name);
     }
 }
 
@@ -1211,12 +1401,10 @@ async function searchRadio(queryOverride) {
 
     try {
         if (state.radioSource === 'tunein') {
-            const res = await fetch(getApiUrl(`/api/tunein/search?q=${encodeURIComponent(query)}`));
-            const stations = await res.json();
+            const stations = await fetchJsonConditional(`/api/tunein/search?q=${encodeURIComponent(query)}`);
             renderTuneInResults(stations);
         } else {
-            const res = await fetch(getApiUrl(`/api/radio/search?q=${encodeURIComponent(query)}`));
-            const stations = await res.json();
+            const stations = await fetchJsonConditional(`/api/radio/search?q=${encodeURIComponent(query)}`);
             renderRadioResults(stations);
         }
     } catch (e) {
@@ -1241,7 +1429,7 @@ function renderRadioResults(stations) {
         const tags = s.tags ? s.tags.split(',').slice(0, 3).join(', ') : '';
 
         const imgHtml = favicon ?
-            `<img src="${favicon}" class="radio-logo" onerror="this.src='/static/img/radio_placeholder.png'; this.onerror=null; this.style.opacity=0.5">` :
+            `<img src="${artUrl(favicon, 64)}" class="radio-logo" onerror="this.src='/static/img/radio_placeholder.png'; this.onerror=null; this.style.opacity=0.5">` :
             `<div class="radio-logo-placeholder">📻</div>`;
 
         return `
@@ -1271,7 +1459,7 @@ function renderTuneInResults(stations) {
 
     container.innerHTML = stations.map(s => {
         const imgHtml = s.image ?
-            `<img src="${s.image}" class="radio-logo" onerror="this.src='/static/img/radio_placeholder.png'; this.onerror=null; this.style.opacity=0.5">` :
+            `<img src="${artUrl(s.image, 64)}" class="radio-logo" onerror="this.src='/static/img/radio_placeholder.png'; this.onerror=null; this.style.opacity=0.5">` :
             `<div class="radio-logo-placeholder">📻</div>`;
         const nowPlaying = s.now_playing ? `<div class="radio-meta">♪ ${s.now_playing}</div>` : '';
         const bitrate = s.bitrate ? `<span class="radio-bitrate">${s.bitrate}k</span>` : '';
@@ -1323,31 +1511,20 @@ function playTuneInStation(guideId, name) {
     fetch(getApiUrl('/api/tunein/play'), {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ device_id: device.id, guide_id: guideId, name: name })
+        body: JSON.stringify({ device_id: device.id, guide_id: guideId, name: name, async: true })
     })
         .then(res => res.json())
+        .then(data => data.job_id ? watchJob(data.job_id, 20000) : data)
         .then(data => {
             if (data.success) {
                 showToast(`Spielt: ${name} `, 'success');
-                // Poll faster for 10 seconds to pick up the new track info
-                let polls = 0;
-                const fastPoll = setInterval(async () => {
-                    await fetchDevices();
-                    const d = state.devices.find(d => d.id === device.id);
-                    if (d && isDevicePlaying(d)) {
-                        state.isLoadingStream = false;
-                        state.pendingStreamTitle = null;
-                        updatePlayerView();
-                        clearInterval(fastPoll);
-                    }
-                    polls++;
-                    if (polls >= 7) {
-                        state.isLoadingStream = false;
-                        state.pendingStreamTitle = null;
-                        updatePlayerView();
-                        clearInterval(fastPoll);
-                    }
-                }, 1500);
+                // Wait for the pushed state to show the new track
+                waitForDevice(device.id, isDevicePlaying, 10500).then(playing => {
+                    if (!playing) fetchDevices();
+                    state.isLoadingStream = false;
+                    state.pendingStreamTitle = null;
+                    updatePlayerView();
+                });
             } else {
                 showToast(data.message || 'Wiedergabe fehlgeschlagen', 'error');
                 state.isLoadingStream = false;
@@ -1444,8 +1621,6 @@ function saveDeviceName() {
         .then(res => {
             if (res.success) {
                 showToast('Name gespeichert');
-                // Refresh device list to show new name
-                fetchDevices();
             } else {
                 showToast('Fehler: ' + res.results?.name?.message || 'Unbekannt', 'error');
             }
@@ -0,0 +1,222 @@
+import codecs
+import json
+import re
+import sqlite3
+import threading
+import time
+
+_SKIP = re.compile(r"[\s,]*")
+
+
+def iter_json_array(chunks):
+    """
+    Yields the elements of a JSON array arriving as byte chunks, one at a
+    time, so a large dump is never held in memory as a whole.
+    Raises ValueError if the stream ends before the closing bracket.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    started = False
+    for chunk in chunks:
+        buf += utf8.decode(chunk)
+        pos = 0
+        while True:
+            pos = _SKIP.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # Element continues in the next chunk
+            yield item
+        buf = buf[pos:]
+    raise ValueError("Station dump ended early")
+
+
+class StationCatalog:
+    """
+    Local copy of the Radio Browser station list in SQLite with an FTS5
+    index over name and tags, for instant searches that work offline.
+
+    import_stations() takes the raw station records of the API dump and
+    only rewrites (and re-indexes) stations whose lastchangetime changed;
+    click counts are refreshed for all. Stations missing from a complete
+    import are deleted.
+    """
+
+    BATCH_SIZE = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._import_lock = threading.Lock()
+        self._count = None
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")  # Searches keep working during an import
+        try:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS stations (
+                    id INTEGER PRIMARY KEY,
+                    uuid TEXT UNIQUE NOT NULL,
+                    name TEXT, url TEXT, favicon TEXT, country TEXT, tags TEXT,
+                    bitrate INTEGER, clickcount INTEGER, changed TEXT, generation INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS stations_clicks ON stations(clickcount);
+                CREATE INDEX IF NOT EXISTS stations_country ON stations(country, clickcount);
+                CREATE VIRTUAL TABLE IF NOT EXISTS stations_fts USING fts5(
+                    name, tags, content='stations', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS stations_ai AFTER INSERT ON stations BEGIN
+                    INSERT INTO stations_fts(rowid, name, tags) VALUES (new.id, new.name, new.tags);
+                END;
+                CREATE TRIGGER IF NOT EXISTS stations_ad AFTER DELETE ON stations BEGIN
+                    INSERT INTO stations_fts(stations_fts, rowid, name, tags) VALUES ('delete', old.id, old.name, old.tags);
+                END;
+                CREATE TRIGGER IF NOT EXISTS stations_au AFTER UPDATE OF name, tags ON stations BEGIN
+                    INSERT INTO stations_fts(stations_fts, rowid, name, tags) VALUES ('delete', old.id, old.name, old.tags);
+                    INSERT INTO stations_fts(rowid, name, tags) VALUES (new.id, new.name, new.tags);
+                END;
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _read(self, sql, params=()):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def count(self):
+        if self._count is None:
+            self._count = self._read("SELECT COUNT(*) FROM stations")[0][0]
+        return self._count
+
+    def ready(self):
+        return self.count() > 0
+
+    def last_import(self):
+        """Time of the last complete import, or 0."""
+        rows = self._read("SELECT value FROM meta WHERE key = 'last_import'")
+        return float(rows[0]["value"]) if rows else 0
+
+    def status(self):
+        return {"stations": self.count(), "last_import": self.last_import() or None,
+                "importing": self._import_lock.locked()}
+
+    def import_stations(self, records):
+        """
+        Upserts raw Radio Browser station records in batches. Returns
+        {"stations", "changed", "removed"}; returns None if another import runs.
+        """
+        if not self._import_lock.acquire(blocking=False):
+            return None
+        try:
+            conn = self._connect()
+            try:
+                generation = int(self._meta(conn, "generation", 0)) + 1
+                seen = changed = 0
+                batch = []
+                for record in records:
+                    if not record.get("stationuuid"):
+                        continue
+                    batch.append(record)
+                    if len(batch) >= self.BATCH_SIZE:
+                        changed += self._write_batch(conn, batch, generation)
+                        seen += len(batch)
+                        batch = []
+                changed += self._write_batch(conn, batch, generation)
+                seen += len(batch)
+
+                removed = conn.execute("DELETE FROM stations WHERE generation < ?", (generation,)).rowcount
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                                 [("generation", str(generation)), ("last_import", str(time.time()))])
+                conn.commit()
+            finally:
+                conn.close()
+            self._count = None
+            return {"stations": seen, "changed": changed, "removed": removed}
+        finally:
+            self._import_lock.release()
+
+    def _write_batch(self, conn, batch, generation):
+        """Writes one batch; returns how many stations were new or changed."""
+        if not batch:
+            return 0
+        cursor = conn.executemany("""
+            INSERT INTO stations (uuid, name, url, favicon, country, tags, bitrate, clickcount, changed, generation)
+            VALUES (:uuid, :name, :url, :favicon, :country, :tags, :bitrate, :clickcount, :changed, :generation)
+            ON CONFLICT(uuid) DO UPDATE SET
+                name = excluded.name, url = excluded.url, favicon = excluded.favicon,
+                country = excluded.country, tags = excluded.tags, bitrate = excluded.bitrate,
+                changed = excluded.changed
+            WHERE stations.changed IS NOT excluded.changed
+        """, [{
+            "uuid": r["stationuuid"],
+            "name": r.get("name") or "Unknown Station",
+            "url": r.get("url_resolved") or r.get("url"),
+            "favicon": r.get("favicon") or None,
+            "country": (r.get("countrycode") or "").upper(),
+            "tags": r.get("tags") or "",
+            "bitrate": r.get("bitrate") or 0,
+            "clickcount": r.get("clickcount") or 0,
+            "changed": r.get("lastchangetime_iso8601") or r.get("lastchangetime"),
+            "generation": generation,
+        } for r in batch])
+        conn.executemany("UPDATE stations SET clickcount = ?, generation = ? WHERE uuid = ?",
+                         [(r.get("clickcount") or 0, generation, r["stationuuid"]) for r in batch])
+        conn.commit()
+        return cursor.rowcount
+
+    def search(self, query=None, limit=20, country_code=None, tag=None, min_bitrate=None):
+        """Stations matching all words of `query` (as prefixes) in name or tags, most clicked first."""
+        where, params = [], []
+        words = re.findall(r"\w+", (query or "").casefold())
+        if words:
+            where.append("id IN (SELECT rowid FROM stations_fts WHERE stations_fts MATCH ?)")
+            params.append(" ".join(f'"{word}"*' for word in words))
+        if country_code:
+            where.append("country = ?")
+            params.append(country_code.strip().upper())
+        if tag:
+            where.append("(',' || lower(tags) || ',') LIKE ?")
+            params.append(f"%,{tag.strip().lower()},%")
+        if min_bitrate:
+            where.append("bitrate >= ?")
+            params.append(int(min_bitrate))
+        sql = "SELECT * FROM stations"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY clickcount DESC LIMIT ?"
+        params.append(int(limit))
+        return [{
+            "id": row["uuid"],
+            "name": row["name"],
+            "url": row["url"],
+            "favicon": row["favicon"],
+            "country": row["country"],
+            "tags": row["tags"],
+            "bitrate": row["bitrate"],
+        } for row in self._read(sql, params)]
+
+    def top(self, country_code=None, limit=20):
+        return self.search(None, limit, country_code=country_code)
@@ -0,0 +1,128 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+
+def normalize_name(name):
+    """Lower-case alphanumeric words only: 'SRF 3 (Swiss)' -> 'srf 3 swiss'."""
+    return " ".join(re.findall(r"\w+", (name or "").casefold()))
+
+
+def stream_host(url):
+    """Host of a stream URL without 'www.', or '' if unknown."""
+    try:
+        host = urlparse(url or "").hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def _match_score(name, query):
+    if not query:
+        return 0.5
+    if name == query:
+        return 3
+    if name.startswith(query):
+        return 2
+    if any(word.startswith(query) for word in name.split()):
+        return 1.5
+    if query in name:
+        return 1
+    return 0.5  # the provider matched on tags/description
+
+
+def merge_results(results_by_provider, query, limit=None):
+    """
+    Deduplicates and ranks the stations of several providers.
+
+    `results_by_provider` is an ordered list of (source, stations); earlier
+    providers win ties and duplicates. Two stations are the same if their
+    normalized names match and their stream hosts match (or one is unknown,
+    as for TuneIn, which resolves the stream at play time).
+    Stations found by several providers rank higher; `also_in` lists the others.
+    """
+    query = normalize_name(query)
+    merged = []
+    by_name = {}
+    for priority, (source, stations) in enumerate(results_by_provider):
+        count = len(stations)
+        for position, station in enumerate(stations):
+            name = normalize_name(station.get("name"))
+            host = stream_host(station.get("url"))
+            duplicate = None
+            for entry in by_name.get(name, []):
+                if not host or not entry["host"] or host == entry["host"]:
+                    duplicate = entry
+                    break
+            if duplicate:
+                duplicate["station"]["also_in"].append(source)
+                duplicate["score"] += 0.25
+                if host and not duplicate["host"]:
+                    duplicate["host"] = host
+                continue
+
+            score = _match_score(name, query)
+            score += 0.5 * (1 - position / count)  # provider's own relevance order
+            score -= 0.1 * priority
+            if source == "favorite":
+                score += 1
+            entry = {"station": dict(station, source=station.get("source") or source, also_in=[]),
+                     "host": host, "score": score}
+            by_name.setdefault(name, []).append(entry)
+            merged.append(entry)
+
+    merged.sort(key=lambda entry: entry["score"], reverse=True)
+    results = [entry["station"] for entry in merged]
+    return results[:limit] if limit else results
+
+
+class FederatedSearch:
+    """
+    Queries several station providers in parallel under one shared deadline.
+
+    `providers` is an ordered list of (source, search_function) pairs where
+    search_function(query) returns a list of station dicts. Providers that
+    miss the deadline are left running in the background (their own caches
+    then serve the next search) and reported as 'timeout'.
+    """
+
+    def __init__(self, providers, deadline=3.0, max_workers=8):
+        self.providers = list(providers)
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="search")
+
+    def iter_search(self, query, deadline=None):
+        """
+        Yields (source, stations, info) as each provider finishes, in completion
+        order, then one ('timeout', ...) entry per provider that missed the deadline.
+        """
+        started = time.time()
+        until = started + (self.deadline if deadline is None else deadline)
+        futures = {self._executor.submit(fn, query): source for source, fn in self.providers}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=max(0, until - time.time()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                source = futures[future]
+                elapsed = int((time.time() - started) * 1000)
+                try:
+                    stations = future.result() or []
+                    yield source, stations, {"status": "ok", "count": len(stations), "ms": elapsed}
+                except Exception as e:
+                    print(f"Search provider {source} failed: {e}")
+                    yield source, [], {"status": "error", "count": 0, "ms": elapsed}
+        for future in pending:
+            yield futures[future], [], {"status": "timeout", "count": 0, "ms": int((until - started) * 1000)}
+
+    def search(self, query, limit=50, deadline=None):
+        """Returns {"results": [...], "providers": {source: {"status", "count", "ms"}}}."""
+        collected = {}
+        providers = {}
+        for source, stations, info in self.iter_search(query, deadline):
+            collected[source] = stations
+            providers[source] = info
+        ordered = [(source, collected[source]) for source, _ in self.providers if source in collected]
+        return {"results": merge_results(ordered, query, limit), "providers": providers}
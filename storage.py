@@ -0,0 +1,187 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import uuid
+
+
+def atomic_write_bytes(path, data):
+    """
+    Writes `data` via a temp file in the same directory and an atomic
+    rename, so readers (and a crash mid-write) never see a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, data):
+    """Writes `data` as JSON with atomic_write_bytes()."""
+    atomic_write_bytes(path, json.dumps(data, indent=4).encode('utf-8'))
+
+
+def read_json(path, default):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+    return default
+
+
+class JsonStore:
+    """
+    Debounced write-behind for one JSON file.
+
+    save() only remembers the latest data and schedules a write `delay`
+    seconds later, so a burst of changes (e.g. discovery finding several
+    speakers) costs one atomic write. Pending data is flushed at exit.
+    """
+
+    def __init__(self, path, delay=2.0):
+        self.path = path
+        self.delay = delay
+        self._pending = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def save(self, data):
+        """Schedules `data` to be written; pass a snapshot, not a list that keeps changing."""
+        with self._lock:
+            self._pending = data
+            self._dirty = True
+            if self.delay <= 0:
+                start_now = True
+            else:
+                start_now = False
+                if self._timer is None:
+                    self._timer = threading.Timer(self.delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if start_now:
+            self.flush()
+
+    def flush(self):
+        """Writes pending data now, if any."""
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                data = self._pending
+                self._dirty = False
+            try:
+                atomic_write_json(self.path, data)
+            except Exception as e:
+                print(f"Error saving {self.path}: {e}")
+
+
+class FavoritesStore:
+    """
+    Favorites with stable ids, indexed by id and by stream (URL or TuneIn id).
+
+    Entries are plain dicts ({"id", "name", "url", "type", ...}) and are
+    replaced, never modified in place. Favorites from older versions get an
+    id on load.
+    """
+
+    def __init__(self, path, delay=2.0):
+        self._file = JsonStore(path, delay)
+        self._lock = threading.RLock()
+        self.version = 0
+        self._items = []
+        self._by_id = {}
+        self._by_stream = {}
+        loaded = read_json(path, [])
+        migrated = False
+        for fav in loaded if isinstance(loaded, list) else []:
+            if not fav.get("id"):
+                fav = dict(fav, id=self._new_id())
+                migrated = True
+            self._insert(fav)
+        if migrated:
+            self._changed()
+
+    @staticmethod
+    def _new_id():
+        return uuid.uuid4().hex[:8]
+
+    @staticmethod
+    def stream_key(fav):
+        """What makes two favorites the same station."""
+        if fav.get("type") == "tunein" and fav.get("guide_id"):
+            return "tunein:" + fav["guide_id"]
+        return fav.get("url") or None
+
+    def _insert(self, fav):
+        self._items.append(fav)
+        self._by_id[fav["id"]] = fav
+        key = self.stream_key(fav)
+        if key:
+            self._by_stream.setdefault(key, fav)
+
+    def _reindex(self):
+        self._by_id = {fav["id"]: fav for fav in self._items}
+        self._by_stream = {}
+        for fav in self._items:
+            key = self.stream_key(fav)
+            if key:
+                self._by_stream.setdefault(key, fav)
+
+    def _changed(self):
+        self.version += 1
+        self._file.save(list(self._items))
+
+    def list(self):
+        with self._lock:
+            return list(self._items)
+
+    def get(self, fav_id):
+        with self._lock:
+            return self._by_id.get(fav_id)
+
+    def find_by_url(self, url):
+        with self._lock:
+            return self._by_stream.get(url)
+
+    def add(self, fav):
+        """Adds a favorite; an existing one for the same station is returned instead."""
+        with self._lock:
+            existing = self._by_stream.get(self.stream_key(fav))
+            if existing:
+                return existing
+            fav = dict(fav, id=self._new_id())
+            self._insert(fav)
+            self._changed()
+            return fav
+
+    def remove(self, fav_id):
+        with self._lock:
+            fav = self._by_id.get(fav_id)
+            if not fav:
+                return False
+            self._items = [f for f in self._items if f["id"] != fav_id]
+            self._reindex()
+            self._changed()
+            return True
+
+    def flush(self):
+        self._file.flush()
@@ -0,0 +1,104 @@
+import heapq
+import threading
+from bisect import bisect_left, insort
+from station_search import normalize_name
+
+# Favorites first, then presets, then recently played titles
+KIND_RANK = {"favorite": 0, "preset": 1, "recent": 2}
+
+
+class SuggestIndex:
+    """
+    In-memory typeahead index over station names.
+
+    Entries are grouped ("favorite", ("preset", device_id), "recent") and a
+    group is replaced with set_group(); only entries that actually changed
+    touch the index. Lookups bisect a sorted list of (name suffix, entry id)
+    pairs, one per word start, so 'srf' finds 'Radio SRF 3'.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}   # group -> {entry key: (entry id, entry)}
+        self._tokens = []   # sorted [(normalized suffix starting at a word, entry id)]
+        self._entries = {}  # entry id -> entry
+        self._next_id = 0
+
+    @staticmethod
+    def _suffixes(name):
+        words = normalize_name(name).split()
+        return {" ".join(words[i:]) for i in range(len(words))}
+
+    def set_group(self, group, entries):
+        """Replaces the entries of `group`; each entry is a dict with at least "name" and "kind"."""
+        wanted = {entry.get("key") or entry["name"]: entry for entry in entries if entry.get("name")}
+        with self._lock:
+            old = self._groups.get(group, {})
+            new = {}
+            for key, (entry_id, entry) in old.items():
+                if wanted.get(key) == entry:
+                    new[key] = (entry_id, entry)
+                else:
+                    self._remove(entry_id, entry)
+            for key, entry in wanted.items():
+                if key not in new:
+                    new[key] = (self._add(entry), entry)
+            if new:
+                self._groups[group] = new
+            else:
+                self._groups.pop(group, None)
+
+    def groups(self):
+        with self._lock:
+            return list(self._groups)
+
+    def _add(self, entry):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        for suffix in self._suffixes(entry["name"]):
+            insort(self._tokens, (suffix, entry_id))
+        return entry_id
+
+    def _remove(self, entry_id, entry):
+        self._entries.pop(entry_id, None)
+        for suffix in self._suffixes(entry["name"]):
+            i = bisect_left(self._tokens, (suffix, entry_id))
+            if i < len(self._tokens) and self._tokens[i] == (suffix, entry_id):
+                del self._tokens[i]
+
+    def suggest(self, query, limit=8):
+        """Up to `limit` entries whose name has a word starting with `query`, best first."""
+        query = normalize_name(query)
+        if not query:
+            return []
+        matches = {}
+        with self._lock:
+            # Every match is ranked, not just the first ones in name order
+            i = bisect_left(self._tokens, (query,))
+            while i < len(self._tokens):
+                suffix, entry_id = self._tokens[i]
+                if not suffix.startswith(query):
+                    break
+                matches[entry_id] = self._entries[entry_id]
+                i += 1
+
+        def rank(entry):
+            name = normalize_name(entry["name"])
+            return (not name.startswith(query), KIND_RANK.get(entry["kind"], 9), len(name), name)
+
+        # A heap pops only as many entries as the limit (plus duplicates) needs
+        heap = [(rank(entry), entry_id) for entry_id, entry in matches.items()]
+        heapq.heapify(heap)
+        results = []
+        seen = set()
+        while heap:
+            entry = matches[heapq.heappop(heap)[1]]
+            name = normalize_name(entry["name"])
+            if name in seen:
+                continue  # The same station as favorite and preset: keep the better one
+            seen.add(name)
+            results.append({k: v for k, v in entry.items() if k != "key"})
+            if len(results) >= limit:
+                break
+        return results
@@ -0,0 +1,109 @@
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from art_cache import ArtCache
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 1000  # Only the signature matters without Pillow
+
+
+class TestArtCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.hits = []
+
+        hits = self.hits
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.path)
+                body = PNG if self.path.endswith(".png") else b"<html>not an image</html>"
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def test_fetches_once(self):
+        cache = ArtCache(self.dir, allow_private=True)
+        path, mime = cache.get(self.base + "/logo.png")
+        self.assertEqual(mime, "image/png")
+        self.assertEqual(cache.get(self.base + "/logo.png")[0], path)
+        self.assertIsNotNone(cache.get(self.base + "/logo.png", 64))  # Thumbnail (or original) from disk
+        self.assertIsNotNone(ArtCache(self.dir, allow_private=True).get(self.base + "/logo.png"))  # Survives a restart
+        self.assertEqual(len(self.hits), 1)
+
+    def test_failures_are_remembered(self):
+        cache = ArtCache(self.dir, allow_private=True)
+        self.assertIsNone(cache.get(self.base + "/page.html"))
+        self.assertIsNone(cache.get(self.base + "/page.html"))
+        self.assertEqual(len(self.hits), 1)
+
+    def test_lru_eviction(self):
+        cache = ArtCache(self.dir, max_bytes=2500, allow_private=True)
+        for name in ("a", "b", "c"):
+            cache.get(f"{self.base}/{name}.png")
+        cache.get(f"{self.base}/b.png")
+        cache.get(f"{self.base}/d.png")
+        self.assertEqual(len(self.hits), 4)
+        cache.get(f"{self.base}/b.png")  # Recently used, still cached
+        self.assertEqual(len(self.hits), 4)
+        cache.get(f"{self.base}/a.png")  # Evicted
+        self.assertEqual(len(self.hits), 5)
+
+    def test_unscalable_image_is_cached_per_size(self):
+        cache = ArtCache(self.dir, allow_private=True)
+        thumbs = []
+        cache._thumbnail = lambda data, size: thumbs.append(size)  # Returns None: can't scale
+        path, _ = cache.get(self.base + "/logo.png", 64)
+        self.assertTrue(path.endswith("-64"))
+        cache.get(self.base + "/logo.png", 64)
+        self.assertEqual(thumbs, [64])
+
+    def test_hits_do_not_touch_files(self):
+        cache = ArtCache(self.dir, allow_private=True)
+        path, _ = cache.get(self.base + "/logo.png")
+        os.utime(path, (1, 1))
+        cache.get(self.base + "/logo.png")
+        self.assertEqual(os.stat(path).st_mtime, 1)
+
+    def test_private_hosts_are_refused(self):
+        cache = ArtCache(self.dir)
+        self.assertIsNone(cache.get(self.base + "/logo.png"))
+        self.assertIsNone(cache.get("http://169.254.169.254/logo.png"))
+        self.assertEqual(self.hits, [])
+
+    def test_connection_is_pinned_to_the_vetted_address(self):
+        # A host that resolves to a public address when checked, and to us afterwards
+        answers = [[(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 80))]]
+        answers.append([(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", self.server.server_address[1]))])
+        real_getaddrinfo = socket.getaddrinfo
+
+        def getaddrinfo(host, *args, **kwargs):
+            return answers.pop(0) if host == "rebind.example" else real_getaddrinfo(host, *args, **kwargs)
+
+        cache = ArtCache(self.dir, timeout=0.5)
+        with mock.patch("socket.getaddrinfo", getaddrinfo), \
+                mock.patch("ipaddress.IPv4Address.is_global", new_callable=mock.PropertyMock, return_value=True):
+            self.assertIsNone(cache.get("http://rebind.example/logo.png"))
+        self.assertEqual(self.hits, [])
+        self.assertEqual(len(answers), 1)  # Resolved only once
+
+
+if __name__ == "__main__":
+    unittest.main()
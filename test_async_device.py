@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from async_device import AsyncHttp, AsyncSoundTouchClient, DeviceError, DeviceLoop
+
+NOW_PLAYING = (b'<nowPlaying deviceID="ABC" source="TUNEIN"><ContentItem source="TUNEIN" isPresetable="true">'
+               b'<itemName>SRF 3</itemName></ContentItem><track>Song</track><artist>Band</artist>'
+               b'<playStatus>PLAY_STATE</playStatus></nowPlaying>')
+VOLUME = (b'<volume deviceID="ABC"><targetvolume>20</targetvolume><actualvolume>20</actualvolume>'
+          b'<muteenabled>false</muteenabled></volume>')
+
+
+class FakeSpeaker(BaseHTTPRequestHandler):
+    """Stand-in for a speaker's port 8090 API; records requests and connections."""
+    protocol_version = "HTTP/1.1"
+    delay = 0
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def reply(self, body, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        self.server.gets.append(self.path)
+        if self.path == "/hangup":
+            self.close_connection = True  # Drops the connection without answering
+        elif self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            self.wfile.write(b"4\r\n<ok>\r\n5;x=1\r\n</ok>\r\n0\r\nX-Trailer: 1\r\n\r\n")
+        elif self.path == "/no_length":
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"<ok/>")
+        elif self.path == "/now_playing":
+            self.reply(NOW_PLAYING)
+        elif self.path == "/volume":
+            self.reply(VOLUME)
+        else:
+            self.reply(b'<errors deviceID="ABC"><error value="401" name="HTTP_STATUS_NOT_FOUND">x</error></errors>', 404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.posts.append((self.path, body.decode()))
+        if self.path == "/hangup":
+            self.close_connection = True
+            return
+        self.reply(b'<status>/key</status>')
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncDevice(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = DeviceLoop()
+
+    def setUp(self):
+        FakeSpeaker.delay = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeSpeaker)
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.posts = []
+        self.server.gets = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.http = AsyncHttp(per_host=2)
+        self.client = AsyncSoundTouchClient(self.http, "127.0.0.1", port=self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_models_and_keep_alive(self):
+        status = self.loop.run(self.client.now_playing(), timeout=5)
+        self.assertEqual(status.Source, "TUNEIN")
+        self.assertEqual(status.Track, "Song")
+        volume = self.loop.run(self.client.volume(), timeout=5)
+        self.assertEqual(volume.Actual, 20)
+        self.loop.run(self.client.key("PLAY_PAUSE"), timeout=5)
+        self.loop.run(self.client.set_volume(30), timeout=5)
+        self.assertEqual(self.server.posts, [
+            ("/key", '<key state="press" sender="Gabbo">PLAY_PAUSE</key>'),
+            ("/key", '<key state="release" sender="Gabbo">PLAY_PAUSE</key>'),
+            ("/volume", "<volume>30</volume>"),
+        ])
+        self.assertEqual(self.server.connections, 1)  # one socket for all five requests
+
+    def test_error_document_raises(self):
+        with self.assertRaises(DeviceError):
+            self.loop.run(self.client.zone(), timeout=5)
+
+    def test_per_host_limit(self):
+        FakeSpeaker.delay = 0.2
+
+        async def many():
+            return await asyncio.gather(*(self.client.now_playing() for _ in range(4)))
+
+        started = time.time()
+        self.assertEqual(len(self.loop.run(many(), timeout=5)), 4)
+        elapsed = time.time() - started
+        self.assertGreaterEqual(elapsed, 0.4)  # 4 requests, 2 at a time
+        self.assertLess(elapsed, 0.7)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_run_timeout_cancels_the_coroutine(self):
+        landed = []
+
+        async def slow():
+            await asyncio.sleep(0.3)
+            landed.append(True)
+
+        with self.assertRaises(TimeoutError):
+            self.loop.run(slow(), timeout=0.05)
+        time.sleep(0.4)
+        self.assertEqual(landed, [])
+
+    def request(self, method, path, body=None):
+        port = self.server.server_address[1]
+        return self.loop.run(self.http.request(method, "127.0.0.1", port, path, body), timeout=5)
+
+    def test_chunked_and_missing_length(self):
+        self.assertEqual(self.request("GET", "/chunked"), (200, b"<ok></ok>"))
+        self.assertEqual(self.request("GET", "/volume")[0], 200)
+        self.assertEqual(self.server.connections, 1)  # Trailer consumed, connection reused
+        started = time.time()
+        with self.assertRaises(DeviceError):
+            self.request("GET", "/no_length")
+        self.assertLess(time.time() - started, 1)
+
+    def test_only_gets_are_retried(self):
+        self.request("GET", "/volume")  # Leaves an idle connection
+        with self.assertRaises((ConnectionError, asyncio.IncompleteReadError)):
+            self.request("POST", "/hangup", "<key/>")
+        self.assertEqual(len(self.server.posts), 1)
+
+        self.request("GET", "/volume")
+        with self.assertRaises((ConnectionError, asyncio.IncompleteReadError)):
+            self.request("GET", "/hangup")
+        self.assertEqual(self.server.gets.count("/hangup"), 2)  # Retried once on a new connection
+
+
+if __name__ == "__main__":
+    unittest.main()
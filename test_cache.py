@@ -0,0 +1,71 @@
+import time
+import unittest
+from cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_get_set_and_expiry(self):
+        cache = TTLCache(ttl=0.05)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=10)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.06)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.get("missing", "x"), "x")
+
+    def test_invalidation(self):
+        cache = TTLCache(ttl=10)
+        cache.set(("dev1", "zone"), "z1")
+        cache.set(("dev2", "zone"), "z2")
+        cache.set(("dev1", "presets"), "p1")
+        cache.invalidate_where(lambda key: key[1] == "zone")
+        self.assertIsNone(cache.get(("dev1", "zone")))
+        self.assertIsNone(cache.get(("dev2", "zone")))
+        self.assertEqual(cache.get(("dev1", "presets")), "p1")
+        cache.invalidate(("dev1", "presets"))
+        self.assertIsNone(cache.get(("dev1", "presets")))
+
+    def test_lru_eviction(self):
+        cache = TTLCache(ttl=10, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")      # "b" is now least recently used
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_get_or_load_serves_stale_and_refreshes(self):
+        cache = TTLCache(ttl=0.05, stale_ttl=10)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(cache.get_or_load("k", loader), 1)
+        self.assertEqual(cache.get_or_load("k", loader), 1)
+        time.sleep(0.06)
+        # Stale value comes back immediately, the refresh runs in the background
+        self.assertEqual(cache.get_or_load("k", loader), 1)
+        for _ in range(100):
+            if cache.get("k") == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(cache.get("k"), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_loader_errors_are_not_cached(self):
+        cache = TTLCache(ttl=10)
+
+        def failing():
+            raise IOError("down")
+
+        with self.assertRaises(IOError):
+            cache.get_or_load("k", failing)
+        self.assertEqual(cache.get_or_load("k", lambda: "ok"), "ok")
+
+
+if __name__ == '__main__':
+    unittest.main()
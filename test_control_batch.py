@@ -0,0 +1,22 @@
+import unittest
+from app import app
+
+
+class TestControlBatch(unittest.TestCase):
+    def setUp(self):
+        self.app = app.test_client()
+
+    def test_device_ids_must_be_a_list_of_strings(self):
+        for device_ids in ("abc", 42, {"a": 1}, ["a", 1], [None]):
+            response = self.app.post('/api/control/batch', json={"action": "pause", "device_ids": device_ids})
+            self.assertEqual(response.status_code, 400, device_ids)
+            self.assertFalse(response.get_json()["success"])
+
+    def test_unknown_devices_are_reported_per_device(self):
+        response = self.app.post('/api/control/batch', json={"action": "pause", "device_ids": ["missing"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.get_json()["results"]["missing"]["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
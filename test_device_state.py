@@ -0,0 +1,92 @@
+import threading
+import time
+import unittest
+from device_state import DeviceStateStore, diff_snapshots
+
+
+def _device(device_id, volume=10):
+    return {"id": device_id, "name": device_id, "volume": volume}
+
+
+class TestDeviceStateStore(unittest.TestCase):
+    def setUp(self):
+        self.store = DeviceStateStore()
+
+    def test_replace_bumps_version_only_on_change(self):
+        changed = self.store.replace([_device("a"), _device("b")])
+        self.assertEqual(changed, {"a", "b"})
+        self.assertEqual(self.store.version, 1)
+
+        changed = self.store.replace([_device("a"), _device("b")])
+        self.assertEqual(changed, set())
+        self.assertEqual(self.store.version, 1)
+
+        changed = self.store.replace([_device("a", volume=20)])
+        self.assertEqual(changed, {"a", "b"})
+        self.assertEqual(self.store.version, 2)
+        self.assertEqual([d["id"] for d in self.store.snapshot()], ["a"])
+
+    def test_unchanged_devices_keep_identity(self):
+        self.store.replace([_device("a"), _device("b")])
+        before = self.store.get("a")
+        self.store.replace([_device("a"), _device("b", volume=30)])
+        self.assertIs(self.store.get("a"), before)
+        self.assertEqual(self.store.device_version("b"), 2)
+        self.assertEqual(self.store.device_version("a"), 1)
+
+    def test_update_merges_without_mutating(self):
+        self.store.replace([_device("a")])
+        old = self.store.get("a")
+        self.assertTrue(self.store.update("a", {"volume": 50}))
+        self.assertEqual(old["volume"], 10)
+        self.assertEqual(self.store.get("a")["volume"], 50)
+        self.assertFalse(self.store.update("a", {"volume": 50}))
+        self.assertFalse(self.store.update("missing", {"volume": 1}))
+
+    def test_wait_for_change(self):
+        self.store.replace([_device("a")])
+        version = self.store.version
+
+        def later():
+            time.sleep(0.05)
+            self.store.update("a", {"volume": 99})
+
+        threading.Thread(target=later).start()
+        self.assertEqual(self.store.wait_for_change(version, timeout=2), version + 1)
+        self.assertEqual(self.store.wait_for_change(version + 1, timeout=0.01), version + 1)
+
+
+class TestDiffSnapshots(unittest.TestCase):
+    def test_no_change(self):
+        devices = [_device("a"), _device("b")]
+        self.assertIsNone(diff_snapshots(devices, list(devices)))
+
+    def test_changed_fields_only(self):
+        old = [_device("a"), _device("b")]
+        new = [old[0], _device("b", volume=42)]
+        self.assertEqual(diff_snapshots(old, new), {"devices": {"b": {"volume": 42}}})
+
+    def test_added_removed_and_order(self):
+        old = [_device("a"), _device("b")]
+        new = [_device("c"), old[0]]
+        delta = diff_snapshots(old, new)
+        self.assertEqual(delta["devices"], {"c": _device("c")})
+        self.assertEqual(delta["removed"], ["b"])
+        self.assertEqual(delta["order"], ["c", "a"])
+
+    def test_dropped_fields_are_cleared(self):
+        old = [dict(_device("a"), is_stale=True)]
+        new = [_device("a")]
+        self.assertEqual(diff_snapshots(old, new), {"cleared": {"a": ["is_stale"]}})
+        new = [_device("a", volume=5)]
+        self.assertEqual(diff_snapshots(old, new),
+                         {"devices": {"a": {"volume": 5}}, "cleared": {"a": ["is_stale"]}})
+
+    def test_new_field_with_none_value(self):
+        old = [_device("a")]
+        new = [dict(_device("a"), zone=None)]
+        self.assertEqual(diff_snapshots(old, new), {"devices": {"a": {"zone": None}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
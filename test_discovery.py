@@ -0,0 +1,106 @@
+import asyncio
+import socket
+import sys
+import threading
+import time
+import types
+import unittest
+from unittest import mock
+from discovery import DiscoveryService
+
+
+def stub_zeroconf(addresses):
+    """A stand-in zeroconf module whose browser hands its handlers to the test."""
+    module = types.ModuleType("zeroconf")
+    module.browsers = []
+    module.IPVersion = types.SimpleNamespace(V4Only="v4")
+
+    class Info:
+        def parsed_addresses(self, version):
+            return addresses
+
+    class Zeroconf:
+        def get_service_info(self, service_type, name, timeout=None):
+            return Info()
+
+        def close(self):
+            pass
+
+    class ServiceBrowser:
+        def __init__(self, zeroconf, service_type, handlers):
+            self.zeroconf, self.service_type, self.handlers = zeroconf, service_type, handlers
+            module.browsers.append(self)
+
+    module.Zeroconf, module.ServiceBrowser = Zeroconf, ServiceBrowser
+    return module
+
+
+class TestDiscoveryService(unittest.TestCase):
+    def test_concurrent_scans_share_one(self):
+        calls = []
+
+        def on_found(ip):
+            calls.append(ip)
+            time.sleep(0.2)
+            return ip == "10.0.0.1"
+
+        discovery = DiscoveryService(on_found, lambda: ["10.0.0.1", "10.0.0.2"], mdns=False)
+        started, status = discovery.scan()
+        self.assertTrue(started)
+        self.assertTrue(status["running"])
+        started_again, _ = discovery.scan(wait=True)
+        self.assertFalse(started_again)
+        status = discovery.status()
+        self.assertEqual(sorted(calls), ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual((status["running"], status["done"], status["total"], status["found"]),
+                         (False, 2, 2, ["10.0.0.1"]))
+
+    def test_sweep_finds_open_port(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen()
+        self.addCleanup(server.close)
+        threading.Thread(target=lambda: server.accept(), daemon=True).start()
+
+        found = []
+        discovery = DiscoveryService(lambda ip: found.append(ip) or True, lambda: [],
+                                     cidr="127.0.0.1/32", port=server.getsockname()[1],
+                                     sweep_deadline=2, mdns=False)
+        _, status = discovery.scan(wait=True)
+        self.assertEqual(found, ["127.0.0.1"])
+        self.assertEqual(status["found"], ["127.0.0.1"])
+
+    def test_oversized_network_is_skipped(self):
+        discovery = DiscoveryService(lambda ip: True, lambda: [], cidr="10.0.0.0/8", mdns=False)
+        self.assertEqual(discovery._sweep_hosts(set()), [])
+
+    def test_deadline_reports_skipped_hosts(self):
+        async def never_connects(host, port):
+            await asyncio.sleep(10)
+
+        discovery = DiscoveryService(lambda ip: True, lambda: [], cidr="10.9.9.0/29",
+                                     connect_timeout=10, sweep_deadline=0.2, mdns=False)
+        with mock.patch("discovery.asyncio.open_connection", never_connects):
+            _, status = discovery.scan(wait=True)
+        self.assertEqual(status["phase"], "done")
+        self.assertEqual((status["total"], status["done"], status["skipped"]), (6, 0, 6))
+
+    def test_mdns_announcement_is_checked(self):
+        zeroconf = stub_zeroconf(["10.0.0.7"])
+        found = threading.Event()
+        seen = []
+        discovery = DiscoveryService(lambda ip: seen.append(ip) or found.set() or True, lambda: [])
+        with mock.patch.dict(sys.modules, {"zeroconf": zeroconf}):
+            self.assertTrue(discovery.start_browser())
+            browser = zeroconf.browsers[0]
+            self.assertEqual(browser.service_type, "_soundtouch._tcp.local.")
+            added = types.SimpleNamespace(name="Added")
+            browser.handlers[0](browser.zeroconf, browser.service_type, "Kitchen._soundtouch._tcp.local.", added)
+            self.assertTrue(found.wait(2))
+        self.assertEqual(seen, ["10.0.0.7"])
+        self.assertEqual(discovery.mdns_seen, {"10.0.0.7": "Kitchen._soundtouch._tcp.local."})
+        discovery.stop_browser()
+
+
+if __name__ == "__main__":
+    unittest.main()
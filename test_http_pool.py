@@ -0,0 +1,50 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib3.exceptions import EmptyPoolError, ReadTimeoutError
+from http_pool import HttpPool
+
+
+class TestHttpPool(unittest.TestCase):
+    def setUp(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/slow":
+                    time.sleep(1)
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_waiting_for_a_connection_times_out(self):
+        pool = HttpPool(pool_size=1, pool_timeout=0.2)
+        held = pool.request("GET", self.base + "/", preload_content=False)  # Keeps the only connection
+        started = time.time()
+        with self.assertRaises(EmptyPoolError):
+            pool.request("GET", self.base + "/", retries=False)
+        self.assertLess(time.time() - started, 1)
+        held.release_conn()
+        self.assertEqual(pool.request("GET", self.base + "/").data, b"ok")
+
+    def test_timeout_view(self):
+        pool = HttpPool(read_timeout=5)
+        with self.assertRaises(ReadTimeoutError):
+            pool.with_timeout(0.5, 0.2).request("GET", self.base + "/slow", retries=False)
+        self.assertEqual(pool.with_timeout(0.5, 0.2).request("GET", self.base + "/").data, b"ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
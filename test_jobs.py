@@ -0,0 +1,41 @@
+import time
+import unittest
+from jobs import JobRegistry
+
+
+def wait_finished(jobs, job_id, timeout=2):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = jobs.get(job_id)
+        if job["status"] != "running":
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+class TestJobRegistry(unittest.TestCase):
+    def test_success_and_failure(self):
+        jobs = JobRegistry()
+        ok = jobs.submit("test", lambda x: {"success": True, "x": x}, 1)
+        refused = jobs.submit("test", lambda: {"success": False, "message": "no"})
+        crashed = jobs.submit("test", lambda: 1 / 0)
+
+        job = wait_finished(jobs, ok)
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], {"success": True, "x": 1})
+        self.assertIsNotNone(job["elapsed_ms"])
+        self.assertEqual(wait_finished(jobs, refused)["status"], "failed")
+        self.assertEqual(wait_finished(jobs, crashed)["result"]["success"], False)
+        self.assertIsNone(jobs.get("unknown"))
+
+    def test_finished_jobs_expire(self):
+        jobs = JobRegistry(keep=0)
+        first = jobs.submit("test", lambda: None)
+        wait_finished(jobs, first)
+        time.sleep(0.01)
+        jobs.submit("test", lambda: None)
+        self.assertIsNone(jobs.get(first))
+
+
+if __name__ == "__main__":
+    unittest.main()
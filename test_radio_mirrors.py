@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from radio_browser import RadioBrowser
+
+STATION = {"stationuuid": "abc", "name": "Test FM", "url_resolved": "http://stream.example/test",
+           "favicon": "", "countrycode": "CH", "tags": "news", "bitrate": 128}
+
+
+def start_mirror(delay=0, status=200, name="Test FM"):
+    """Local stand-in for a Radio Browser mirror. Returns (base_url, server)."""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = json.dumps([dict(STATION, name=name)]).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
+
+
+class TestRadioMirrors(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def mirror(self, **kwargs):
+        url, server = start_mirror(**kwargs)
+        self.servers.append(server)
+        return url
+
+    def test_fails_over_to_next_mirror(self):
+        broken = self.mirror(status=500)
+        good = self.mirror(name="Good")
+        api = RadioBrowser(servers=[broken, good], hedge_delay=2)
+        started = time.time()
+        results = api.search_stations("test")
+        self.assertEqual(results[0]["name"], "Good")
+        self.assertLess(time.time() - started, 1) # didn't wait for the hedge delay
+        self.assertEqual(api.mirrors.ranked()[0], good)
+        self.assertEqual(api.mirrors.health()[broken]["failures"], 1)
+
+    def test_hedges_slow_mirror(self):
+        slow = self.mirror(delay=1, name="Slow")
+        fast = self.mirror(name="Fast")
+        api = RadioBrowser(servers=[slow, fast], hedge_delay=0.1)
+        started = time.time()
+        results = api.get_top_stations(limit=1)
+        self.assertEqual(results[0]["name"], "Fast")
+        self.assertLess(time.time() - started, 0.8)
+        self.assertEqual(api.base_url, fast)
+
+    def test_all_mirrors_down(self):
+        api = RadioBrowser(servers=[self.mirror(status=500), self.mirror(status=503)], hedge_delay=0.1)
+        self.assertEqual(api.get_top_stations(), [])
+        self.assertEqual(api.search_stations("x"), [])
+
+    def test_bad_query_does_not_mark_mirrors_down(self):
+        first, second = self.mirror(status=400), self.mirror(status=400)
+        api = RadioBrowser(servers=[first, second], hedge_delay=2)
+        self.assertEqual(api.search_stations("x"), [])
+        health = api.mirrors.health()
+        self.assertEqual((health[first]["failures"], health[second]["failures"]), (0, 0))
+        self.assertEqual(health[first]["down_until"], 0)
+
+    def test_ranking_follows_latency(self):
+        api = RadioBrowser(servers=["http://a", "http://b", "http://c"])
+        api.mirrors.record_success("http://a", 0.4)
+        api.mirrors.record_success("http://b", 0.1)
+        api.mirrors.record_failure("http://c")
+        self.assertEqual(api.mirrors.ranked(), ["http://b", "http://a", "http://c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from scenes import SceneStore
+
+
+class FakeManager:
+    """Records the manager calls a scene makes; each call takes 0.1s."""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def _call(self, *call):
+        time.sleep(0.1)
+        with self.lock:
+            self.calls.append(call)
+        return {"success": True}
+
+    def create_zone(self, master_id, member_ids):
+        return self._call("zone", master_id, tuple(member_ids))
+
+    def set_volume(self, device_id, level):
+        return self._call("volume", device_id, level)
+
+    def play_url(self, device_id, url, title="Stream"):
+        return self._call("url", device_id, url)
+
+    def play_tunein(self, device_id, guide_id, name="Station"):
+        return self._call("tunein", device_id, guide_id)
+
+    def select_source(self, device_id, source):
+        return {"success": False, "message": "no aux"}
+
+    def get_favorites_list(self):
+        return [{"name": "SRF 3", "type": "tunein", "guide_id": "s24862"}]
+
+
+class TestSceneStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "scenes.json")
+        self.manager = FakeManager()
+        self.scenes = SceneStore(self.manager, self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_validate_and_persist(self):
+        self.assertFalse(self.scenes.save("", {"devices": {"a": {}}})["success"])
+        self.assertFalse(self.scenes.save("x", {"devices": {}})["success"])
+        self.assertFalse(self.scenes.save("x", {"devices": {"a": {}}, "zone": {"master": "a"}})["success"])
+        self.assertTrue(self.scenes.save("morning", {"devices": {"a": {"volume": 20}}})["success"])
+        self.assertIn("morning", SceneStore(self.manager, self.path).list())
+        self.assertTrue(self.scenes.delete("morning")["success"])
+        self.assertFalse(self.scenes.delete("morning")["success"])
+
+    def test_apply_runs_concurrently(self):
+        self.scenes.save("morning", {
+            "zone": {"master": "kitchen", "members": ["kitchen", "bath"]},
+            "devices": {
+                "kitchen": {"volume": 20, "favorite": "SRF 3"},
+                "bath": {"volume": 15, "url": "http://ignored/follower"},
+                "office": {"volume": 10, "url": "http://stream/jazz"},
+            },
+        })
+        started = time.time()
+        result = self.scenes.apply("morning")
+        self.assertLess(time.time() - started, 0.35)
+        self.assertTrue(result["success"])
+        self.assertEqual(len(result["steps"]), 6)
+        self.assertIn(("zone", "kitchen", ("bath",)), self.manager.calls)
+        self.assertIn(("tunein", "kitchen", "s24862"), self.manager.calls)
+        self.assertIn(("url", "office", "http://stream/jazz"), self.manager.calls)
+        self.assertNotIn(("url", "bath", "http://ignored/follower"), self.manager.calls)
+        # The zone is built once the master plays the new source
+        self.assertLess(self.manager.calls.index(("tunein", "kitchen", "s24862")),
+                        self.manager.calls.index(("zone", "kitchen", ("bath",))))
+
+    def test_concurrent_saves_keep_every_scene(self):
+        threads = [threading.Thread(target=self.scenes.save, args=(f"s{i}", {"devices": {"a": {"volume": i}}}))
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(SceneStore(self.manager, self.path).list()), 20)
+
+    def test_apply_reports_failed_steps(self):
+        self.scenes.save("tv", {"devices": {"a": {"source": "AUX"}, "b": {"favorite": "Missing"}}})
+        result = self.scenes.apply("tv")
+        self.assertFalse(result["success"])
+        self.assertEqual([s["success"] for s in result["steps"]], [False, False])
+        self.assertFalse(self.scenes.apply("unknown")["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
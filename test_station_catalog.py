@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from radio_browser import RadioBrowser
+from station_catalog import StationCatalog, iter_json_array
+
+
+def station(uuid, name, country="CH", tags="", bitrate=128, clicks=0, changed="2024-01-01"):
+    return {"stationuuid": uuid, "name": name, "url_resolved": f"http://stream.example/{uuid}",
+            "countrycode": country, "tags": tags, "bitrate": bitrate, "clickcount": clicks,
+            "lastchangetime_iso8601": changed}
+
+
+def chunked(records, size=7):
+    data = json.dumps(records).encode("utf-8")
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+class TestStationCatalog(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.catalog = StationCatalog(os.path.join(self.dir, "stations.db"))
+        self.stations = [
+            station("a", "Radio Zürich", tags="pop,news", clicks=10),
+            station("b", "Jazz Radio", country="DE", tags="jazz", bitrate=320, clicks=50),
+            station("c", "Zürisee Jazz", tags="jazz", bitrate=64, clicks=5),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_stream_parser(self):
+        self.assertEqual(list(iter_json_array(chunked(self.stations))), self.stations)
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[{"a": 1}, {"b"']))
+
+    def test_incremental_import(self):
+        self.assertEqual(self.catalog.import_stations(iter_json_array(chunked(self.stations))),
+                         {"stations": 3, "changed": 3, "removed": 0})
+        renamed = station("a", "Radio Zürich 1", tags="pop,news", clicks=99, changed="2024-02-01")
+        result = self.catalog.import_stations([renamed, self.stations[1]])
+        self.assertEqual(result, {"stations": 2, "changed": 1, "removed": 1})
+        self.assertEqual([s["name"] for s in self.catalog.search("radio")], ["Radio Zürich 1", "Jazz Radio"])
+        self.assertEqual(self.catalog.search("zurisee"), [])
+
+    def test_search_and_filters(self):
+        self.catalog.import_stations(self.stations)
+        self.assertEqual([s["id"] for s in self.catalog.search("zur")], ["a", "c"])  # Prefix, accents folded
+        self.assertEqual([s["id"] for s in self.catalog.search("jazz")], ["b", "c"])
+        self.assertEqual([s["id"] for s in self.catalog.search("jazz", country_code="ch")], ["c"])
+        self.assertEqual([s["id"] for s in self.catalog.search(None, tag="news")], ["a"])
+        self.assertEqual([s["id"] for s in self.catalog.search(None, min_bitrate=128)], ["b", "a"])
+        self.assertEqual([s["id"] for s in self.catalog.top("CH", limit=1)], ["a"])
+
+    def test_radio_browser_uses_catalog(self):
+        radio = RadioBrowser(servers=["http://127.0.0.1:9"], catalog=self.catalog)
+        self.catalog.import_stations(self.stations)
+        self.assertEqual(radio.search_stations("jazz")[0]["name"], "Jazz Radio")
+        self.assertEqual(len(radio.get_top_stations(limit=2)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
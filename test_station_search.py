@@ -0,0 +1,57 @@
+import time
+import unittest
+from station_search import FederatedSearch, merge_results, normalize_name, stream_host
+
+
+class TestMergeResults(unittest.TestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize_name("  SRF 3 (Swiss)! "), "srf 3 swiss")
+        self.assertEqual(stream_host("http://www.Stream.example:8000/live"), "stream.example")
+        self.assertEqual(stream_host(None), "")
+
+    def test_dedupe_by_name_and_host(self):
+        results = merge_results([
+            ("tunein", [{"name": "SRF 3", "guide_id": "s1"}]),
+            ("radiobrowser", [
+                {"name": "srf 3", "url": "http://stream.srg-ssr.ch/srf3"},
+                {"name": "SRF 3", "url": "http://other.example/srf3"},
+            ]),
+        ], "srf")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["source"], "tunein")
+        self.assertEqual(results[0]["also_in"], ["radiobrowser"])
+        self.assertEqual(results[1]["url"], "http://other.example/srf3")
+
+    def test_ranking(self):
+        results = merge_results([
+            ("favorite", [{"name": "Jazz Radio Bern"}]),
+            ("radiobrowser", [{"name": "Smooth Jazz", "url": "http://a/1"}, {"name": "Jazz", "url": "http://b/1"}]),
+        ], "jazz")
+        self.assertEqual([r["name"] for r in results], ["Jazz Radio Bern", "Jazz", "Smooth Jazz"])
+
+
+class TestFederatedSearch(unittest.TestCase):
+    def test_deadline_and_errors(self):
+        def slow(query):
+            time.sleep(0.5)
+            return [{"name": "Late"}]
+
+        def broken(query):
+            raise RuntimeError("down")
+
+        search = FederatedSearch([
+            ("fast", lambda q: [{"name": q.upper()}]),
+            ("slow", slow),
+            ("broken", broken),
+        ], deadline=0.1)
+        started = time.time()
+        result = search.search("news")
+        self.assertLess(time.time() - started, 0.4)
+        self.assertEqual([r["name"] for r in result["results"]], ["NEWS"])
+        self.assertEqual(result["providers"]["fast"]["status"], "ok")
+        self.assertEqual(result["providers"]["slow"]["status"], "timeout")
+        self.assertEqual(result["providers"]["broken"]["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
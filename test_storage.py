@@ -0,0 +1,59 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import storage
+from storage import FavoritesStore, JsonStore, atomic_write_json, read_json
+
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "data.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_atomic_write_keeps_old_file_on_error(self):
+        atomic_write_json(self.path, {"a": 1})
+        with self.assertRaises(TypeError):
+            atomic_write_json(self.path, {"a": object()})
+        self.assertEqual(read_json(self.path, None), {"a": 1})
+        self.assertEqual(os.listdir(self.dir), ["data.json"])  # no temp files left behind
+
+    def test_debounced_saves_are_coalesced(self):
+        store = JsonStore(self.path, delay=0.1)
+        with mock.patch.object(storage, "atomic_write_json", wraps=atomic_write_json) as write:
+            for i in range(10):
+                store.save([i])
+            self.assertFalse(os.path.exists(self.path))
+            time.sleep(0.3)
+            self.assertEqual(write.call_count, 1)
+        self.assertEqual(read_json(self.path, None), [9])
+
+    def test_favorites_ids_and_indexes(self):
+        with open(self.path, "w") as f:
+            json.dump([{"name": "Old", "url": "http://old/stream", "type": "url"}], f)
+        store = FavoritesStore(self.path, delay=0)
+        old = store.list()[0]
+        self.assertTrue(old["id"])  # legacy entry migrated
+        self.assertEqual(read_json(self.path, None)[0]["id"], old["id"])
+
+        radio = store.add({"name": "Radio", "url": "http://r/s", "type": "url"})
+        self.assertIs(store.get(radio["id"]), radio)
+        self.assertIs(store.find_by_url("http://r/s"), radio)
+        self.assertIs(store.add({"name": "Again", "url": "http://r/s", "type": "url"}), radio)
+
+        version = store.version
+        self.assertTrue(store.remove(old["id"]))
+        self.assertFalse(store.remove(old["id"]))
+        self.assertGreater(store.version, version)
+        self.assertIsNone(store.find_by_url("http://old/stream"))
+        self.assertEqual([f["id"] for f in FavoritesStore(self.path).list()], [radio["id"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
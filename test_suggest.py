@@ -0,0 +1,52 @@
+import unittest
+from suggest import SuggestIndex
+
+
+class TestSuggestIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = SuggestIndex()
+        self.index.set_group("favorite", [
+            {"key": "f1", "kind": "favorite", "name": "Radio SRF 3"},
+            {"key": "f2", "kind": "favorite", "name": "SWR3"},
+        ])
+        self.index.set_group(("preset", "dev1"), [
+            {"key": 1, "kind": "preset", "name": "SRF 1"},
+            {"key": 2, "kind": "preset", "name": "Radio SRF 3"},
+        ])
+        self.index.set_group("recent", [{"kind": "recent", "name": "Jazz Lounge"}])
+
+    def names(self, query):
+        return [(s["kind"], s["name"]) for s in self.index.suggest(query)]
+
+    def test_word_prefix_and_ranking(self):
+        # Names starting with the query first; the favorite wins over the same preset
+        self.assertEqual(self.names("srf"), [("preset", "SRF 1"), ("favorite", "Radio SRF 3")])
+        self.assertEqual(self.names("SRF 3"), [("favorite", "Radio SRF 3")])
+        self.assertEqual(self.names("lou"), [("recent", "Jazz Lounge")])
+        self.assertEqual(self.names("xyz"), [])
+        self.assertEqual(self.names(""), [])
+
+    def test_incremental_update(self):
+        self.index.set_group(("preset", "dev1"), [{"key": 1, "kind": "preset", "name": "DRS Virus"}])
+        self.assertEqual(self.names("srf"), [("favorite", "Radio SRF 3")])
+        self.assertEqual(self.names("vir"), [("preset", "DRS Virus")])
+        self.index.set_group("favorite", [])
+        self.assertEqual(self.names("srf"), [])
+        self.assertEqual(len(self.index._tokens), 4)  # No stale tokens left: 2 words each
+
+    def test_ranks_all_matches(self):
+        # 300 recent titles that sort before the favorite must not push it out
+        self.index.set_group("recent", [{"kind": "recent", "name": f"Radio A{i:03}"} for i in range(300)])
+        self.index.set_group("favorite", [{"key": "f", "kind": "favorite", "name": "Radio Zurich"}])
+        self.assertEqual(self.names("radio")[0], ("favorite", "Radio Zurich"))
+        self.assertEqual(len(self.names("radio")), 8)
+
+    def test_dropped_group_disappears(self):
+        self.assertIn(("preset", "dev1"), self.index.groups())
+        self.index.set_group(("preset", "dev1"), [])
+        self.assertNotIn(("preset", "dev1"), self.index.groups())
+        self.assertEqual(self.names("srf"), [("favorite", "Radio SRF 3")])
+
+
+if __name__ == "__main__":
+    unittest.main()
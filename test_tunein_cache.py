@@ -0,0 +1,70 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from tunein_api import TuneInAPI
+
+
+def station(guide_id):
+    return {"item": "station", "type": "audio", "guide_id": guide_id, "text": f"Station {guide_id}"}
+
+
+class TestTuneInCache(unittest.TestCase):
+    def setUp(self):
+        self.hits = []
+        hits = self.hits
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                hits.append((url.path, query.get('c', [None])[0]))
+                base = f"http://127.0.0.1:{self.server.server_address[1]}"
+                if url.path == "/Browse.ashx" and 'c' not in query:
+                    body = [{"key": "music", "text": "Music", "URL": f"{base}/Browse.ashx?c=music"}]
+                else:
+                    body = [{"children": [station(f"s{i}") for i in range(3)]}]
+                payload = json.dumps({"body": body}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api = TuneInAPI()
+        self.api.BASE_URL = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_browse_uses_cached_category_tree(self):
+        self.assertEqual(self.api.get_categories(), [{"key": "music", "name": "Music"}])
+        self.assertEqual(len(self.api.browse("music", limit=2)), 2)
+        self.assertEqual(len(self.hits), 2) # tree once, then only the category list
+        self.assertEqual(len(self.api.browse("music")), 3)
+        self.assertEqual(len(self.hits), 2) # served from cache
+        self.assertEqual(self.api.browse("unknown"), [])
+
+    def test_stale_list_served_while_refreshing(self):
+        self.api.get_popular()
+        self.api.cache.set(('popular',), [{"id": "old"}], ttl=0)
+        self.assertEqual(self.api.get_popular(), [{"id": "old"}])
+        for _ in range(50):
+            if len(self.api.get_popular()) == 3:
+                break
+            time.sleep(0.02)
+        self.assertEqual(len(self.api.get_popular()), 3)
+        self.assertEqual(self.hits.count(("/Browse.ashx", "trending")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
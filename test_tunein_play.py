@@ -0,0 +1,72 @@
+import os
+import tempfile
+import threading
+import time
+import types
+import unittest
+from unittest import mock
+import soundtouch_manager
+from soundtouch_manager import SoundTouchManager
+
+
+def now_playing(source, location):
+    item = types.SimpleNamespace(Name="Station", Location=location)
+    return types.SimpleNamespace(Source=source, ContentItem=item)
+
+
+class FakeClient:
+    """Plays the previous station until `switch_after` seconds after SelectContentItem."""
+
+    def __init__(self, switch_after):
+        self.switch_after = switch_after
+        self.selected = None
+
+    def SelectContentItem(self, item):
+        self.selected = (time.time(), item.Location)
+
+    def now_playing(self):
+        if self.selected and time.time() - self.selected[0] >= self.switch_after:
+            return now_playing("TUNEIN", self.selected[1])
+        return now_playing("TUNEIN", "/v1/playback/station/s11111")
+
+
+class TestPlayTuneIn(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        files = {name: os.path.join(self.dir.name, name + ".json")
+                 for name in ("FAVORITES_FILE", "KNOWN_DEVICES_FILE", "GROUPS_FILE", "SNAPSHOT_FILE")}
+        patcher = mock.patch.multiple(soundtouch_manager, DISCOVERY_MDNS=False, **files)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.dir.cleanup)
+        self.manager = SoundTouchManager()
+        self.client = FakeClient(switch_after=0.5)
+        self.manager._get_client = lambda device_id: self.client
+        self.manager._now_playing = lambda client: client.now_playing()
+
+    def test_waits_for_the_requested_station_when_polling(self):
+        started = time.time()
+        result = self.manager.play_tunein("dev", "s24862", "SRF 3")
+        self.assertTrue(result["success"])
+        self.assertGreaterEqual(time.time() - started, 0.5)
+        self.assertEqual(self.client.selected[1], "/v1/playback/station/s24862")
+
+    def test_pushed_state_of_the_old_station_does_not_confirm(self):
+        self.manager.state.replace([{"id": "dev", "source": "TUNEIN",
+                                     "now_playing": {"location": "/v1/playback/station/s11111"}}])
+        self.manager._listeners["dev"] = types.SimpleNamespace(connected=True)
+        self.client.switch_after = 60  # Only pushed events can confirm
+
+        def push(location, delay):
+            time.sleep(delay)
+            self.manager.state.update("dev", {"now_playing": {"location": location, "track": "x"}})
+
+        threading.Thread(target=push, args=("/v1/playback/station/s11111", 0.1)).start()
+        threading.Thread(target=push, args=("/v1/playback/station/s24862", 0.4)).start()
+        started = time.time()
+        self.assertTrue(self.manager.play_tunein("dev", "s24862", "SRF 3")["success"])
+        self.assertGreaterEqual(time.time() - started, 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,26 @@
 import requests
+from cache import TTLCache
 
 class TuneInAPI:
     """
     Client for the TuneIn OPML API (opml.radiotime.com).
     Provides search, browse, and station resolution for SoundTouch devices.
+
+    The category tree and the station lists are cached; expired lists are
+    still served while a background refresh fetches the new ones.
     """
 
     BASE_URL = "https://opml.radiotime.com"
 
+    # Catalog cache: the category tree almost never changes, station lists do
+    CATEGORY_TTL = 86400
+    CATEGORY_STALE_TTL = 7 * 86400
+    LIST_TTL = 900
+    LIST_STALE_TTL = 86400
+
+    def __init__(self):
+        self.cache = TTLCache(ttl=self.LIST_TTL, maxsize=64, stale_ttl=self.LIST_STALE_TTL)
+
     def search(self, query, limit=20):
         """Search TuneIn for radio stations."""
         try:
@@ -37,17 +50,9 @@ class TuneInAPI:
         Categories: local, music, talk, sports, location, language, podcast
         """
         try:
-            # First get the category URL
-            r = requests.get(f"{self.BASE_URL}/Browse.ashx", params={
-                'render': 'json',
-                'formats': 'mp3,aac',
-            }, timeout=5)
-            r.raise_for_status()
-            categories = r.json().get('body', [])
-
-            # Find the requested category
+            # The category URL comes from the cached tree, so this is one request or none
             cat_url = None
-            for cat in categories:
+            for cat in self._category_tree():
                 if cat.get('key') == category:
                     cat_url = cat.get('URL')
                     break
@@ -55,24 +60,8 @@ class TuneInAPI:
             if not cat_url:
                 return []
 
-            # Fetch category contents
-            r2 = requests.get(cat_url, params={
-                'render': 'json',
-                'formats': 'mp3,aac',
-            }, timeout=5)
-            r2.raise_for_status()
-            data = r2.json()
-
-            results = []
-            for section in data.get('body', []):
-                # Some categories have nested children
-                children = section.get('children', [section])
-                for item in children:
-                    if item.get('item') == 'station' and item.get('type') == 'audio':
-                        results.append(self._parse_station(item))
-                        if len(results) >= limit:
-                            return results
-            return results
+            stations = self.cache.get_or_load(('browse', category), lambda: self._fetch_stations(cat_url))
+            return stations[:limit]
         except Exception as e:
             print(f"TuneIn browse error: {e}")
             return []
@@ -80,23 +69,9 @@ class TuneInAPI:
     def get_popular(self, limit=20):
         """Get popular/trending stations."""
         try:
-            r = requests.get(f"{self.BASE_URL}/Browse.ashx", params={
-                'c': 'trending',
-                'render': 'json',
-                'formats': 'mp3,aac',
-            }, timeout=5)
-            r.raise_for_status()
-            data = r.json()
-
-            results = []
-            for section in data.get('body', []):
-                children = section.get('children', [section])
-                for item in children:
-                    if item.get('item') == 'station' and item.get('type') == 'audio':
-                        results.append(self._parse_station(item))
-                        if len(results) >= limit:
-                            return results
-            return results
+            stations = self.cache.get_or_load(
+                ('popular',), lambda: self._fetch_stations(f"{self.BASE_URL}/Browse.ashx", {'c': 'trending'}))
+            return stations[:limit]
         except Exception as e:
             print(f"TuneIn popular error: {e}")
             return []
@@ -104,21 +79,42 @@ class TuneInAPI:
     def get_categories(self):
         """Get available browse categories."""
         try:
-            r = requests.get(f"{self.BASE_URL}/Browse.ashx", params={
-                'render': 'json',
-            }, timeout=5)
-            r.raise_for_status()
-            data = r.json()
-
             return [
                 {"key": item.get("key"), "name": item.get("text")}
-                for item in data.get("body", [])
+                for item in self._category_tree()
                 if item.get("key")
             ]
         except Exception as e:
             print(f"TuneIn categories error: {e}")
             return []
 
+    def _category_tree(self):
+        """Root Browse.ashx entries (key, text, URL), cached for a day."""
+        def load():
+            r = requests.get(f"{self.BASE_URL}/Browse.ashx", params={
+                'render': 'json',
+                'formats': 'mp3,aac',
+            }, timeout=5)
+            r.raise_for_status()
+            return r.json().get('body', [])
+
+        return self.cache.get_or_load(('categories',), load, self.CATEGORY_TTL, self.CATEGORY_STALE_TTL)
+
+    def _fetch_stations(self, url, params=None):
+        """Fetches a browse list and returns all of its audio stations."""
+        r = requests.get(url, params=dict(params or {}, render='json', formats='mp3,aac'), timeout=5)
+        r.raise_for_status()
+        data = r.json()
+
+        results = []
+        for section in data.get('body', []):
+            # Some categories have nested children
+            children = section.get('children', [section])
+            for item in children:
+                if item.get('item') == 'station' and item.get('type') == 'audio':
+                    results.append(self._parse_station(item))
+        return results
+
     def _parse_station(self, item):
         """Parse a TuneIn station item into our standardized format."""
         guide_id = item.get('guide_id', '')